@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import OrderStatusEvent, RollupWatermark
+
+
+@admin.register(OrderStatusEvent)
+class OrderStatusEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'order', 'old_status', 'new_status', 'created_at']
+    list_filter = ['new_status']
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_event_id', 'updated_at']
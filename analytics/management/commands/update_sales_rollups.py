@@ -0,0 +1,35 @@
+# In analytics/management/commands/update_sales_rollups.py
+import time
+
+from django.core.management.base import BaseCommand
+from analytics.services import apply_pending_events, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new order events into the daily sales rollups (see analytics/services.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, picking up new events.")
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help="Seconds between runs (with --loop).")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Events applied per transaction.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Drop the rollups first and recompute them from the whole event log.")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rebuild_rollups()
+        while True:
+            total = 0
+            while True:
+                applied = apply_pending_events(options['batch_size'])
+                total += applied
+                if not applied:
+                    break
+            if total:
+                self.stdout.write(f"Applied {total} order event(s) to the sales rollups.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:20
+
+from django.db import migrations
+
+
+def log_existing_orders(apps, schema_editor):
+    # Orders placed before the transition log existed get one "placed" event
+    # with their current status, so the first rollup run covers them too.
+    Order = apps.get_model('orders', 'Order')
+    OrderStatusEvent = apps.get_model('analytics', 'OrderStatusEvent')
+    batch = []
+    for order_id, status in Order.objects.order_by('id').values_list('id', 'status').iterator(chunk_size=2000):
+        batch.append(OrderStatusEvent(order_id=order_id, old_status=None, new_status=status))
+        if len(batch) == 2000:
+            OrderStatusEvent.objects.bulk_create(batch)
+            batch = []
+    OrderStatusEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(log_existing_orders, migrations.RunPython.noop),
+    ]
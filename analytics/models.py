@@ -0,0 +1,75 @@
+# In analytics/models.py
+from django.db import models
+from orders.models import Order
+from products.models import Category, Product
+
+
+class OrderStatusEvent(models.Model):
+    """
+    The order transition log: one row when an order is placed and one for
+    every status change after that (see analytics/signals.py), written in
+    the same transaction as the change itself. The rollups below are
+    computed from it, never from the orders tables.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_events')
+    # Null for the event that records the order being placed.
+    old_status = models.CharField(max_length=20, choices=Order.OrderStatus.choices, null=True, blank=True)
+    new_status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.old_status or '-'} -> {self.new_status}"
+
+
+class RollupWatermark(models.Model):
+    """How far into the event log the rollups are (the last applied event id)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
+
+
+# Daily rollups. `day` is the (local) day the order was placed, and every
+# order counts once, under its current status: when it moves from PENDING
+# to PAID its numbers move from the PENDING rows to the PAID rows.
+
+class DailySales(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    orders = models.BigIntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_sales')]
+
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    # Orders that contained the product.
+    orders = models.BigIntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product', 'status'], name='unique_daily_product_sales'),
+        ]
+
+
+class DailyCategorySales(models.Model):
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    orders = models.BigIntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'status'], name='unique_daily_category_sales'),
+        ]
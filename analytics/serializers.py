@@ -0,0 +1,40 @@
+# In analytics/serializers.py
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+from orders.models import Order
+
+# What counts as a sale unless `?status=` says otherwise.
+SOLD_STATUSES = [Order.OrderStatus.PAID, Order.OrderStatus.SHIPPED, Order.OrderStatus.DELIVERED]
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the sales reports:
+
+        ?start=2024-01-01&end=2024-01-31   days the orders were placed (inclusive;
+                                           default: the last 30 days)
+        ?status=PAID,SHIPPED               order statuses to include (default: sold ones)
+        ?limit=20                          rows of the product/category rankings
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    status = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=20)
+
+    def validate_status(self, value):
+        statuses = [status.strip().upper() for status in value.split(',') if status.strip()]
+        unknown = set(statuses) - set(Order.OrderStatus.values)
+        if unknown or not statuses:
+            raise serializers.ValidationError(
+                f"Must be a comma-separated list of: {', '.join(Order.OrderStatus.values)}.")
+        return statuses
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=29))
+        attrs.setdefault('status', SOLD_STATUSES)
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': "Must not be after `end`."})
+        return attrs
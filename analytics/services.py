@@ -0,0 +1,160 @@
+# In analytics/services.py
+"""
+Incremental sales rollups.
+
+Reports never aggregate `orders.OrderItem` on the fly. Instead the order
+transition log (OrderStatusEvent) is folded into small daily tables
+(DailySales, DailyProductSales, DailyCategorySales) by `apply_pending_events`,
+run by `manage.py update_sales_rollups`:
+
+1. Lock the watermark row, so only one process updates the rollups at a time.
+2. Read the next batch of events after the watermark, and the items of
+   their orders (one query each).
+3. Turn them into deltas: an order being placed adds its numbers to its
+   status; a transition moves them from the old status to the new one.
+4. Add the deltas to the rollup rows, advance the watermark, commit.
+
+Each batch is one transaction, so the rollups and the watermark never
+disagree: a crash just means the batch is applied again later.
+
+Events are only picked up once they are ANALYTICS_SETTLE_SECONDS old. Ids
+are handed out when a row is inserted, not when it is committed, so a
+slow transaction can commit an event *below* one that is already visible;
+waiting a little before moving the watermark past an id leaves those
+transactions time to finish.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from .models import (
+    DailyCategorySales, DailyProductSales, DailySales, OrderStatusEvent, RollupWatermark,
+)
+
+WATERMARK = 'sales'
+# rollup model -> the key field besides `day` and `status` (None for the totals).
+ROLLUPS = [(DailySales, None), (DailyProductSales, 'product_id'), (DailyCategorySales, 'category_id')]
+
+
+def _zero():
+    return {'orders': 0, 'units': 0, 'revenue': Decimal('0')}
+
+
+def _order_numbers(items):
+    """Totals, per-product and per-category numbers of one order's items."""
+    total = _zero()
+    total['orders'] = 1
+    per_key = {'product_id': defaultdict(_zero), 'category_id': defaultdict(_zero)}
+    for item in items:
+        revenue = item['price_at_purchase'] * item['quantity']
+        total['units'] += item['quantity']
+        total['revenue'] += revenue
+        for field, key in (('product_id', item['product_id']), ('category_id', item['product__category_id'])):
+            numbers = per_key[field][key]
+            numbers['units'] += item['quantity']
+            numbers['revenue'] += revenue
+    for numbers_by_key in per_key.values():
+        for numbers in numbers_by_key.values():
+            numbers['orders'] = 1
+    return {None: {None: total}, **per_key}
+
+
+def _deltas(events, orders, items_by_order):
+    """{(model, key field): {(day, key, status): numbers}} for a batch of events."""
+    deltas = {rollup: defaultdict(_zero) for rollup in ROLLUPS}
+    for event in events:
+        created_at = orders.get(event.order_id)
+        if created_at is None:  # The order is gone (deleted in the meantime).
+            continue
+        day = timezone.localtime(created_at).date()
+        numbers = _order_numbers(items_by_order.get(event.order_id, ()))
+        for (model, field), rows in deltas.items():
+            for key, values in numbers[field].items():
+                for status, sign in ((event.old_status, -1), (event.new_status, 1)):
+                    if status is None:
+                        continue
+                    row = rows[(day, key, status)]
+                    for name, value in values.items():
+                        row[name] += sign * value
+    return deltas
+
+
+def _apply(model, field, rows):
+    """Add `rows` ({(day, key, status): numbers}) to the rollup table of `model`."""
+    rows = {key: numbers for key, numbers in rows.items() if any(numbers.values())}
+    if not rows:
+        return
+    lookup = {'day__in': {day for day, _, _ in rows}, 'status__in': {status for _, _, status in rows}}
+    if field:
+        lookup[f'{field}__in'] = {key for _, key, _ in rows}
+    existing = {
+        (row.day, getattr(row, field) if field else None, row.status): row
+        for row in model.objects.filter(**lookup)
+    }
+    to_create, to_update, to_delete = [], [], []
+    for (day, key, status), numbers in rows.items():
+        row = existing.get((day, key, status))
+        if row is None:
+            row = model(day=day, status=status, **({field: key} if field else {}))
+            to_create.append(row)
+        for name, value in numbers.items():
+            setattr(row, name, getattr(row, name) + value)
+        if row.pk is not None:
+            # Rows whose orders all moved to another status are dropped.
+            (to_update if row.orders else to_delete).append(row)
+    if to_create:
+        model.objects.bulk_create(to_create)
+    if to_update:
+        model.objects.bulk_update(to_update, ['orders', 'units', 'revenue'])
+    if to_delete:
+        model.objects.filter(pk__in=[row.pk for row in to_delete]).delete()
+
+
+def apply_pending_events(batch_size=1000):
+    """Fold the next batch of events into the rollups. Returns how many were applied."""
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYTICS_SETTLE_SECONDS)
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        events = []
+        # In id order, stopping at the first event that hasn't settled yet:
+        # the watermark must never pass an unsettled id, even when a lower
+        # id carries a later created_at (clock skew between app servers).
+        for event in (OrderStatusEvent.objects.filter(id__gt=watermark.last_event_id)
+                      .order_by('id')[:batch_size]):
+            if event.created_at > cutoff:
+                break
+            events.append(event)
+        if not events:
+            return 0
+
+        order_ids = {event.order_id for event in events}
+        orders = dict(Order.objects.filter(id__in=order_ids).values_list('id', 'created_at'))
+        items_by_order = defaultdict(list)
+        for item in (OrderItem.objects.filter(order_id__in=order_ids)
+                     .values('order_id', 'product_id', 'product__category_id', 'quantity', 'price_at_purchase')):
+            items_by_order[item['order_id']].append(item)
+
+        for (model, field), rows in _deltas(events, orders, items_by_order).items():
+            _apply(model, field, rows)
+
+        watermark.last_event_id = events[-1].id
+        watermark.updated_at = timezone.now()
+        watermark.save()
+    return len(events)
+
+
+def rebuild_rollups():
+    """Drop the rollups and the watermark; the next runs recompute everything from the log."""
+    with transaction.atomic():
+        for model, _ in ROLLUPS:
+            model.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
+
+
+def rollups_as_of():
+    """When the rollups were last advanced (None if never)."""
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('updated_at', flat=True).first()
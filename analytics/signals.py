@@ -0,0 +1,26 @@
+# In analytics/signals.py
+# Record every order transition in the OrderStatusEvent log.
+# These receivers are connected in AnalyticsConfig.ready().
+#
+# Only changes that go through `Order.save()` (checkout, payments, the admin)
+# are seen; a queryset `.update(status=...)` must log its own events.
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from orders.models import Order
+from .models import OrderStatusEvent
+
+
+@receiver(post_init, sender=Order)
+def remember_status(sender, instance, **kwargs):
+    # The status as loaded, to tell what `save()` changed (without a query;
+    # an order loaded without its status is left alone).
+    if 'status' not in instance.get_deferred_fields():
+        instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=Order)
+def log_status_change(sender, instance, created, **kwargs):
+    old_status = None if created else getattr(instance, '_loaded_status', None)
+    if created or (old_status is not None and old_status != instance.status):
+        OrderStatusEvent.objects.create(order=instance, old_status=old_status, new_status=instance.status)
+    instance._loaded_status = instance.status
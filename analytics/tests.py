@@ -0,0 +1,170 @@
+# In analytics/tests.py
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from cart.models import Cart
+from orders.models import Order
+from orders.services import checkout
+from payments.services import mark_order_paid
+from products.models import Category, Product
+from .models import DailyCategorySales, DailyProductSales, DailySales, OrderStatusEvent, RollupWatermark
+from .services import apply_pending_events
+
+PENDING, PAID = Order.OrderStatus.PENDING, Order.OrderStatus.PAID
+
+
+@override_settings(ANALYTICS_SETTLE_SECONDS=0)
+class SalesRollupTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='buyer')
+        self.books = Category.objects.create(name='Books')
+        self.games = Category.objects.create(name='Games')
+        self.dune = Product.objects.create(name='Dune', description='', price='10.00', category=self.books)
+        self.chess = Product.objects.create(name='Chess', description='', price='30.00', category=self.games)
+        self.today = timezone.localdate()
+
+    def place_order(self, *lines):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        for product, quantity in lines:
+            cart.items.create(product=product, quantity=quantity)
+        return checkout(self.user)
+
+    def pay(self, order):
+        order.status = PAID
+        order.save()
+
+    def totals(self, status):
+        row = DailySales.objects.get(day=self.today, status=status)
+        return row.orders, row.units, row.revenue
+
+    def test_transitions_are_logged(self):
+        order = self.place_order((self.dune, 1))
+        self.pay(order)
+        order.save()  # No change, no event.
+        self.assertEqual(
+            list(OrderStatusEvent.objects.values_list('old_status', 'new_status')),
+            [(None, PENDING), (PENDING, PAID)],
+        )
+
+    def test_concurrent_payments_move_the_order_once(self):
+        self.user.email = 'buyer@example.com'
+        self.user.save()
+        order = self.place_order((self.dune, 2))
+        apply_pending_events()
+        # Two payments that both read the order while it was PENDING.
+        first, second = (Order.objects.select_related('user').get(pk=order.pk) for _ in range(2))
+        self.assertIsNotNone(mark_order_paid(first))
+        self.assertIsNone(mark_order_paid(second))
+
+        self.assertEqual(OrderStatusEvent.objects.filter(order=order, new_status=PAID).count(), 1)
+        apply_pending_events()
+        self.assertFalse(DailySales.objects.filter(status=PENDING).exists())  # Not -1.
+        self.assertEqual(self.totals(PAID), (1, 2, Decimal('20.00')))
+
+    def test_rollups_follow_the_order_status(self):
+        first = self.place_order((self.dune, 2), (self.chess, 1))
+        self.place_order((self.dune, 1))
+        self.assertEqual(apply_pending_events(), 2)
+        self.assertEqual(self.totals(PENDING), (2, 4, Decimal('60.00')))
+
+        self.pay(first)
+        self.assertEqual(apply_pending_events(), 1)
+        self.assertEqual(self.totals(PENDING), (1, 1, Decimal('10.00')))
+        self.assertEqual(self.totals(PAID), (1, 3, Decimal('50.00')))
+
+        dune = DailyProductSales.objects.get(day=self.today, product=self.dune, status=PAID)
+        self.assertEqual((dune.orders, dune.units, dune.revenue), (1, 2, Decimal('20.00')))
+        games = DailyCategorySales.objects.get(day=self.today, category=self.games, status=PAID)
+        self.assertEqual((games.orders, games.units, games.revenue), (1, 1, Decimal('30.00')))
+
+    def test_only_new_events_are_processed(self):
+        self.place_order((self.dune, 1))
+        apply_pending_events()
+        self.assertEqual(apply_pending_events(), 0)
+        watermark = RollupWatermark.objects.get()
+        self.assertEqual(watermark.last_event_id, OrderStatusEvent.objects.get().id)
+
+        # One batch: the watermark, events, orders and items, then one read and one
+        # write per rollup table, the watermark update (plus the savepoint pair).
+        self.place_order((self.chess, 1))
+        with self.assertNumQueries(13):
+            apply_pending_events()
+        self.assertEqual(self.totals(PENDING), (2, 2, Decimal('40.00')))
+
+    def test_events_wait_to_settle(self):
+        self.place_order((self.dune, 1))
+        with override_settings(ANALYTICS_SETTLE_SECONDS=60):
+            self.assertEqual(apply_pending_events(), 0)
+        self.assertEqual(apply_pending_events(), 1)
+
+    def test_watermark_never_skips_a_skewed_event(self):
+        self.place_order((self.dune, 1))
+        self.place_order((self.chess, 1))
+        first, second = OrderStatusEvent.objects.order_by('id')
+        # The lower id was written by a server whose clock runs ahead.
+        OrderStatusEvent.objects.filter(pk=first.pk).update(created_at=timezone.now() + timedelta(seconds=30))
+        self.assertEqual(apply_pending_events(), 0)
+
+        OrderStatusEvent.objects.filter(pk=first.pk).update(created_at=second.created_at)
+        self.assertEqual(apply_pending_events(), 2)
+        self.assertEqual(self.totals(PENDING), (2, 2, Decimal('40.00')))
+
+    def test_command_rebuild_gives_the_same_numbers(self):
+        self.pay(self.place_order((self.dune, 3)))
+        self.place_order((self.chess, 1))
+        call_command('update_sales_rollups', stdout=io.StringIO())
+        before = list(DailyProductSales.objects.order_by('product_id', 'status')
+                      .values_list('product_id', 'status', 'orders', 'units', 'revenue'))
+        call_command('update_sales_rollups', '--rebuild', '--batch-size', '1', stdout=io.StringIO())
+        after = list(DailyProductSales.objects.order_by('product_id', 'status')
+                     .values_list('product_id', 'status', 'orders', 'units', 'revenue'))
+        self.assertEqual(after, before)
+
+
+@override_settings(ANALYTICS_SETTLE_SECONDS=0)
+class SalesReportApiTests(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(username='finance', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.today = timezone.localdate()
+        books = Category.objects.create(name='Books')
+        self.dune = Product.objects.create(name='Dune', description='', price='10.00', category=books)
+        for day, order_status, orders, revenue in [(self.today, PAID, 3, '30.00'),
+                                                   (self.today, PENDING, 1, '10.00'),
+                                                   (self.today - timedelta(days=1), PAID, 2, '20.00')]:
+            DailySales.objects.create(day=day, status=order_status, orders=orders, units=orders, revenue=revenue)
+            DailyProductSales.objects.create(day=day, product=self.dune, status=order_status,
+                                             orders=orders, units=orders, revenue=revenue)
+
+    def test_daily_report_reads_only_rollups(self):
+        with self.assertNumQueries(2):  # The rows and the watermark.
+            response = self.client.get('/api/analytics/sales/daily/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], [PAID, Order.OrderStatus.SHIPPED, Order.OrderStatus.DELIVERED])
+        self.assertEqual([(row['day'], row['orders'], row['revenue']) for row in response.data['results']], [
+            (self.today - timedelta(days=1), 2, Decimal('20.00')),
+            (self.today, 3, Decimal('30.00')),
+        ])
+
+    def test_filters(self):
+        response = self.client.get('/api/analytics/sales/products/',
+                                   {'status': 'paid,pending', 'start': self.today.isoformat()})
+        self.assertEqual(response.data['results'], [
+            {'product_id': self.dune.id, 'product_name': 'Dune', 'orders': 4, 'units': 4,
+             'revenue': Decimal('40.00')},
+        ])
+        response = self.client.get('/api/analytics/sales/categories/', {'status': 'LOST'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(user=User.objects.create(username='shopper'))
+        self.assertEqual(self.client.get('/api/analytics/sales/daily/').status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,9 @@
+# In analytics/urls.py
+from django.urls import path
+from .views import CategorySalesView, DailySalesView, ProductSalesView
+
+urlpatterns = [
+    path('sales/daily/', DailySalesView.as_view(), name='sales-daily'),
+    path('sales/products/', ProductSalesView.as_view(), name='sales-products'),
+    path('sales/categories/', CategorySalesView.as_view(), name='sales-categories'),
+]
@@ -0,0 +1,62 @@
+# In analytics/views.py
+# Sales reports for admins. They read ONLY the rollup tables (see
+# analytics/services.py): a year of daily numbers is a few hundred rows,
+# whatever the number of orders, and the orders tables are never scanned.
+from django.db.models import F, Sum
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import DailyCategorySales, DailyProductSales, DailySales
+from .serializers import SalesReportQuerySerializer
+from .services import rollups_as_of
+
+TOTALS = {'orders': Sum('orders'), 'units': Sum('units'), 'revenue': Sum('revenue')}
+
+
+class SalesReportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_filters(self, request):
+        query = SalesReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        self.query = query.validated_data
+        return {'day__range': (self.query['start'], self.query['end']), 'status__in': self.query['status']}
+
+    def report(self, rows):
+        return Response({
+            'start': self.query['start'],
+            'end': self.query['end'],
+            'status': self.query['status'],
+            # Events newer than this are not in the numbers yet.
+            'as_of': rollups_as_of(),
+            'results': list(rows),
+        })
+
+
+# GET /api/analytics/sales/daily/ - orders, units and revenue per day.
+class DailySalesView(SalesReportView):
+
+    def get(self, request, *args, **kwargs):
+        rows = (DailySales.objects.filter(**self.get_filters(request))
+                .values('day').annotate(**TOTALS).order_by('day'))
+        return self.report(rows)
+
+
+# GET /api/analytics/sales/products/ - best-selling products by revenue.
+class ProductSalesView(SalesReportView):
+
+    def get(self, request, *args, **kwargs):
+        rows = (DailyProductSales.objects.filter(**self.get_filters(request))
+                .values('product_id').annotate(product_name=F('product__name'), **TOTALS)
+                .order_by('-revenue', 'product_id')[:self.query['limit']])
+        return self.report(rows)
+
+
+# GET /api/analytics/sales/categories/ - revenue per category.
+class CategorySalesView(SalesReportView):
+
+    def get(self, request, *args, **kwargs):
+        rows = (DailyCategorySales.objects.filter(**self.get_filters(request))
+                .values('category_id').annotate(category_name=F('category__name'), **TOTALS)
+                .order_by('-revenue', 'category_id')[:self.query['limit']])
+        return self.report(rows)
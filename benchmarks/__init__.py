@@ -0,0 +1,2 @@
+# Benchmark scripts. Run them from the project root, e.g.:
+#   python -m benchmarks.profile_latency --help
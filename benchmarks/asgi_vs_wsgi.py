@@ -0,0 +1,162 @@
+# In benchmarks/asgi_vs_wsgi.py
+"""
+How many concurrent requests the sync (WSGI) and async (ASGI) deployments
+keep up with when the database is slow.
+
+The sync deployment serves the regular views through gunicorn's sync
+workers; the async one serves the async views (/api/async/...) through
+uvicorn workers. Both are given the same number of processes. Each endpoint
+is hit by 1, 8, 32, ... client threads for a few seconds, and we print
+throughput, latency percentiles and errors per level:
+
+    # Against two running deployments (start them with DB_SIMULATED_LATENCY_MS
+    # set to imitate a remote database, see core/db.py):
+    python -m benchmarks.asgi_vs_wsgi --username alice --password secret \\
+        --wsgi-url http://localhost:8000 --asgi-url http://localhost:8001
+
+    # Or let the script start both on a throwaway SQLite database:
+    python -m benchmarks.asgi_vs_wsgi --spawn --latency-ms 20 --workers 2
+
+With N sync workers at most N requests are in flight, so past that
+concurrency the sync numbers stop growing and latency climbs; the async
+workers keep many requests waiting on the database at once.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from benchmarks.common import obtain_token, percentile, request_json, wait_until_up
+
+# The same endpoint, as served by each deployment.
+ENDPOINTS = [
+    ('cart', {'wsgi': '/api/cart/', 'asgi': '/api/async/cart/'}),
+    ('product list', {'wsgi': '/api/products/', 'asgi': '/api/async/products/'}),
+]
+SPAWN_USER = ('bench', 'bench-password-1')
+
+
+def load(url, token, concurrency, duration):
+    """Hit `url` from `concurrency` threads for `duration` seconds."""
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _, _ = request_json(url, token=token)
+            except OSError:
+                status = None
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    elapsed = time.perf_counter() - started
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'errors': errors[0],
+    }
+
+
+@contextmanager
+def spawned_deployments(latency_ms, workers):
+    """Start both deployments on a fresh SQLite database; yield their URLs."""
+    with tempfile.TemporaryDirectory() as directory, ExitStack() as stack:
+        env = dict(
+            os.environ,
+            DB_ENGINE='sqlite',
+            SQLITE_PATH=os.path.join(directory, 'bench.sqlite3'),
+            DB_SIMULATED_LATENCY_MS=str(latency_ms),
+            # Measure the views, not the catalog cache.
+            CACHE_BACKEND='django.core.cache.backends.dummy.DummyCache',
+            DEBUG='False',
+        )
+        env.setdefault('SECRET_KEY', 'benchmark-secret-key')
+        manage = [sys.executable, 'manage.py']
+        seed = ("from django.contrib.auth.models import User; from products.models import Category, Product; "
+                f"User.objects.create_user({SPAWN_USER[0]!r}, password={SPAWN_USER[1]!r}); "
+                "category = Category.objects.create(name='Benchmark'); "
+                "Product.objects.bulk_create([Product(name=f'Product {i}', description='', price=9.99, "
+                "category=category) for i in range(100)])")
+        # Seeding runs without the simulated latency.
+        quiet = dict(env, DB_SIMULATED_LATENCY_MS='0')
+        subprocess.run(manage + ['migrate', '-v', '0'], env=quiet, check=True)
+        subprocess.run(manage + ['shell', '-v', '0', '-c', seed], env=quiet, check=True)
+
+        servers = {
+            'wsgi': ('http://127.0.0.1:8610', ['config.wsgi:application']),
+            'asgi': ('http://127.0.0.1:8611', ['config.asgi:application', '-k', 'uvicorn_worker.UvicornWorker']),
+        }
+        for base_url, arguments in servers.values():
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', *arguments, '--workers', str(workers),
+                 '--bind', base_url.removeprefix('http://'), '--log-level', 'warning'],
+                env=env,
+            )
+            stack.callback(process.wait)
+            stack.callback(process.terminate)
+        for base_url, _ in servers.values():
+            wait_until_up(base_url)
+        yield servers['wsgi'][0], servers['asgi'][0]
+
+
+def run(wsgi_url, asgi_url, username, password, levels, duration):
+    deployments = {'wsgi': wsgi_url, 'asgi': asgi_url}
+    tokens = {name: obtain_token(url, username, password) for name, url in deployments.items()}
+    print(f"{'endpoint':<14} {'server':<6} {'clients':>7} {'req/s':>9} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for label, paths in ENDPOINTS:
+        for name, base_url in deployments.items():
+            url = base_url + paths[name]
+            request_json(url, token=tokens[name])  # Warm up (and create the cart).
+            for concurrency in levels:
+                result = load(url, tokens[name], concurrency, duration)
+                print(f"{label:<14} {name:<6} {concurrency:>7} {result['rps']:>9.1f} {result['p50']:>9.1f} "
+                      f"{result['p95']:>9.1f} {result['p99']:>9.1f} {result['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi-url', help="Base URL of the sync (gunicorn) deployment.")
+    parser.add_argument('--asgi-url', help="Base URL of the async (uvicorn) deployment.")
+    parser.add_argument('--username')
+    parser.add_argument('--password')
+    parser.add_argument('--spawn', action='store_true',
+                        help="Start both deployments locally instead of using --wsgi-url/--asgi-url.")
+    parser.add_argument('--latency-ms', type=int, default=20, help="Simulated query latency with --spawn.")
+    parser.add_argument('--workers', type=int, default=2, help="Processes per deployment with --spawn.")
+    parser.add_argument('--concurrency', default='1,8,32,128',
+                        help="Comma-separated numbers of client threads.")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per concurrency level.")
+    args = parser.parse_args()
+    levels = [int(value) for value in args.concurrency.split(',')]
+
+    if args.spawn:
+        with spawned_deployments(args.latency_ms, args.workers) as (wsgi_url, asgi_url):
+            run(wsgi_url, asgi_url, *SPAWN_USER, levels, args.duration)
+        return
+    if not (args.wsgi_url and args.asgi_url and args.username and args.password):
+        parser.error("--wsgi-url, --asgi-url, --username and --password are required without --spawn")
+    run(args.wsgi_url.rstrip('/'), args.asgi_url.rstrip('/'), args.username, args.password,
+        levels, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# In benchmarks/auth_throughput.py
+"""
+Requests/second of GET /api/cart/ with the classic JWT authentication
+(loads the User row on every request) versus the stateless one (builds the
+user from the token claims), measured in-process with Django's test client:
+
+    DB_ENGINE=sqlite python -m benchmarks.auth_throughput --requests 2000
+
+Against PostgreSQL (drop DB_ENGINE) the difference is larger, since every
+skipped query is a network round trip.
+"""
+import argparse
+import time
+
+from benchmarks import django_setup
+
+
+def run(requests):
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from cart.views import CartView
+    from users.authentication import StatelessJWTAuthentication
+    from users.tokens import ClaimsTokenObtainPairSerializer
+
+    user = User.objects.create_user('bench', 'bench@example.com', 'bench-password-1')
+    token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    original = CartView.authentication_classes
+    try:
+        for label, auth_class in [('JWTAuthentication', JWTAuthentication),
+                                  ('StatelessJWTAuthentication', StatelessJWTAuthentication)]:
+            CartView.authentication_classes = [auth_class]
+            for _ in range(50):  # Warm up (and create the cart).
+                client.get('/api/cart/')
+            started = time.perf_counter()
+            for _ in range(requests):
+                response = client.get('/api/cart/')
+                assert response.status_code == 200, response.status_code
+            elapsed = time.perf_counter() - started
+            print(f"{label:<28} {requests / elapsed:8.0f} req/s  ({elapsed / requests * 1000:.3f} ms/request)")
+    finally:
+        CartView.authentication_classes = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    django_setup.setup()
+    with django_setup.test_database():
+        run(args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# In benchmarks/common.py
+# Small helpers shared by the benchmark scripts (standard library only, so
+# they run from any machine that can reach the app).
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+
+
+def request_json(url, method='GET', data=None, token=None, headers=None, timeout=30):
+    """Send a request and return (status, parsed JSON body or None, response headers)."""
+    body = json.dumps(data).encode() if data is not None else None
+    request = urllib.request.Request(url, data=body, method=method)
+    request.add_header('Accept', 'application/json')
+    if body is not None:
+        request.add_header('Content-Type', 'application/json')
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    for name, value in (headers or {}).items():
+        request.add_header(name, value)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            raw = response.read()
+            return response.status, json.loads(raw) if raw else None, dict(response.headers)
+    except urllib.error.HTTPError as exc:
+        raw = exc.read()
+        try:
+            parsed = json.loads(raw) if raw else None
+        except ValueError:
+            parsed = None
+        return exc.code, parsed, dict(exc.headers)
+
+
+def obtain_token(base_url, username, password):
+    status, body, _ = request_json(f'{base_url}/api/token/', 'POST',
+                                   {'username': username, 'password': password})
+    if status != 200:
+        raise SystemExit(f"Could not log in as {username!r} on {base_url} (HTTP {status}): {body}")
+    return body['access']
+
+
+def timed(func, *args, **kwargs):
+    """Run func and return (result, elapsed milliseconds)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (pct in 0-100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        'count': len(samples_ms),
+        'mean': statistics.fmean(samples_ms) if samples_ms else 0.0,
+        'p50': percentile(samples_ms, 50),
+        'p95': percentile(samples_ms, 95),
+        'p99': percentile(samples_ms, 99),
+    }
+
+
+def format_summary(label, summary):
+    return (f"{label:<28} n={summary['count']:<6} mean={summary['mean']:7.2f}ms "
+            f"p50={summary['p50']:7.2f}ms p95={summary['p95']:7.2f}ms p99={summary['p99']:7.2f}ms")
+
+
+def wait_until_up(base_url, timeout=30):
+    """Poll the product list until the app answers (e.g. right after starting it)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request_json(f'{base_url}/api/products/', timeout=2)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"{base_url} did not come up within {timeout}s")
@@ -0,0 +1,26 @@
+# In benchmarks/django_setup.py
+# In-process benchmarks run the real Django stack against a throwaway test
+# database, the same way `manage.py test` does.
+import contextlib
+import os
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Create a fresh test database for the duration of the block."""
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.db import connection
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
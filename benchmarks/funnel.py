@@ -0,0 +1,348 @@
+# In benchmarks/funnel.py
+"""
+Replay the purchase funnel against a running app and report, per endpoint,
+throughput, latency percentiles and database queries per request:
+
+    register -> token -> browse (list, next page, search, details)
+             -> cart (add products, view) -> order -> payment -> order history
+
+Each simulated shopper walks the funnel once; `--shoppers` of them are
+spread over `--concurrency` client threads. A share of them (`--returning`)
+are returning customers who log in as one of the users created by
+benchmarks/seed.py instead of registering.
+
+    # Against a running deployment, seeded with benchmarks/seed.py:
+    python -m benchmarks.funnel --url http://localhost:8000 --shoppers 200 --concurrency 8
+
+    # Or let the script migrate, seed and serve a throwaway SQLite database
+    # (or a throwaway `<DB_NAME>_funnel` database it creates and drops on the
+    # Postgres server the DB_* settings point at):
+    python -m benchmarks.funnel --spawn sqlite --shoppers 200 --concurrency 8 --json funnel.json
+
+    # Catch regressions: compare with an earlier report, exit 1 when an
+    # endpoint's p95 grew by more than --tolerance or it runs more queries.
+    python -m benchmarks.funnel --spawn sqlite --baseline funnel.json
+
+Queries per request come from the app's /internal/metrics/ (core/metrics.py),
+which must accept the driver (METRICS_ALLOWED_IPS, or pass --metrics-token).
+They are the averages of the worker process that answers the scrape since
+it started, so they are exact with one fresh worker (as spawned here) and
+a sample with several.
+
+SQLite takes one writer at a time: keep the concurrency low there, or use
+Postgres for contention numbers.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from benchmarks import django_setup
+from benchmarks.common import percentile, request_json, wait_until_up
+from benchmarks.seed import BENCH_PASSWORD, USERNAME_PREFIX
+
+FUNNEL_DB_SUFFIX = '_funnel'
+
+# Funnel step -> (method, path shown in the report, the URL name the app's
+# metrics use for it).
+ENDPOINTS = {
+    'register': ('POST', '/api/register/', 'register'),
+    'token': ('POST', '/api/token/', 'token_obtain_pair'),
+    'product list': ('GET', '/api/products/', 'product-list'),
+    'product search': ('GET', '/api/products/search/', 'product-search'),
+    'product detail': ('GET', '/api/products/<id>/', 'product-detail'),
+    'cart add': ('POST', '/api/cart/', 'cart-detail'),
+    'cart view': ('GET', '/api/cart/', 'cart-detail'),
+    'order create': ('POST', '/api/orders/', 'order-create'),
+    'payment': ('POST', '/api/payments/mock-pay/', 'mock-payment'),
+    'order history': ('GET', '/api/orders/history/', 'order-history'),
+}
+SEARCH_TERMS = ('lamp', 'chair', 'wireless', 'vintage', 'kettle', 'novel', 'leather', 'desk')
+SHOPPER_PASSWORD = 'Funnel-pass-8812'
+SPAWN_URL = 'http://127.0.0.1:8620'
+
+
+class StepFailed(Exception):
+    pass
+
+
+class Recorder:
+    """Latencies and errors per funnel step, shared by the client threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {step: [] for step in ENDPOINTS}
+        self.errors = {step: 0 for step in ENDPOINTS}
+        self.completed = 0
+
+    def call(self, step, path, expected, base_url, **kwargs):
+        method = ENDPOINTS[step][0]
+        started = time.perf_counter()
+        try:
+            status, body, _ = request_json(f'{base_url}{path}', method, **kwargs)
+        except OSError:
+            status, body = None, None
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            if status == expected:
+                self.latencies[step].append(elapsed)
+            else:
+                self.errors[step] += 1
+        if status != expected:
+            raise StepFailed(f"{method} {path}: HTTP {status} {body}")
+        return body
+
+
+def shopper(base_url, recorder, rng, returning_user):
+    """One trip through the funnel; stops at the first failing step."""
+    if returning_user:
+        username, password = returning_user
+    else:
+        username, password = f'funnel-{uuid.uuid4().hex[:12]}', SHOPPER_PASSWORD
+        recorder.call('register', '/api/register/', 201, base_url,
+                      data={'username': username, 'email': f'{username}@example.com', 'password': password})
+    token = recorder.call('token', '/api/token/', 200, base_url,
+                          data={'username': username, 'password': password})['access']
+
+    page = recorder.call('product list', '/api/products/', 200, base_url)
+    products = page['results']
+    if page.get('next') and rng.random() < 0.5:
+        next_page = page['next'].split('/api/products/', 1)[1]
+        products += recorder.call('product list', f'/api/products/{next_page}', 200, base_url)['results']
+    term = rng.choice(SEARCH_TERMS)
+    products += recorder.call('product search', f'/api/products/search/?q={term}', 200, base_url)['results']
+    if not products:
+        raise StepFailed("The catalog is empty: seed it first (benchmarks/seed.py).")
+    for product in rng.sample(products, min(2, len(products))):
+        recorder.call('product detail', f"/api/products/{product['id']}/", 200, base_url)
+
+    in_stock = [product for product in products if product['in_stock']] or products
+    for product in rng.sample(in_stock, min(rng.randint(1, 3), len(in_stock))):
+        recorder.call('cart add', '/api/cart/', 201, base_url, token=token,
+                      data={'product_id': product['id'], 'quantity': rng.randint(1, 2)})
+    recorder.call('cart view', '/api/cart/', 200, base_url, token=token)
+
+    order = recorder.call('order create', '/api/orders/', 201, base_url, token=token, data={},
+                          headers={'Idempotency-Key': uuid.uuid4().hex})
+    recorder.call('payment', '/api/payments/mock-pay/', 200, base_url, token=token,
+                  data={'order_id': order['id']}, headers={'Idempotency-Key': uuid.uuid4().hex})
+    recorder.call('order history', '/api/orders/history/?view=summary', 200, base_url, token=token)
+    with recorder.lock:
+        recorder.completed += 1
+
+
+METRIC_LINE = re.compile(
+    r'^http_request_db_queries_(sum|count)\{view="([^"]*)",method="([^"]*)",status="[^"]*"\} (\S+)$')
+
+
+def queries_per_request(base_url, metrics_token=None):
+    """{(view, method): average queries per request} from /internal/metrics/, or None if unavailable."""
+    request = urllib.request.Request(f'{base_url}/internal/metrics/')
+    if metrics_token:
+        request.add_header('Authorization', f'Bearer {metrics_token}')
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            text = response.read().decode()
+    except OSError:
+        return None
+    totals = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, view, method, value = match.groups()
+            entry = totals.setdefault((view, method), {'sum': 0.0, 'count': 0.0})
+            entry[kind] += float(value)
+    return {key: entry['sum'] / entry['count'] for key, entry in totals.items() if entry['count']}
+
+
+def run(base_url, shoppers, concurrency, returning, seeded_users, metrics_token=None, random_seed=1):
+    recorder = Recorder()
+    rngs = [random.Random(random_seed * 100_003 + index) for index in range(shoppers)]
+    failures = []
+
+    def one(index):
+        rng = rngs[index]
+        returning_user = None
+        if seeded_users and rng.random() < returning:
+            returning_user = (f'{USERNAME_PREFIX}{rng.randrange(seeded_users)}', BENCH_PASSWORD)
+        try:
+            shopper(base_url, recorder, rng, returning_user)
+        except StepFailed as exc:
+            with recorder.lock:
+                failures.append(str(exc))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(shoppers)))
+    elapsed = time.perf_counter() - started
+
+    queries = queries_per_request(base_url, metrics_token)
+    endpoints = {}
+    for step, (method, path, view) in ENDPOINTS.items():
+        samples = recorder.latencies[step]
+        endpoints[step] = {
+            'endpoint': f'{method} {path}',
+            'requests': len(samples),
+            'errors': recorder.errors[step],
+            'rps': len(samples) / elapsed,
+            'p50': percentile(samples, 50),
+            'p95': percentile(samples, 95),
+            'p99': percentile(samples, 99),
+            'queries': None if queries is None else queries.get((view, method)),
+        }
+    return {
+        'url': base_url,
+        'shoppers': shoppers,
+        'concurrency': concurrency,
+        'completed': recorder.completed,
+        'seconds': elapsed,
+        'funnels_per_second': recorder.completed / elapsed,
+        'endpoints': endpoints,
+        'failures': failures[:20],
+    }
+
+
+def print_report(report):
+    print(f"{report['completed']}/{report['shoppers']} funnels completed in {report['seconds']:.1f}s "
+          f"({report['funnels_per_second']:.2f}/s) with {report['concurrency']} client thread(s)\n")
+    print(f"{'step':<15} {'endpoint':<30} {'reqs':>6} {'errors':>6} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    for step, row in report['endpoints'].items():
+        queries = f"{row['queries']:.1f}" if row['queries'] is not None else '-'
+        print(f"{step:<15} {row['endpoint']:<30} {row['requests']:>6} {row['errors']:>6} {row['rps']:>8.1f} "
+              f"{row['p50']:>8.1f} {row['p95']:>8.1f} {row['p99']:>8.1f} {queries:>8}")
+    if report['failures']:
+        print("\nFirst failures:")
+        for failure in report['failures'][:5]:
+            print(f"  {failure}")
+
+
+def regressions(report, baseline, tolerance):
+    """Human-readable regressions of `report` against `baseline`."""
+    found = []
+    for step, row in report['endpoints'].items():
+        before = baseline['endpoints'].get(step)
+        if not before or not before['requests'] or not row['requests']:
+            continue
+        if row['p95'] > before['p95'] * (1 + tolerance):
+            found.append(f"{step}: p95 {before['p95']:.1f}ms -> {row['p95']:.1f}ms")
+        if row['queries'] is not None and before['queries'] is not None and row['queries'] > before['queries'] + 0.5:
+            found.append(f"{step}: {before['queries']:.1f} -> {row['queries']:.1f} queries per request")
+        if row['errors'] > before['errors']:
+            found.append(f"{step}: {before['errors']} -> {row['errors']} errors")
+    return found
+
+
+@contextmanager
+def throwaway_postgres():
+    """
+    Create the database `<DB_NAME>_funnel` on the server the DB_* settings
+    point at, and drop it afterwards; yields its name. The configured
+    database itself is only connected to, never written.
+    """
+    django_setup.setup()
+    from django.db import connection
+
+    name = connection.settings_dict['NAME'] + FUNNEL_DB_SUFFIX
+    quoted = connection.ops.quote_name(name)
+    with connection.cursor() as cursor:
+        # Left over by an interrupted run (the suffix makes it ours).
+        cursor.execute(f'DROP DATABASE IF EXISTS {quoted}')
+        cursor.execute(f'CREATE DATABASE {quoted}')
+    try:
+        yield name
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS {quoted}')
+        connection.close()
+
+
+@contextmanager
+def spawned_app(database, workers, seed_arguments):
+    """Migrate, seed and serve a throwaway database with gunicorn; yield the URL."""
+    with tempfile.TemporaryDirectory() as directory, ExitStack() as stack:
+        env = dict(os.environ, DEBUG='False', LOG_LEVEL='WARNING', SLOW_REQUEST_MS='100000')
+        env.setdefault('SECRET_KEY', 'benchmark-secret-key')
+        if database == 'sqlite':
+            env.update(DB_ENGINE='sqlite', SQLITE_PATH=os.path.join(directory, 'funnel.sqlite3'))
+        else:
+            env['DB_NAME'] = stack.enter_context(throwaway_postgres())
+        manage = [sys.executable, 'manage.py']
+        subprocess.run(manage + ['migrate', '-v', '0'], env=env, check=True)
+        subprocess.run([sys.executable, '-m', 'benchmarks.seed', *seed_arguments], env=env, check=True)
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'config.wsgi:application', '--workers', str(workers),
+             '--bind', SPAWN_URL.removeprefix('http://'), '--log-level', 'warning'],
+            env=env,
+        )
+        try:
+            wait_until_up(SPAWN_URL)
+            yield SPAWN_URL
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Base URL of a running, seeded deployment.")
+    parser.add_argument('--spawn', choices=('sqlite', 'postgres'),
+                        help="Migrate, seed and serve a database locally instead of using --url.")
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn workers with --spawn.")
+    parser.add_argument('--products', type=int, default=2000, help="Products seeded with --spawn.")
+    parser.add_argument('--users', type=int, default=200,
+                        help="Users seeded with --spawn (or already seeded at --url): the returning customers.")
+    parser.add_argument('--shoppers', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--returning', type=float, default=0.5,
+                        help="Share of shoppers who log in as a seeded user instead of registering.")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed of the data and the shoppers.")
+    parser.add_argument('--metrics-token', help="METRICS_TOKEN of the app, to read the query counts.")
+    parser.add_argument('--json', help="Also write the report to this file.")
+    parser.add_argument('--baseline', help="An earlier --json report to compare with.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative p95 growth against the baseline.")
+    args = parser.parse_args()
+    if bool(args.url) == bool(args.spawn):
+        parser.error("pass either --url or --spawn")
+
+    def measure(base_url):
+        return run(base_url, args.shoppers, args.concurrency, args.returning, args.users,
+                   args.metrics_token, args.seed)
+
+    if args.spawn:
+        seed_arguments = ['--products', str(args.products), '--users', str(args.users),
+                          '--carts', str(args.users // 2), '--orders', str(args.users * 5),
+                          '--seed', str(args.seed)]
+        with spawned_app(args.spawn, args.workers, seed_arguments) as base_url:
+            report = measure(base_url)
+    else:
+        report = measure(args.url.rstrip('/'))
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            found = regressions(report, json.load(baseline_file), args.tolerance)
+        if found:
+            print("\nRegressions against the baseline:")
+            for regression in found:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# In benchmarks/image_variants.py
+"""
+Throughput of product image variant generation (products/images.py):
+images per second turned into the full set of VARIANTS, one at a time and
+with a thread pool, plus the bytes saved:
+
+    python -m benchmarks.image_variants --images 24 --size 2400x1600 --workers 1,2,4
+
+The source images are synthetic photos (noise over a gradient, so they
+compress like real ones) written as JPEG to a temporary directory; the
+variants go to the same throwaway storage. No database is needed.
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import django_setup
+
+
+def synthetic_photo(width, height, seed):
+    from PIL import Image, ImageChops
+
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40 + seed % 20)
+    red = ImageChops.add(gradient, noise, scale=2)
+    image = Image.merge('RGB', (red, gradient.rotate(90, expand=False), noise))
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+def run(images, size, workers_list):
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import FileSystemStorage
+    from products.images import VARIANTS, VARIANTS_DIR, build_variants
+
+    width, height = size
+    with tempfile.TemporaryDirectory() as directory:
+        storage = FileSystemStorage(location=directory)
+        sources = [storage.save(f'product_images/photo{i}.jpg', ContentFile(synthetic_photo(width, height, i)))
+                   for i in range(images)]
+        source_bytes = sum(storage.size(name) for name in sources)
+        print(f"{images} source images of {width}x{height}, {source_bytes / images / 1024:.0f} KiB each, "
+              f"{len(VARIANTS)} variants per image")
+
+        for workers in workers_list:
+            # Variants are skipped when their (content-hashed) file exists:
+            # start every run from an empty variants directory.
+            shutil.rmtree(storage.path(VARIANTS_DIR), ignore_errors=True)
+            started = time.perf_counter()
+            if workers == 1:
+                results = [build_variants(storage, name) for name in sources]
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(lambda name: build_variants(storage, name), sources))
+            elapsed = time.perf_counter() - started
+            print(f"workers={workers:<3} {images / elapsed:8.1f} images/s "
+                  f"{images * len(VARIANTS) / elapsed:8.1f} variants/s  ({elapsed * 1000 / images:.1f} ms per image)")
+
+        print("\nAverage size per variant:")
+        for variant in VARIANTS:
+            sizes = [storage.size(result[variant.name]) for result in results]
+            print(f"  {variant.name:<16} {sum(sizes) / len(sizes) / 1024:8.1f} KiB "
+                  f"({sum(sizes) / source_bytes:6.1%} of the original)")
+
+
+def parse_size(text):
+    width, _, height = text.partition('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=24)
+    parser.add_argument('--size', type=parse_size, default=(2400, 1600), help="WIDTHxHEIGHT of the sources.")
+    parser.add_argument('--workers', default=f'1,2,{os.cpu_count() or 4}',
+                        help="Comma-separated thread counts to compare.")
+    args = parser.parse_args()
+
+    django_setup.setup()
+    run(args.images, args.size, [int(value) for value in args.workers.split(',')])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# In benchmarks/import_throughput.py
+"""
+Rows/second of the bulk catalog pipeline (products/bulk.py), in-process
+against a throwaway test database:
+
+    DB_ENGINE=sqlite python -m benchmarks.import_throughput --rows 200000
+
+Measures, in order: a first import (every row is an INSERT), a second
+import of the same file (every row is an UPDATE), and a full export.
+`--compare-single N` also times N rows saved one by one through
+ProductWriteSerializer, the way the create endpoint does it.
+"""
+import argparse
+import io
+import time
+
+from benchmarks import django_setup
+
+
+def make_feed(rows, categories, file_format):
+    from products import bulk
+    feed = (
+        {
+            'sku': f'SKU-{i:08d}',
+            'name': f'Product {i}',
+            'description': f'Generated product number {i}.',
+            'price': f'{(i % 5000) / 10 + 1:.2f}',
+            'category': f'Category {i % categories}',
+            'in_stock': i % 7 != 0,
+        }
+        for i in range(rows)
+    )
+    return ''.join(bulk.serialize_rows(feed, file_format))
+
+
+def report(label, rows, elapsed):
+    print(f"{label:<22} {rows:>9} rows  {elapsed:7.2f}s  {rows / elapsed:9.0f} rows/s")
+
+
+def run(rows, categories, chunk_size, file_format, compare_single):
+    from products import bulk
+    from products.models import Category, Product
+    from products.serializers import ProductWriteSerializer
+
+    Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(categories)])
+    feed = make_feed(rows, categories, file_format)
+
+    for label in ('import (insert)', 'import (update)'):
+        started = time.perf_counter()
+        result = bulk.import_products(bulk.read_rows(io.StringIO(feed), file_format), chunk_size=chunk_size)
+        report(label, result.processed, time.perf_counter() - started)
+        assert result.failed == 0, result.errors[:5]
+
+    started = time.perf_counter()
+    exported = sum(1 for _ in bulk.serialize_rows(bulk.export_rows(), 'jsonl'))
+    report('export', exported, time.perf_counter() - started)
+
+    if compare_single:
+        category = Category.objects.first()
+        started = time.perf_counter()
+        for i in range(compare_single):
+            serializer = ProductWriteSerializer(data={
+                'name': f'Single {i}', 'description': '...', 'price': '1.00',
+                'category': category.id, 'in_stock': True,
+            })
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        report('one by one', compare_single, time.perf_counter() - started)
+    print(f"{Product.objects.count()} products in the database.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+    parser.add_argument('--compare-single', type=int, default=0, metavar='N')
+    args = parser.parse_args()
+
+    django_setup.setup()
+    with django_setup.test_database():
+        run(args.rows, args.categories, args.chunk_size, args.format, args.compare_single)
+
+
+if __name__ == '__main__':
+    main()
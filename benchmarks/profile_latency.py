@@ -0,0 +1,57 @@
+# In benchmarks/profile_latency.py
+"""
+Compare the latency of GET /api/profile/ between two running deployments,
+typically the same app with and without persistent/pooled connections:
+
+    # Terminal 1: connections closed after every request
+    DB_CONN_MAX_AGE=0 gunicorn config.wsgi:application --bind 0.0.0.0:8000
+    # Terminal 2: persistent connections (the default) or DB_POOL_MODE=psycopg
+    gunicorn config.wsgi:application --bind 0.0.0.0:8001
+
+    python -m benchmarks.profile_latency --username alice --password secret \\
+        --url http://localhost:8000 --url http://localhost:8001 --requests 2000
+
+Each deployment gets a warm-up, then `--requests` sequential GETs (or spread
+over `--concurrency` threads) and prints mean/p50/p95/p99 latency.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import format_summary, obtain_token, request_json, summarize, timed
+
+
+def measure(base_url, token, requests, concurrency, warmup):
+    url = f'{base_url}/api/profile/'
+    for _ in range(warmup):
+        request_json(url, token=token)
+
+    def one(_):
+        (status, _, _), elapsed = timed(request_json, url, token=token)
+        if status != 200:
+            raise SystemExit(f"GET {url} returned HTTP {status}")
+        return elapsed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', action='append', required=True,
+                        help="Base URL of a deployment; repeat to compare several.")
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=20)
+    args = parser.parse_args()
+
+    for base_url in args.url:
+        base_url = base_url.rstrip('/')
+        token = obtain_token(base_url, args.username, args.password)
+        samples = measure(base_url, token, args.requests, args.concurrency, args.warmup)
+        print(format_summary(base_url, summarize(samples)))
+
+
+if __name__ == '__main__':
+    main()
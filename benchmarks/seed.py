@@ -0,0 +1,150 @@
+# In benchmarks/seed.py
+"""
+Fill the configured database with a reproducible shop for benchmarking:
+categories, products (optionally stock-tracked), users, carts with items
+and past orders with their items.
+
+    DB_ENGINE=sqlite SQLITE_PATH=/tmp/bench.sqlite3 python manage.py migrate
+    DB_ENGINE=sqlite SQLITE_PATH=/tmp/bench.sqlite3 python -m benchmarks.seed \\
+        --categories 20 --products 5000 --users 500 --carts 200 --orders 2000
+
+It writes to the database the settings point at (SQLite or a local
+Postgres, like manage.py), so run it on a throwaway database. The same
+`--seed` always produces the same data. Users are `bench-user-<n>` with the
+password BENCH_PASSWORD, which the workload driver (benchmarks/funnel.py)
+logs in with.
+
+Everything is written with bulk_create, in chunks, so no signals run; the
+work those signals and services do (search vectors, the cart totals, the
+order event log of the analytics app, the catalog validators) is done here
+in bulk.
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from benchmarks import django_setup
+
+BENCH_PASSWORD = 'bench-password-1'
+USERNAME_PREFIX = 'bench-user-'
+CHUNK_SIZE = 2000
+
+WORDS = ('classic deluxe compact wireless organic vintage smart travel family pro mini ultra '
+         'linen steel bamboo ceramic leather cotton modern rustic').split()
+NOUNS = ('lamp chair kettle backpack novel puzzle jacket speaker blender notebook bottle '
+         'headphones desk rug mug camera watch scarf pan board').split()
+
+
+def chunked(objects, size=CHUNK_SIZE):
+    for start in range(0, len(objects), size):
+        yield objects[start:start + size]
+
+
+def bulk_create(model, objects):
+    created = []
+    for chunk in chunked(objects):
+        created += model.objects.bulk_create(chunk)
+    return created
+
+
+def seed(categories, products, users, carts, orders, stock=None, random_seed=1):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from analytics.models import OrderStatusEvent
+    from cart.models import Cart, CartItem
+    from cart.services import recalculate_totals
+    from inventory.models import StockShard
+    from orders.models import Order, OrderItem
+    from products.conditional import bump_collection
+    from products.models import Category, Product
+    from products.search import update_search_vectors
+
+    rng = random.Random(random_seed)
+    with transaction.atomic():
+        category_rows = bulk_create(Category, [Category(name=f'Category {i}') for i in range(categories)])
+
+        product_rows = bulk_create(Product, [
+            Product(
+                category=rng.choice(category_rows),
+                sku=f'BENCH-{i:07d}',
+                name=f'{rng.choice(WORDS).title()} {rng.choice(WORDS)} {rng.choice(NOUNS)} {i}',
+                description=' '.join(rng.choice(WORDS + NOUNS) for _ in range(rng.randint(8, 30))),
+                price=Decimal(rng.randint(99, 99999)) / 100,
+                in_stock=rng.random() > 0.1,
+            )
+            for i in range(products)
+        ])
+        update_search_vectors(Product.objects.filter(sku__startswith='BENCH-'))
+        if stock is not None:
+            bulk_create(StockShard, [
+                StockShard(product=product, shard=0, quantity=stock) for product in product_rows
+            ])
+
+        # Hashing is slow on purpose; every benchmark user shares one hash.
+        password = make_password(BENCH_PASSWORD)
+        user_rows = bulk_create(User, [
+            User(username=f'{USERNAME_PREFIX}{i}', email=f'{USERNAME_PREFIX}{i}@example.com', password=password)
+            for i in range(users)
+        ])
+
+        cart_rows = bulk_create(Cart, [Cart(user=user) for user in user_rows[:carts]])
+        cart_items = []
+        for cart in cart_rows:
+            for product in rng.sample(product_rows, min(rng.randint(1, 5), len(product_rows))):
+                cart_items.append(CartItem(cart=cart, product=product, quantity=rng.randint(1, 3)))
+        bulk_create(CartItem, cart_items)
+        recalculate_totals(Cart.objects.all())
+
+        statuses = [choice for choice, _ in Order.OrderStatus.choices]
+        order_lines = []
+        for _ in range(orders if user_rows and product_rows else 0):
+            lines = [(product, rng.randint(1, 3))
+                     for product in rng.sample(product_rows, min(rng.randint(1, 4), len(product_rows)))]
+            order_lines.append((Order(
+                user=rng.choice(user_rows),
+                status=rng.choice(statuses),
+                total_price=sum(product.price * quantity for product, quantity in lines),
+            ), lines))
+        order_rows = bulk_create(Order, [order for order, _ in order_lines])
+        bulk_create(OrderItem, [
+            OrderItem(order=order, product=product, quantity=quantity, price_at_purchase=product.price)
+            for order, (_, lines) in zip(order_rows, order_lines) for product, quantity in lines
+        ])
+        # The analytics rollups are computed from the event log: one
+        # "placed" event per order, as analytics/signals.py would have written.
+        bulk_create(OrderStatusEvent, [
+            OrderStatusEvent(order=order, old_status=None, new_status=order.status) for order in order_rows
+        ])
+        bump_collection()
+
+    return {'categories': len(category_rows), 'products': len(product_rows), 'users': len(user_rows),
+            'carts': len(cart_rows), 'cart_items': len(cart_items), 'orders': len(order_rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--carts', type=int, default=100, help="How many of the users have a filled cart.")
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--stock', type=int,
+                        help="Track the stock of every product, starting at this quantity "
+                             "(default: untracked, i.e. unlimited).")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed (same seed, same data).")
+    args = parser.parse_args()
+    if args.carts > args.users:
+        parser.error("--carts cannot exceed --users")
+
+    django_setup.setup()
+    started = time.perf_counter()
+    counts = seed(args.categories, args.products, args.users, args.carts, args.orders,
+                  stock=args.stock, random_seed=args.seed)
+    print(', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+          + f' created in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
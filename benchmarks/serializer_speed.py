@@ -0,0 +1,103 @@
+# In benchmarks/serializer_speed.py
+"""
+Microbenchmark: DRF serializers versus the fast `.values()` serializers of
+core/fastserializers.py, in milliseconds per 1,000 objects:
+
+    DB_ENGINE=sqlite python -m benchmarks.serializer_speed --objects 1000 --repeat 20
+
+"serialize" times only the conversion of already-loaded data (model
+instances for DRF, `.values()` rows for the fast serializers);
+"load+serialize" includes the queries.
+"""
+import argparse
+import time
+
+from benchmarks import django_setup
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def populate(objects):
+    from django.contrib.auth.models import User
+    from cart.models import Cart, CartItem
+    from orders.models import Order, OrderItem
+    from products.models import Category, Product
+
+    user = User.objects.create_user('bench', 'bench@example.com', 'bench-password-1')
+    category = Category.objects.create(name='Benchmark')
+    products = Product.objects.bulk_create([
+        Product(name=f'Product {i}', description='A benchmark product.', price=f'{i % 500}.99',
+                category=category, image=f'product_images/{i}.jpg' if i % 2 else None)
+        for i in range(objects)
+    ])
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=2) for product in products])
+    orders = Order.objects.bulk_create([Order(user=user, total_price='42.00') for _ in range(objects)])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=products[(i + k) % objects], quantity=1, price_at_purchase='9.99')
+        for i, order in enumerate(orders) for k in range(3)
+    ])
+
+
+def run(objects, repeat):
+    from rest_framework.test import APIRequestFactory
+    from cart.models import CartItem
+    from cart.serializers import CartItemFastSerializer, CartItemSerializer
+    from orders.serializers import OrderFastSerializer, OrderSerializer
+    from orders.services import order_with_items_queryset
+    from products.models import Product
+    from products.serializers import ProductFastSerializer, ProductSerializer
+
+    populate(objects)
+    context = {'request': APIRequestFactory().get('/api/products/')}
+    cases = [
+        ('products', Product.objects.select_related('category').order_by('id'),
+         ProductSerializer, ProductFastSerializer),
+        ('cart items', CartItem.objects.select_related('product').order_by('id'),
+         CartItemSerializer, CartItemFastSerializer),
+        ('orders (3 items each)', order_with_items_queryset().order_by('id'),
+         OrderSerializer, OrderFastSerializer),
+    ]
+    scale = 1000 / objects * 1000  # seconds for `objects` -> ms per 1,000
+
+    print(f"{'':<22} {'serialize (ms/1k)':>22} {'load+serialize (ms/1k)':>26}")
+    print(f"{'':<22} {'DRF':>10} {'fast':>10} {'DRF':>12} {'fast':>12}")
+    for label, queryset, drf_class, fast_class in cases:
+        fast = fast_class(context=context)
+        instances = list(queryset.all())
+        rows = list(fast.values(queryset.all()))
+
+        drf_only = best_of(repeat, lambda: drf_class(instances, many=True, context=context).data)
+        if label.startswith('orders'):
+            # The items are attached (and queried) inside serialize_many.
+            fast_only = None
+        else:
+            fast_only = best_of(repeat, lambda: fast.serialize_many(rows))
+        drf_full = best_of(repeat, lambda: drf_class(list(queryset.all()), many=True, context=context).data)
+        fast_full = best_of(repeat, lambda: fast.serialize_many(fast.values(queryset.all())))
+
+        fast_only_text = f'{fast_only * scale:10.2f}' if fast_only is not None else f"{'-':>10}"
+        print(f"{label:<22} {drf_only * scale:10.2f} {fast_only_text} "
+              f"{drf_full * scale:12.2f} {fast_full * scale:12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    django_setup.setup()
+    with django_setup.test_database():
+        run(args.objects, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+# In cart/async_urls.py
+from django.urls import path
+from .async_views import AsyncCartView
+
+urlpatterns = [
+    path('', AsyncCartView.as_view(), name='async-cart-detail'),
+]
@@ -0,0 +1,70 @@
+# In cart/async_views.py
+# Async version of CartView (see core/async_views.py), served under
+# /api/async/cart/ with the same requests, responses and status codes.
+#
+# Reads use the async ORM. Writes need a transaction (stock reservations,
+# bulk item changes), which Django only offers to sync code, so they run
+# `apply_cart_changes` through `sync_to_async`.
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import permissions, status
+from core.async_views import AsyncAPIView
+from inventory.services import OutOfStockError
+from .models import Cart, CartItem, Product
+from .serializers import CartFastSerializer
+from .services import UnknownProductsError, apply_cart_changes
+
+
+class AsyncCartView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request, *args, **kwargs):
+        cart, _ = await Cart.objects.aget_or_create(user_id=request.user.id)
+        return self.render(await CartFastSerializer().ato_representation(cart))
+
+    async def post(self, request, *args, **kwargs):
+        # Same validation and messages as CartView.post.
+        try:
+            quantity = int(request.data.get('quantity', 1))
+            if quantity <= 0:
+                return self.render({"error": "Quantity must be a positive integer."},
+                                   status.HTTP_400_BAD_REQUEST)
+        except (ValueError, TypeError):
+            return self.render({"error": "Invalid quantity provided."}, status.HTTP_400_BAD_REQUEST)
+
+        product_id = self._product_id(request)
+        if product_id is None:
+            return self.render({"error": "Product ID is required."}, status.HTTP_400_BAD_REQUEST)
+        if not await Product.objects.filter(id=product_id).aexists():
+            return self.render({"error": "Product not found."}, status.HTTP_404_NOT_FOUND)
+
+        cart, _ = await Cart.objects.aget_or_create(user_id=request.user.id)
+        existed = await CartItem.objects.filter(cart=cart, product_id=product_id).aexists()
+        try:
+            await sync_to_async(apply_cart_changes)(cart, {product_id: quantity})
+        except UnknownProductsError:
+            # Deleted since the check above.
+            return self.render({"error": "Product not found."}, status.HTTP_404_NOT_FOUND)
+        except OutOfStockError:
+            return self.render({"error": "Not enough stock."}, status.HTTP_409_CONFLICT)
+
+        status_code = status.HTTP_200_OK if existed else status.HTTP_201_CREATED
+        return self.render(await CartFastSerializer().ato_representation(cart), status_code)
+
+    async def delete(self, request, *args, **kwargs):
+        product_id = self._product_id(request)
+        if product_id is None:
+            return self.render({"error": "Product ID is required."}, status.HTTP_400_BAD_REQUEST)
+
+        cart = await Cart.objects.filter(user_id=request.user.id, items__product_id=product_id).afirst()
+        if cart is None:
+            return self.render({"error": "Item not found in cart."}, status.HTTP_404_NOT_FOUND)
+        await sync_to_async(apply_cart_changes)(cart, {product_id: 0})
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def _product_id(request):
+        try:
+            return int(request.data.get('product_id'))
+        except (TypeError, ValueError):
+            return None
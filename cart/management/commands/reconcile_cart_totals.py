@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from cart.services import reconcile_totals
+
+
+class Command(BaseCommand):
+    help = "Find carts whose item count or subtotal drifted from their items, and fix them (see cart/services.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report the drifted carts, don't fix them.")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Carts checked (and fixed) per transaction.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, checking again after every interval.")
+        parser.add_argument('--interval', type=float, default=3600.0,
+                            help="Seconds between runs (with --loop).")
+
+    def handle(self, *args, **options):
+        while True:
+            drifted = reconcile_totals(options['batch_size'], fix=not options['dry_run'])
+            if drifted:
+                verb = "Found" if options['dry_run'] else "Fixed"
+                shown = ', '.join(map(str, drifted[:20])) + (', ...' if len(drifted) > 20 else '')
+                self.stdout.write(f"{verb} {len(drifted)} cart(s) with drifted totals: {shown}")
+            else:
+                self.stdout.write("All cart totals match their items.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
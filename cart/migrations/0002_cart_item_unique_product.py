@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:33
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def merge_duplicate_items(apps, schema_editor):
+    # Older code could (rarely) create the same product twice in a cart.
+    # Keep the newest row of each pair so the constraint can be added.
+    CartItem = apps.get_model('cart', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('cart_id', 'product_id')
+        .annotate(keep=Max('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        (CartItem.objects
+            .filter(cart_id=duplicate['cart_id'], product_id=duplicate['product_id'])
+            .exclude(id=duplicate['keep'])
+            .delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+        ('products', '0005_product_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
@@ -10,6 +10,13 @@ class Cart(models.Model):
     # Using settings.AUTH_USER_MODEL makes the app compatible with custom user models.
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized totals of the items (quantities added up, and the sum of
+    # price x quantity at the current prices), so the cart header (e.g. the
+    # navbar badge) is a single-row read. They are kept up to date with F()
+    # updates in cart/services.py, and `manage.py reconcile_cart_totals`
+    # repairs any drift (e.g. items written with bulk_create).
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
 
     def __str__(self):
         return f"Cart for {self.user.username}"
@@ -22,6 +29,13 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            # A product appears at most once per cart; its quantity changes instead.
+            # Bulk updates rely on this to match incoming lines to existing rows.
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.product.name} in {self.cart.user.username}'s cart"
 
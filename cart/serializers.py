@@ -1,5 +1,7 @@
 # In cart/serializers.py
+from django.conf import settings
 from rest_framework import serializers
+from core.fastserializers import FastSerializer
 from .models import Cart, CartItem
 from products.models import Product
 
@@ -25,6 +27,35 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_id', 'quantity']
 
 
+# One line of a bulk cart update. A quantity of 0 removes the product.
+class CartLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0)
+
+
+# The body of a bulk cart update: lines to set and product ids to remove.
+class CartBulkUpdateSerializer(serializers.Serializer):
+    items = CartLineSerializer(many=True, required=False, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        product_ids = [line['product_id'] for line in attrs['items']] + attrs['remove']
+        if not product_ids:
+            raise serializers.ValidationError("Nothing to update.")
+        if len(product_ids) > settings.CART_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f"At most {settings.CART_BULK_MAX_ITEMS} products can be changed at once.")
+        if len(set(product_ids)) != len(product_ids):
+            raise serializers.ValidationError("Each product may only appear once.")
+        return attrs
+
+    def changes(self):
+        """The validated request as {product_id: quantity}, 0 meaning remove."""
+        changes = {line['product_id']: line['quantity'] for line in self.validated_data['items']}
+        changes.update(dict.fromkeys(self.validated_data['remove'], 0))
+        return changes
+
+
 # This is the main serializer for the entire shopping cart.
 class CartSerializer(serializers.ModelSerializer):
     # 'items' is the `related_name` we set in the CartItem model's ForeignKey.
@@ -41,5 +72,63 @@ class CartSerializer(serializers.ModelSerializer):
     def get_total_price(self, cart: Cart):
         # Calculate the total price by summing up the price of each item * quantity.
         # `cart.items.all()` works because of the `related_name='items'` we defined.
+        # Carts loaded via `cart.services.load_cart` already hold the items and
+        # their products in memory, so this loop does not touch the database.
         return sum(item.product.price * item.quantity for item in cart.items.all())
 
+
+# The cart header (e.g. the navbar badge): only the denormalized totals
+# kept on the cart row (see cart/services.py), no items.
+class CartSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Cart
+        fields = ['item_count', 'subtotal']
+
+
+# Fast equivalents of CartItemSerializer and CartSerializer, built from
+# `.values()` rows (see core/fastserializers.py). Keep them in sync.
+class CartItemFastSerializer(FastSerializer):
+    model = CartItem
+    fields = {
+        'id': 'id',
+        'product': {'id': 'product_id', 'name': 'product__name', 'price': 'product__price'},
+        'quantity': 'quantity',
+    }
+
+
+class CartFastSerializer:
+    def __init__(self, context=None):
+        self.items = CartItemFastSerializer(context)
+
+    def _item_rows(self, cart):
+        # One query: the cart items joined with their products.
+        return self.items.values(CartItem.objects.filter(cart=cart).order_by('id'))
+
+    def _build(self, cart, rows):
+        return {
+            'id': cart.id,
+            'items': self.items.serialize_many(rows),
+            'total_price': sum(row['product__price'] * row['quantity'] for row in rows),
+        }
+
+    def to_representation(self, cart):
+        return self._build(cart, list(self._item_rows(cart)))
+
+    async def ato_representation(self, cart):
+        # For async views: the same, read with the async ORM.
+        return self._build(cart, [row async for row in self._item_rows(cart)])
+
+
+def session_cart_representation(token, lines):
+    """
+    A session cart (see cart/session.py) shaped like CartSerializer's output:
+    the products are read in one query, lines of deleted products are left out.
+    """
+    products = Product.objects.filter(id__in=lines).only('id', 'name', 'price').order_by('id')
+    items = [{'product': SimpleProductSerializer(product).data, 'quantity': lines[product.id]}
+             for product in products]
+    return {
+        'token': token,
+        'items': items,
+        'total_price': sum(product.price * lines[product.id] for product in products),
+    }
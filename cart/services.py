@@ -0,0 +1,238 @@
+# In cart/services.py
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    DecimalField, F, OuterRef, PositiveIntegerField, Prefetch, Subquery, Sum, Value, prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce, Round
+from inventory.services import reserve_many, tracked_shards
+from products.models import Product
+from .models import Cart, CartItem
+from .session import get_cart_store
+
+
+class UnknownProductsError(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Unknown products: {self.product_ids}")
+
+
+# Every place that reads a cart for display should go through these helpers.
+# They load the items AND their products up front, so serializing the cart
+# never goes back to the database (no N+1 queries, whatever the cart size).
+def cart_items_prefetch():
+    # One query: cart items JOINed with their product rows.
+    return Prefetch(
+        'items',
+        queryset=CartItem.objects.select_related('product').order_by('id'),
+    )
+
+
+def load_cart(user):
+    """
+    Return the user's cart (creating it if needed) with items and products
+    already loaded: one query for the cart, one for the items + products.
+    """
+    cart, _ = Cart.objects.prefetch_related(cart_items_prefetch()).get_or_create(user_id=user.id)
+    if not hasattr(cart, '_prefetched_objects_cache'):
+        # A freshly created cart skipped the prefetch; load it the same way.
+        prefetch_related_objects([cart], cart_items_prefetch())
+    return cart
+
+
+def refresh_cart_items(cart):
+    """
+    Re-load the items of a cart we already have in memory (e.g. after a
+    write), without fetching the cart row again.
+    """
+    if hasattr(cart, '_prefetched_objects_cache'):
+        cart._prefetched_objects_cache.pop('items', None)
+    prefetch_related_objects([cart], cart_items_prefetch())
+    return cart
+
+
+def apply_cart_changes(cart, changes):
+    """
+    Apply many cart changes at once. `changes` maps product ids to their new
+    quantity; 0 removes the product from the cart.
+
+    The query count does not depend on the number of lines:
+
+    - one `IN` query checks that every product being added exists (and
+      reads the prices),
+    - one query loads the matching cart items,
+    - one `bulk_create`, one `bulk_update` and one `DELETE` write them,
+    - one UPDATE adjusts the cart's totals,
+
+    plus the stock reservations of stock-tracked products (inventory app):
+    a lookup of the shards, a locked read and one write per kind for the
+    reservations, and one stock UPDATE per product whose reservation moves.
+    Everything runs in one transaction: if any product is missing
+    (UnknownProductsError) or out of stock (OutOfStockError), nothing changes.
+    """
+    added = [product_id for product_id, quantity in changes.items() if quantity > 0]
+
+    with transaction.atomic():
+        # Lock the cart row so concurrent updates of the same cart run one
+        # after the other and never race to insert the same product twice.
+        Cart.objects.select_for_update().filter(pk=cart.pk).exists()
+
+        # Read under the lock: a price change reprices the carts holding the
+        # product under the same lock (see `reprice_carts`), so the subtotal
+        # moves by the price that is current for this cart.
+        prices = dict(Product.objects.filter(id__in=changes).values_list('id', 'price'))
+        missing = set(added) - set(prices)
+        if missing:
+            raise UnknownProductsError(missing)
+
+        existing = {
+            item.product_id: item
+            for item in CartItem.objects.filter(cart=cart, product_id__in=changes)
+        }
+
+        # Only stock-tracked products need a reservation; look them all up at once.
+        reserve_many(cart.id, changes, tracked_shards(list(changes)))
+
+        to_create, to_update, to_delete, quantity_delta, subtotal_delta = _diff_items(cart, existing, changes, prices)
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity'])
+        if to_delete:
+            CartItem.objects.filter(pk__in=to_delete).delete()
+        adjust_totals(cart.pk, quantity_delta, subtotal_delta)
+    return cart
+
+
+def _diff_items(cart, existing, changes, prices):
+    """
+    Compare `changes` with the `existing` items (by product id): the items to
+    create, update and delete (by pk), and how much the cart's item count and
+    subtotal move.
+    """
+    to_create, to_update, to_delete = [], [], []
+    quantity_delta, subtotal_delta = 0, Decimal('0')
+    for product_id, quantity in changes.items():
+        item = existing.get(product_id)
+        change = quantity - (item.quantity if item else 0)
+        if change:
+            quantity_delta += change
+            subtotal_delta += change * prices[product_id]
+        if quantity == 0:
+            if item:
+                to_delete.append(item.pk)
+        elif item is None:
+            to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+        elif item.quantity != quantity:
+            item.quantity = quantity
+            to_update.append(item)
+    return to_create, to_update, to_delete, quantity_delta, subtotal_delta
+
+
+# --- Denormalized totals ---------------------------------------------------
+# Cart.item_count and Cart.subtotal follow the items. Every write of cart
+# items locks the cart row first (select_for_update) and moves the totals
+# with an F() update in the same transaction, so they never go through a
+# read-modify-write in Python. Writes that can't know the change (a product's
+# new price, bulk loads) recompute the totals from the items instead, under
+# the same locks (`reprice_carts`).
+
+def adjust_totals(cart_id, quantity_delta, subtotal_delta):
+    """Add to a cart's totals, in one UPDATE (nothing to do for a zero change)."""
+    if quantity_delta or subtotal_delta:
+        Cart.objects.filter(pk=cart_id).update(
+            item_count=F('item_count') + quantity_delta,
+            subtotal=F('subtotal') + subtotal_delta,
+        )
+
+
+def _item_totals():
+    """(item count, subtotal) subqueries over the items of the outer cart row."""
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    count = items.annotate(total=Sum('quantity')).values('total')
+    subtotal = items.annotate(
+        total=Sum(F('quantity') * F('product__price'), output_field=Cart._meta.get_field('subtotal')),
+    ).values('total')
+    return (
+        Coalesce(Subquery(count), Value(0), output_field=PositiveIntegerField()),
+        Coalesce(Subquery(subtotal), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2)),
+    )
+
+
+def recalculate_totals(carts):
+    """Recompute the totals of the `carts` queryset from their items, in one UPDATE."""
+    item_count, subtotal = _item_totals()
+    return carts.update(item_count=item_count, subtotal=subtotal)
+
+
+def reprice_carts(product_ids):
+    """
+    Recompute the totals of the carts holding any of `product_ids`, after
+    their prices changed. The carts are locked first, in primary key order,
+    like every other write of cart totals.
+    """
+    # Usually inside the transaction of the product save; no savepoint needed.
+    with transaction.atomic(savepoint=False):
+        cart_ids = list(
+            Cart.objects.filter(items__product_id__in=product_ids)
+            .select_for_update(of=('self',)).order_by('pk').values_list('pk', flat=True)
+        )
+        if cart_ids:
+            recalculate_totals(Cart.objects.filter(pk__in=cart_ids))
+    return len(cart_ids)
+
+
+def drifted_carts(carts=None):
+    """The carts (default: all) whose stored totals don't match their items."""
+    item_count, subtotal = _item_totals()
+    carts = Cart.objects.all() if carts is None else carts
+    # Compared rounded to the cent: SQLite does decimal arithmetic in floating point.
+    return (carts.annotate(stored_subtotal=Round('subtotal', 2), expected_count=item_count,
+                           expected_subtotal=Round(subtotal, 2))
+            .exclude(item_count=F('expected_count'), stored_subtotal=F('expected_subtotal')))
+
+
+def reconcile_totals(batch_size=1000, fix=True):
+    """
+    Look for carts whose totals drifted from their items, in primary key
+    batches, and (unless `fix` is False) recompute them. Each batch is fixed
+    in its own transaction, under the same row lock cart writes take.
+    Returns the ids of the drifted carts.
+    """
+    drifted = []
+    last_id = 0
+    while True:
+        ids = list(Cart.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return drifted
+        found = list(drifted_carts(Cart.objects.filter(pk__gt=last_id, pk__lte=ids[-1]))
+                     .order_by('pk').values_list('pk', flat=True))
+        if found and fix:
+            with transaction.atomic():
+                list(Cart.objects.select_for_update().filter(pk__in=found).values_list('pk'))
+                recalculate_totals(Cart.objects.filter(pk__in=found))
+        drifted += found
+        last_id = ids[-1]
+
+
+def merge_session_cart(user, token):
+    """
+    Move an anonymous session cart (see cart/session.py) into the user's
+    Cart, at login or checkout. Its lines are SET on the cart, like
+    `apply_cart_changes`; products that no longer exist are dropped.
+
+    The session cart is cleared once merged. If a product is out of stock,
+    OutOfStockError propagates and the session cart is left as it was.
+    Returns the user's cart, or None if there was nothing to merge.
+    """
+    store = get_cart_store()
+    lines = store.get(token)
+    if not lines:
+        return None
+    existing = set(Product.objects.filter(id__in=lines).values_list('id', flat=True))
+    cart, _ = Cart.objects.get_or_create(user_id=user.id)
+    apply_cart_changes(cart, {product_id: quantity for product_id, quantity in lines.items()
+                              if product_id in existing})
+    store.clear(token)
+    return cart
@@ -0,0 +1,130 @@
+# In cart/session.py
+"""
+Carts of anonymous shoppers, kept in a key-value store instead of the
+Cart/CartItem tables.
+
+Browsing shoppers add and remove things all the time, and most of them
+never log in. Their carts live in a fast store under an opaque *cart token*
+(sent back and forth in the `X-Cart-Token` header); adding or removing a
+product is one store write and no SQL at all. The cart reaches the
+database only when the shopper logs in or checks out, where it is merged
+into their Cart (see `cart.services.merge_session_cart`).
+
+A session cart is just `{product_id: quantity}`. Two stores are provided,
+picked by settings.SESSION_CART_STORE:
+
+- `CacheCartStore` (default): one compact entry per cart in a Django cache
+  (settings.SESSION_CART_CACHE_ALIAS): local memory in development and
+  tests, Redis/Memcached when CACHES points there.
+- `RedisCartStore`: one Redis hash per cart (`HSET <key> <product> <qty>`),
+  so every change is a single atomic command. Needs the `redis` package and
+  settings.SESSION_CART_REDIS_URL.
+
+Either way a cart expires SESSION_CART_TTL seconds after its last change.
+"""
+import re
+import secrets
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+CART_TOKEN_HEADER = 'X-Cart-Token'
+TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+
+def new_token():
+    return secrets.token_urlsafe(16)
+
+
+def token_from_request(request):
+    """The cart token sent with the request, or None (also for malformed ones)."""
+    token = request.headers.get(CART_TOKEN_HEADER, '')
+    return token if TOKEN_PATTERN.match(token) else None
+
+
+class CartStore:
+    """The interface of a session cart store."""
+    key_prefix = 'session-cart:'
+
+    def key(self, token):
+        return f'{self.key_prefix}{token}'
+
+    def get(self, token):
+        """The cart's lines as {product_id: quantity} (empty if unknown or expired)."""
+        raise NotImplementedError
+
+    def set(self, token, product_id, quantity):
+        """Set the quantity of one product; 0 removes it."""
+        raise NotImplementedError
+
+    def clear(self, token):
+        raise NotImplementedError
+
+
+class CacheCartStore(CartStore):
+    # Read-modify-write of one small dict: two concurrent changes to the
+    # SAME anonymous cart may lose one of them, which is fine for one shopper.
+
+    @property
+    def cache(self):
+        # Looked up on every use: Django cache connections are per thread.
+        return caches[settings.SESSION_CART_CACHE_ALIAS]
+
+    def get(self, token):
+        return dict(self.cache.get(self.key(token)) or {})
+
+    def set(self, token, product_id, quantity):
+        lines = self.get(token)
+        if quantity:
+            lines[product_id] = quantity
+        else:
+            lines.pop(product_id, None)
+        if lines:
+            self.cache.set(self.key(token), lines, settings.SESSION_CART_TTL)
+        else:
+            self.cache.delete(self.key(token))
+
+    def clear(self, token):
+        self.cache.delete(self.key(token))
+
+
+class RedisCartStore(CartStore):
+
+    def __init__(self, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImproperlyConfigured("RedisCartStore needs the 'redis' package (pip install redis).")
+            client = redis.Redis.from_url(settings.SESSION_CART_REDIS_URL)
+        self.client = client
+
+    def get(self, token):
+        return {int(product_id): int(quantity)
+                for product_id, quantity in self.client.hgetall(self.key(token)).items()}
+
+    def set(self, token, product_id, quantity):
+        key = self.key(token)
+        pipeline = self.client.pipeline()
+        if quantity:
+            pipeline.hset(key, product_id, quantity)
+        else:
+            pipeline.hdel(key, product_id)
+        pipeline.expire(key, settings.SESSION_CART_TTL)
+        pipeline.execute()
+
+    def clear(self, token):
+        self.client.delete(self.key(token))
+
+
+@lru_cache(maxsize=None)
+def _load_store(path):
+    return import_string(path)()
+
+
+def get_cart_store():
+    """The configured store (one instance per process)."""
+    return _load_store(settings.SESSION_CART_STORE)
@@ -0,0 +1,63 @@
+# In cart/signals.py
+# Keep the denormalized cart totals (Cart.item_count / Cart.subtotal, see
+# cart/services.py) in step with product changes the cart views never see.
+# These receivers are connected in CartConfig.ready().
+from decimal import Decimal
+
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import post_init, post_save, pre_delete
+from django.dispatch import receiver
+from products.models import Product
+from products.signals import products_bulk_updated
+from .models import Cart, CartItem
+from .services import reprice_carts
+
+
+@receiver(post_init, sender=Product)
+def remember_price(sender, instance, **kwargs):
+    # The price as loaded, to tell whether `save()` changed it (without a
+    # query; a product loaded without its price is left alone).
+    if 'price' not in instance.get_deferred_fields():
+        instance._loaded_price = instance.price
+
+
+@receiver(post_save, sender=Product)
+def reprice_changed_product(sender, instance, created, update_fields=None, **kwargs):
+    # A new product isn't in any cart yet, and most saves (name,
+    # description, image...) leave the price alone.
+    loaded_price = getattr(instance, '_loaded_price', None)
+    instance._loaded_price = instance.price
+    if created or (update_fields is not None and 'price' not in update_fields):
+        return
+    if loaded_price is not None and Decimal(str(loaded_price)) == Decimal(str(instance.price)):
+        return
+    reprice_carts([instance.pk])
+
+
+@receiver(products_bulk_updated)
+def reprice_carts_in_bulk(sender, product_ids, **kwargs):
+    reprice_carts(product_ids)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_from_cart_totals(sender, instance, **kwargs):
+    # The items of a deleted product go with it (on_delete=CASCADE) without
+    # passing through the cart views: take them out of the totals first, in
+    # the same transaction as the delete.
+    #
+    # At the price stored in the database, which the carts were totalled
+    # with; `instance` may have been loaded before a price change. Locks in
+    # the order a price change takes them: the product row, then the carts.
+    price = Product.objects.select_for_update().filter(pk=instance.pk).values_list('price', flat=True).first()
+    cart_ids = list(
+        Cart.objects.filter(items__product_id=instance.pk)
+        .select_for_update(of=('self',)).order_by('pk').values_list('pk', flat=True)
+    )
+    if price is None or not cart_ids:
+        return
+    quantity = Subquery(
+        CartItem.objects.filter(cart=OuterRef('pk'), product_id=instance.pk).values('quantity')[:1])
+    Cart.objects.filter(pk__in=cart_ids).update(
+        item_count=F('item_count') - quantity,
+        subtotal=F('subtotal') - quantity * price,
+    )
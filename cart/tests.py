@@ -1,3 +1,495 @@
-from django.test import TestCase
+# In cart/tests.py
+import io
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from products.bulk import import_products
+from products.models import Category, Product
+from inventory.services import available_quantity, set_stock
+from users.tokens import ClaimsTokenObtainPairSerializer
+from .models import Cart, CartItem
+from .services import apply_cart_changes, drifted_carts
+from .session import RedisCartStore, get_cart_store
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class CartQueryCountTests(APITestCase):
+    """
+    Regression tests for N+1 queries: the number of queries a cart endpoint
+    runs must not depend on how many items are in the cart.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='shopper', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Groceries')
+        self.products = [
+            Product.objects.create(name=f'Item {i}', description='...',
+                                   price=2, category=self.category)
+            for i in range(11)
+        ]
+
+    def _fill_cart(self, count):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        cart.items.all().delete()
+        for product in self.products[:count]:
+            cart.items.create(product=product, quantity=1)
+
+    def _count_queries(self, method, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            response = method(*args, **kwargs)
+        return response, len(ctx.captured_queries)
+
+    def test_get_cart_query_count_is_constant(self):
+        self._fill_cart(1)
+        response, small = self._count_queries(self.client.get, '/api/cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self._fill_cart(10)
+        response, large = self._count_queries(self.client.get, '/api/cart/')
+        self.assertEqual(len(response.data['items']), 10)
+        self.assertEqual(response.data['total_price'], 20)
+
+        self.assertEqual(small, large)
+        # One query for the cart, one for the items joined with products.
+        self.assertEqual(large, 2)
+
+    def test_post_cart_query_count_is_constant(self):
+        self._fill_cart(1)
+        _, small = self._count_queries(
+            self.client.post, '/api/cart/',
+            {'product_id': self.products[0].id, 'quantity': 3}, format='json')
+
+        self._fill_cart(10)
+        response, large = self._count_queries(
+            self.client.post, '/api/cart/',
+            {'product_id': self.products[0].id, 'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_price'], 24)
+
+        self.assertEqual(small, large)
+
+    def test_get_creates_empty_cart(self):
+        response = self.client.get('/api/cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['items'], [])
+        self.assertEqual(response.data['total_price'], 0)
+
+
+class CartBulkUpdateTests(APITestCase):
+    """
+    The bulk endpoint applies many lines at once, atomically, with a query
+    count that does not depend on the number of lines.
+    """
+    url = '/api/cart/items/bulk/'
+
+    def setUp(self):
+        self.user = User.objects.create(username='restorer')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Bulk')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Item {i}', description='...', price=2, category=category)
+            for i in range(30)
+        ])
+
+    def _post(self, body):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, body, format='json')
+        return response, len(ctx.captured_queries)
+
+    def _lines(self, products, quantity=1):
+        return [{'product_id': product.id, 'quantity': quantity} for product in products]
+
+    def test_sets_adds_and_removes_in_one_request(self):
+        cart = Cart.objects.create(user=self.user)
+        cart.items.create(product=self.products[0], quantity=5)
+        cart.items.create(product=self.products[1], quantity=1)
+
+        response, _ = self._post({
+            'items': self._lines(self.products[0:1], 2) + self._lines(self.products[2:4], 3),
+            'remove': [self.products[1].id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        quantities = {item['product']['id']: item['quantity'] for item in response.data['items']}
+        self.assertEqual(quantities, {
+            self.products[0].id: 2, self.products[2].id: 3, self.products[3].id: 3,
+        })
+        self.assertEqual(response.data['total_price'], 16)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        _, small = self._post({'items': self._lines(self.products[:1])})
+        Cart.objects.all().delete()
+        response, large = self._post({'items': self._lines(self.products)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['items']), 30)
+        self.assertEqual(small, large)
+
+    def test_unknown_product_changes_nothing(self):
+        response, _ = self._post({
+            'items': self._lines(self.products[:3]) + [{'product_id': 999999, 'quantity': 1}],
+        })
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['product_ids'], [999999])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_out_of_stock_rolls_back_every_line(self):
+        set_stock(self.products[1].id, 1, shards=2)
+        response, _ = self._post({
+            'items': self._lines(self.products[:1]) + self._lines(self.products[1:2], 5),
+        })
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(available_quantity(self.products[1].id), 1)
+
+    def test_duplicate_products_are_rejected(self):
+        response, _ = self._post({
+            'items': self._lines(self.products[:1]), 'remove': [self.products[0].id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CartFastSerializerParityTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='fast-shopper')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Parity')
+        self.products = [
+            Product.objects.create(name=name, description='...', price=price, category=category)
+            for name, price in [('Tea', '3.5'), ('Kettle', '40'), ('Cups', '12.99')]
+        ]
+
+    def assertSameBytes(self):
+        with override_settings(FAST_SERIALIZERS=False):
+            drf = self.client.get('/api/cart/')
+        with override_settings(FAST_SERIALIZERS=True):
+            fast = self.client.get('/api/cart/')
+        self.assertEqual(drf.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, drf.content)
+
+    def test_empty_cart(self):
+        self.assertSameBytes()
+
+    def test_cart_with_items(self):
+        cart = Cart.objects.create(user=self.user)
+        for quantity, product in enumerate(self.products, start=1):
+            cart.items.create(product=product, quantity=quantity)
+        self.assertSameBytes()
+
+
+class AsyncCartViewTests(APITestCase):
+    """/api/async/cart/ behaves like /api/cart/ (the async view authenticates with a real token)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='async-shopper', password='pass12345')
+        self.token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        category = Category.objects.create(name='Async')
+        self.tea = Product.objects.create(name='Tea', description='...', price='3.5', category=category)
+        self.cups = Product.objects.create(name='Cups', description='...', price='12.99', category=category)
+
+    def test_get_matches_sync_view(self):
+        cart = Cart.objects.create(user=self.user)
+        cart.items.create(product=self.tea, quantity=2)
+        cart.items.create(product=self.cups, quantity=1)
+        sync = self.client.get('/api/cart/')
+        asynchronous = self.client.get('/api/async/cart/')
+        self.assertEqual(asynchronous.status_code, status.HTTP_200_OK)
+        self.assertEqual(asynchronous.content, sync.content)
+
+    def test_add_update_and_remove(self):
+        url = '/api/async/cart/'
+        response = self.client.post(url, {'product_id': self.tea.id, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['items'][0]['quantity'], 2)
+
+        response = self.client.post(url, {'product_id': self.tea.id, 'quantity': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['total_price'], 17.5)
+
+        response = self.client.delete(url, {'product_id': self.tea.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+        response = self.client.delete(url, {'product_id': self.tea.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_validation_errors_match_sync_view(self):
+        for body in ({'product_id': self.tea.id, 'quantity': 0},
+                     {'product_id': self.tea.id, 'quantity': 'many'},
+                     {'quantity': 1},
+                     {'product_id': 999999}):
+            sync = self.client.post('/api/cart/', body, format='json')
+            asynchronous = self.client.post('/api/async/cart/', body, format='json')
+            self.assertEqual(asynchronous.status_code, sync.status_code)
+            self.assertEqual(asynchronous.content, sync.content)
+
+    def test_out_of_stock_is_409(self):
+        set_stock(self.tea.id, 1)
+        response = self.client.post('/api/async/cart/', {'product_id': self.tea.id, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_product_deleted_mid_request_is_404(self):
+        def delete_then_apply(cart, changes):
+            self.tea.delete()
+            return apply_cart_changes(cart, changes)
+
+        with mock.patch('cart.async_views.apply_cart_changes', side_effect=delete_then_apply):
+            response = self.client.post('/api/async/cart/', {'product_id': self.tea.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {'error': 'Product not found.'})
+
+    def test_token_clients_need_no_csrf_token(self):
+        # APIClient skips CSRF checks; a plain client with them enforced
+        # behaves like a real token client.
+        client = Client(enforce_csrf_checks=True, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        for url in ('/api/cart/', '/api/async/cart/'):
+            response = client.post(url, {'product_id': self.tea.id, 'quantity': 1}, content_type='application/json')
+            self.assertIn(response.status_code, (status.HTTP_200_OK, status.HTTP_201_CREATED), url)
+            response = client.delete(url, {'product_id': self.tea.id}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT, url)
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        response = self.client.get('/api/async/cart/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+        self.assertEqual(response.content, self.client.get('/api/cart/').content)
+
+
+class SessionCartTests(APITestCase):
+    """Anonymous carts live in the session cart store until login or checkout."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Session')
+        self.tea = Product.objects.create(name='Tea', description='...', price='3.5', category=category)
+        self.cups = Product.objects.create(name='Cups', description='...', price='12.99', category=category)
+        self.user = User.objects.create_user(username='late-login', password='pass12345')
+
+    def add(self, product, quantity, token=None):
+        headers = {'HTTP_X_CART_TOKEN': token} if token else {}
+        return self.client.post('/api/cart/session/', {'product_id': product.id, 'quantity': quantity},
+                                format='json', **headers)
+
+    def test_changes_never_touch_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.add(self.tea, 2)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            token = response.json()['token']
+            self.assertEqual(response['X-Cart-Token'], token)
+            self.assertEqual(self.add(self.tea, 3, token).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.add(self.cups, 1, token).status_code, status.HTTP_201_CREATED)
+            response = self.client.delete('/api/cart/session/', {'product_id': self.cups.id},
+                                          format='json', HTTP_X_CART_TOKEN=token)
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(get_cart_store().get(token), {self.tea.id: 3})
+        self.assertFalse(Cart.objects.exists())
+
+    def test_get_shows_products_like_the_user_cart(self):
+        token = self.add(self.tea, 2).json()['token']
+        self.add(self.cups, 1, token)
+        self.add(Product(id=999999), 1, token)  # Unknown products are left out.
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/cart/session/', HTTP_X_CART_TOKEN=token).json()
+        self.assertEqual(data['token'], token)
+        self.assertEqual(data['items'], [
+            {'product': {'id': self.tea.id, 'name': 'Tea', 'price': '3.50'}, 'quantity': 2},
+            {'product': {'id': self.cups.id, 'name': 'Cups', 'price': '12.99'}, 'quantity': 1},
+        ])
+        self.assertEqual(data['total_price'], 19.99)
+
+    def test_validation(self):
+        self.assertEqual(self.add(self.tea, 0).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.delete('/api/cart/session/', {'product_id': self.tea.id},
+                                      format='json', HTTP_X_CART_TOKEN='not-a-known-cart-token')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with override_settings(SESSION_CART_MAX_LINES=1):
+            token = self.add(self.tea, 1).json()['token']
+            self.assertEqual(self.add(self.cups, 1, token).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_merges_the_session_cart(self):
+        Cart.objects.create(user=self.user).items.create(product=self.cups, quantity=4)
+        token = self.add(self.tea, 2).json()['token']
+        response = self.client.post('/api/token/', {'username': 'late-login', 'password': 'pass12345'},
+                                    format='json', HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.json())
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity')),
+            {self.cups.id: 4, self.tea.id: 2},
+        )
+        self.assertEqual(get_cart_store().get(token), {})
+
+    def test_login_with_missing_stock_keeps_the_session_cart(self):
+        set_stock(self.tea.id, 1)
+        token = self.add(self.tea, 2).json()['token']
+        response = self.client.post('/api/token/', {'username': 'late-login', 'password': 'pass12345'},
+                                    format='json', HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_cart_store().get(token), {self.tea.id: 2})
+
+    def test_checkout_merges_the_session_cart(self):
+        token = self.add(self.tea, 2).json()['token']
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/orders/', {}, format='json', HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['total_price'], '7.00')
+        self.assertEqual(get_cart_store().get(token), {})
+
+
+class CartTotalsTests(APITestCase):
+    """
+    Cart.item_count and Cart.subtotal follow every change of the items, and
+    /api/cart/summary/ reads them with a single query.
+    """
+    url = '/api/cart/'
+
+    def setUp(self):
+        self.user = User.objects.create(username='badge-shopper')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Totals')
+        self.tea = Product.objects.create(name='Tea', description='...', price='3.50', category=self.category,
+                                          sku='TEA-1')
+        self.cups = Product.objects.create(name='Cups', description='...', price='12.99', category=self.category,
+                                           sku='CUPS-1')
+
+    def totals(self):
+        cart = Cart.objects.get(user=self.user)
+        return cart.item_count, cart.subtotal
+
+    def test_add_update_and_remove(self):
+        self.client.post(self.url, {'product_id': self.tea.id, 'quantity': 2}, format='json')
+        self.client.post(self.url, {'product_id': self.cups.id, 'quantity': 1}, format='json')
+        self.assertEqual(self.totals(), (3, Decimal('19.99')))
+
+        response = self.client.post(self.url, {'product_id': self.tea.id, 'quantity': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.totals(), (6, Decimal('30.49')))
+
+        response = self.client.delete(self.url, {'product_id': self.tea.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.totals(), (1, Decimal('12.99')))
+
+    def test_failed_changes_leave_the_totals_alone(self):
+        self.client.post(self.url, {'product_id': self.tea.id, 'quantity': 2}, format='json')
+        set_stock(self.cups.id, 1)
+        response = self.client.post(self.url, {'product_id': self.cups.id, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.post('/api/cart/items/bulk/', {'items': [
+            {'product_id': self.tea.id, 'quantity': 9}, {'product_id': 999999, 'quantity': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.totals(), (2, Decimal('7.00')))
+
+    def test_bulk_update_and_checkout(self):
+        self.client.post('/api/cart/items/bulk/', {'items': [
+            {'product_id': self.tea.id, 'quantity': 2}, {'product_id': self.cups.id, 'quantity': 3},
+        ]}, format='json')
+        self.assertEqual(self.totals(), (5, Decimal('45.97')))
+        self.client.post('/api/cart/items/bulk/', {'remove': [self.cups.id]}, format='json')
+        self.assertEqual(self.totals(), (2, Decimal('7.00')))
+
+        response = self.client.post('/api/orders/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.totals(), (0, Decimal('0.00')))
+
+    def test_price_changes_reprice_the_carts(self):
+        self.client.post(self.url, {'product_id': self.tea.id, 'quantity': 2}, format='json')
+        self.client.post(self.url, {'product_id': self.cups.id, 'quantity': 1}, format='json')
+
+        self.tea.price = Decimal('4.00')
+        self.tea.save()
+        self.assertEqual(self.totals(), (3, Decimal('20.99')))
+
+        # The bulk import writes without post_save.
+        report = import_products([(2, {'sku': 'CUPS-1', 'name': 'Cups', 'price': '10.00', 'category': 'Totals'})])
+        self.assertEqual(report.updated, 1)
+        self.assertEqual(self.totals(), (3, Decimal('18.00')))
+
+        self.tea.delete()
+        self.assertEqual(self.totals(), (1, Decimal('10.00')))
+        self.assertFalse(drifted_carts().exists())
+
+    def test_deleting_a_stale_product_takes_out_its_current_price(self):
+        self.client.post(self.url, {'product_id': self.tea.id, 'quantity': 2}, format='json')
+        self.client.post(self.url, {'product_id': self.cups.id, 'quantity': 1}, format='json')
+        stale = Product.objects.get(pk=self.tea.pk)
+        self.tea.price = Decimal('4.00')
+        self.tea.save()
+
+        stale.delete()  # Still thinks tea costs 3.50.
+        self.assertEqual(self.totals(), (1, Decimal('12.99')))
+        self.assertFalse(drifted_carts().exists())
+
+    def test_saves_that_keep_the_price_leave_the_carts_alone(self):
+        self.client.post(self.url, {'product_id': self.tea.id, 'quantity': 2}, format='json')
+        tea = Product.objects.get(pk=self.tea.pk)
+        tea.description = 'Green tea'
+        tea.price = '3.50'  # Same price, as a form would send it.
+        with CaptureQueriesContext(connection) as ctx:
+            tea.save()
+        self.assertFalse([query for query in ctx.captured_queries if 'cart_cart' in query['sql']])
+        self.assertEqual(self.totals(), (2, Decimal('7.00')))
+
+    def test_summary_is_one_query(self):
+        self.client.post(self.url, {'product_id': self.cups.id, 'quantity': 2}, format='json')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'item_count': 2, 'subtotal': '25.98'})
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_summary_without_a_cart(self):
+        response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.json(), {'item_count': 0, 'subtotal': '0.00'})
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_reconcile_command_fixes_drift(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=self.tea, quantity=3)])
+        other = Cart.objects.create(user=User.objects.create(username='in-sync'))
+        self.assertEqual(list(drifted_carts().values_list('pk', flat=True)), [cart.pk])
+
+        output = io.StringIO()
+        call_command('reconcile_cart_totals', '--dry-run', stdout=output)
+        self.assertIn(f'Found 1 cart(s) with drifted totals: {cart.pk}', output.getvalue())
+        self.assertEqual(self.totals(), (0, Decimal('0.00')))
+
+        output = io.StringIO()
+        call_command('reconcile_cart_totals', '--batch-size', '1', stdout=output)
+        self.assertIn(f'Fixed 1 cart(s) with drifted totals: {cart.pk}', output.getvalue())
+        self.assertEqual(self.totals(), (3, Decimal('10.50')))
+        other.refresh_from_db()
+        self.assertEqual((other.item_count, other.subtotal), (0, Decimal('0.00')))
+
+        output = io.StringIO()
+        call_command('reconcile_cart_totals', stdout=output)
+        self.assertIn('All cart totals match their items.', output.getvalue())
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class RedisCartStoreTests(TestCase):
+
+    def test_lines_are_a_redis_hash(self):
+        client = fakeredis.FakeRedis()
+        store = RedisCartStore(client)
+        store.set('abc', 7, 2)
+        store.set('abc', 9, 1)
+        store.set('abc', 9, 0)
+        self.assertEqual(store.get('abc'), {7: 2})
+        self.assertEqual(client.hgetall('session-cart:abc'), {b'7': b'2'})
+        self.assertGreater(client.ttl('session-cart:abc'), 0)
+        store.clear('abc')
+        self.assertEqual(store.get('abc'), {})
@@ -1,8 +1,14 @@
 # In cart/urls.py
 from django.urls import path
-from .views import CartView
+from .views import CartBulkView, CartSummaryView, CartView, SessionCartView
 
 urlpatterns = [
     # This single URL will handle GET, POST, and DELETE for the user's cart.
     path('', CartView.as_view(), name='cart-detail'),
+    # Just the item count and subtotal, read from the cart row.
+    path('summary/', CartSummaryView.as_view(), name='cart-summary'),
+    # Many lines at once, in a single transaction.
+    path('items/bulk/', CartBulkView.as_view(), name='cart-bulk'),
+    # Anonymous shoppers' carts, kept outside the database until login/checkout.
+    path('session/', SessionCartView.as_view(), name='cart-session'),
 ]
@@ -3,8 +3,16 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from .models import Cart, CartItem, Product
-from .serializers import CartSerializer
+from django.conf import settings
+from inventory.services import OutOfStockError
+from .models import Cart, CartItem
+from core.fastserializers import fast_serializers_enabled
+from .serializers import (
+    CartBulkUpdateSerializer, CartFastSerializer, CartSerializer, CartSummarySerializer,
+    session_cart_representation,
+)
+from .services import UnknownProductsError, apply_cart_changes, load_cart, refresh_cart_items
+from .session import CART_TOKEN_HEADER, get_cart_store, new_token, token_from_request
 
 
 class CartView(APIView):
@@ -16,10 +24,14 @@ class CartView(APIView):
         Retrieve the current user's shopping cart.
         Creates a cart if one doesn't exist for the user.
         """
-        # `get_or_create` is a handy Django shortcut.
-        # It tries to get the cart for the user, and if it doesn't exist,
-        # it creates one. It returns a tuple: (object, created_boolean).
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        if fast_serializers_enabled():
+            # Same JSON, built from `.values()` rows (core/fastserializers.py).
+            cart, _ = Cart.objects.get_or_create(user_id=request.user.id)
+            return Response(CartFastSerializer().to_representation(cart), status=status.HTTP_200_OK)
+
+        # `load_cart` gets (or creates) the cart and loads its items together
+        # with their products, so the serializer below runs no extra queries.
+        cart = load_cart(request.user)
         serializer = CartSerializer(cart)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -29,7 +41,7 @@ class CartView(APIView):
         This method is idempotent: it SETS the quantity of a product.
         Expects a JSON body with 'product_id' and 'quantity'.
         """
-        product_id = request.data.get('product_id')
+        product_id = self.product_id(request)
 
         # Validate quantity to ensure it's a positive integer.
         try:
@@ -49,27 +61,26 @@ class CartView(APIView):
             return Response({"error": "Product ID is required."},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        # Get or create the user's cart.
+        # `user_id` works for both real users and token-backed ones.
+        cart, _ = Cart.objects.get_or_create(user_id=request.user.id)
+        created = not CartItem.objects.filter(cart=cart, product_id=product_id).exists()
+
         try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
+            # One transaction: hold the stock for this cart (no-op for
+            # products that aren't stock-tracked), set the quantity and move
+            # the cart's totals. Fails if there isn't enough stock.
+            apply_cart_changes(cart, {product_id: quantity})
+        except UnknownProductsError:
             return Response({"error": "Product not found."},
                             status=status.HTTP_404_NOT_FOUND)
-
-        # Get or create the user's cart.
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-
-        # Use update_or_create to simplify the logic.
-        # This creates a new CartItem
-        # or updates the quantity of an existing one.
-        cart_item, created = CartItem.objects.update_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
+        except OutOfStockError:
+            return Response({"error": "Not enough stock."},
+                            status=status.HTTP_409_CONFLICT)
 
         # Return 201 Created for a new item, 200 OK for an updated one.
         status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
-        serializer = CartSerializer(cart)
+        serializer = CartSerializer(refresh_cart_items(cart))
         return Response(serializer.data, status=status_code)
 
     def delete(self, request, *args, **kwargs):
@@ -77,26 +88,151 @@ class CartView(APIView):
         Remove a product from the cart entirely.
         Expects a JSON body with 'product_id'.
         """
-        product_id = request.data.get('product_id')
+        product_id = self.product_id(request)
 
         if not product_id:
             return Response({"error": "Product ID is required."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # Find the specific item belonging to the current user's cart.
+        # Find the current user's cart, only if it holds this product.
         # This is more efficient and secure than fetching the cart first.
-        cart_item = CartItem.objects.filter(
-            cart__user=request.user,
-            product_id=product_id
-        ).first()
+        cart = Cart.objects.filter(user_id=request.user.id, items__product_id=product_id).first()
 
-        if not cart_item:
+        if not cart:
             return Response({"error": "Item not found in cart."},
                             status=status.HTTP_404_NOT_FOUND)
 
-        cart_item.delete()
+        # Gives the reserved stock back and moves the cart's totals, along
+        # with removing the item.
+        apply_cart_changes(cart, {product_id: 0})
 
         # A 204 No Content response is standard for a successful DELETE,
         # indicating success without sending a response body.
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @staticmethod
+    def product_id(request):
+        # Form posts send text; anything that isn't a number counts as missing.
+        try:
+            return int(request.data.get('product_id'))
+        except (TypeError, ValueError):
+            return None
+
+
+
+class CartBulkView(APIView):
+    """
+    Change many cart lines in one request, e.g. when restoring a saved cart:
+
+        {"items": [{"product_id": 1, "quantity": 2}, ...], "remove": [7, 9]}
+
+    Quantities are SET, like in CartView.post; a quantity of 0 removes the
+    product. Either every change is applied or none is.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = CartBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        cart, _ = Cart.objects.get_or_create(user_id=request.user.id)
+        try:
+            apply_cart_changes(cart, serializer.changes())
+        except UnknownProductsError as exc:
+            return Response({"error": "Product not found.", "product_ids": exc.product_ids},
+                            status=status.HTTP_404_NOT_FOUND)
+        except OutOfStockError as exc:
+            return Response({"error": "Not enough stock.", "product_id": exc.product_id},
+                            status=status.HTTP_409_CONFLICT)
+
+        # The cart is serialized once, with its items loaded in one query.
+        return Response(CartSerializer(refresh_cart_items(cart)).data, status=status.HTTP_200_OK)
+
+
+class CartSummaryView(APIView):
+    """
+    The cart header, e.g. for the navbar badge:
+
+        {"item_count": 3, "subtotal": "41.50"}
+
+    A single-row read of the totals stored on the cart; the items aren't
+    loaded and no cart is created (a user without one gets zeros).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        cart = Cart.objects.filter(user_id=request.user.id).only('item_count', 'subtotal').first()
+        return Response(CartSummarySerializer(cart or Cart()).data, status=status.HTTP_200_OK)
+
+
+class SessionCartView(APIView):
+    """
+    The cart of an anonymous shopper, kept in the session cart store (see
+    cart/session.py) under the token sent in the `X-Cart-Token` header.
+
+    GET returns the cart with its products, like CartView. POST (set a
+    quantity) and DELETE (remove a product) only touch the store, never the
+    database: they answer with the bare lines, and POST without a token
+    starts a new cart and returns its token (in the body and the header).
+    Products that don't exist are ignored when the cart is read or merged.
+    """
+    # No login needed (and a stale Authorization header must not get in the way).
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def lines_response(self, token, lines, status_code=status.HTTP_200_OK):
+        data = {
+            'token': token,
+            'items': [{'product_id': product_id, 'quantity': quantity}
+                      for product_id, quantity in sorted(lines.items())],
+        }
+        return Response(data, status=status_code, headers={CART_TOKEN_HEADER: token})
+
+    def get(self, request, *args, **kwargs):
+        token = token_from_request(request)
+        lines = get_cart_store().get(token) if token else {}
+        return Response(session_cart_representation(token, lines), status=status.HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        """Set the quantity of `product_id` (same rules as CartView.post)."""
+        try:
+            quantity = int(request.data.get('quantity', 1))
+            if quantity <= 0:
+                return Response({"error": "Quantity must be a positive integer."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        except (ValueError, TypeError):
+            return Response({"error": "Invalid quantity provided."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            product_id = int(request.data.get('product_id'))
+        except (ValueError, TypeError):
+            return Response({"error": "Product ID is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        store = get_cart_store()
+        token = token_from_request(request) or new_token()
+        lines = store.get(token)
+        created = product_id not in lines
+        if created and len(lines) >= settings.SESSION_CART_MAX_LINES:
+            return Response({"error": f"A cart holds at most {settings.SESSION_CART_MAX_LINES} products."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        store.set(token, product_id, quantity)
+        lines[product_id] = quantity
+        status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return self.lines_response(token, lines, status_code)
+
+    def delete(self, request, *args, **kwargs):
+        token = token_from_request(request)
+        try:
+            product_id = int(request.data.get('product_id'))
+        except (ValueError, TypeError):
+            return Response({"error": "Product ID is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        store = get_cart_store()
+        if token is None or product_id not in store.get(token):
+            return Response({"error": "Item not found in cart."},
+                            status=status.HTTP_404_NOT_FOUND)
+        store.set(token, product_id, 0)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -10,7 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
-from decouple import config
+from decouple import Csv, config
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
     'cart',
     'orders',
     'payments',
+    'inventory',
+    'analytics',
 ]
 # MIDDLEWARE is like an assembly line for requests and responses. Each "worker"
 # (middleware class) processes the request on its way to the view, and then
@@ -59,6 +61,13 @@ INSTALLED_APPS = [
 #     A raw HttpRequest arrives at the factory entrance.
 
 MIDDLEWARE = [
+    # Worker 0 (PerformanceMiddleware): The Stopwatch
+    # It starts a stopwatch before anyone else touches the request and stops it
+    # when the response has gone through every other worker, counting the
+    # database queries and serializer time along the way (core/middleware.py).
+    # The numbers are served to Prometheus at /internal/metrics/.
+    'core.middleware.PerformanceMiddleware',
+
     # Worker 1 (SecurityMiddleware): The Gatekeeper
     # It checks for basic security threats right at the start. If it finds one,
     # it might reject the request immediately. Otherwise, it stamps it "OK" and
@@ -208,17 +217,60 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
-# Password validation# PostgreSQL settings
+# PostgreSQL settings (used in docker-compose and CI).
+DB_ENGINE = config('DB_ENGINE', default='postgresql')
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
+        'NAME': config('DB_NAME', default=''),
+        'USER': config('DB_USER', default=''),
+        'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
     }
 }
+
+# Connection management.
+# CONN_MAX_AGE keeps each worker's connection open between requests (in
+# seconds; 0 = close after every request, which costs a TCP + auth handshake
+# to PostgreSQL per request). CONN_HEALTH_CHECKS pings a reused connection
+# before the request uses it, so a server restart doesn't surface as errors.
+DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# DB_POOL_MODE picks how connections are pooled:
+#   'none'      - one persistent connection per worker (the setting above).
+#   'psycopg'   - a connection pool inside each worker process (Django's
+#                 native pooling; needs `psycopg[binary,pool]` (psycopg 3)
+#                 installed instead of psycopg2).
+#   'pgbouncer' - connect through PgBouncer in transaction pooling mode
+#                 (see the `pgbouncer` service in docker-compose.yml):
+#                 point DB_HOST/DB_PORT at PgBouncer. Server-side cursors
+#                 don't survive transaction pooling, so they are disabled.
+DB_POOL_MODE = config('DB_POOL_MODE', default='none')
+if DB_POOL_MODE == 'psycopg':
+    # The pool owns the connections' lifetime; Django requires CONN_MAX_AGE = 0.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        },
+    }
+elif DB_POOL_MODE == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Set DB_ENGINE=sqlite to run the app or the test suite without a PostgreSQL
+# server. PostgreSQL-only features (full-text search, row locks) fall back
+# to simpler behaviour, see products/search.py.
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
 # This is the configuration for the "Password Quality Control Team".
@@ -285,6 +337,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (product images and their variants, see products/images.py).
+# Served by Django only with DEBUG on; in production the web server or CDN
+# serves MEDIA_ROOT (product_images/variants/ with a far-future, immutable
+# Cache-Control: the file names are content hashes).
+MEDIA_URL = config('MEDIA_URL', default='media/')
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -292,13 +351,143 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Builds `request.user` from the token claims instead of loading the
+        # User row on every request (see users/authentication.py).
+        'users.authentication.StatelessJWTAuthentication',
     )
 }
 
+SIMPLE_JWT = {
+    # Adds username / is_staff claims to the tokens (see users/tokens.py).
+    'TOKEN_OBTAIN_SERIALIZER': 'users.tokens.ClaimsTokenObtainPairSerializer',
+    # Refreshed tokens get the account's current claims.
+    'TOKEN_REFRESH_SERIALIZER': 'users.tokens.ClaimsTokenRefreshSerializer',
+}
+
+# How long (seconds) each worker trusts its cached "is this account still
+# active?" answer before checking the database again.
+JWT_USER_STATE_TTL = config('JWT_USER_STATE_TTL', default=30, cast=int)
+
+# Pagination for list endpoints (see core/pagination.py).
+# API_PAGE_SIZE is what a client gets by default; `?page_size=` may ask for
+# more, but never beyond API_MAX_PAGE_SIZE.
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=20, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=100, cast=int)
+
+# Serve the product, cart and order read endpoints with the `.values()`
+# based serializers of core/fastserializers.py (same JSON, less CPU).
+FAST_SERIALIZERS = config('FAST_SERIALIZERS', default=False, cast=bool)
+
+# Caching
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory by default (one cache per gunicorn worker). To share the
+# cache between workers point it at Redis, e.g.:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://redis:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ecommerce'),
+    }
+}
+
+# Catalog cache (products/cache.py): which cache to use, how long rendered
+# pages live, and a version to bump when the product JSON format changes.
+CATALOG_CACHE_ALIAS = config('CATALOG_CACHE_ALIAS', default='default')
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+CATALOG_CACHE_VERSION = 3
+# Cache-Control max-age (seconds) of catalog pages. 0 lets browsers and CDNs
+# keep them but makes them revalidate (ETag / Last-Modified) every time.
+CATALOG_HTTP_MAX_AGE = config('CATALOG_HTTP_MAX_AGE', default=0, cast=int)
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@ecommerce.com'
 
 EMAIL_HOST = 'localhost'
 EMAIL_PORT = 1025
 
+# Product search (products/search.py): the PostgreSQL text search
+# configuration (language) used to stem product names and descriptions.
+PRODUCT_SEARCH_CONFIG = config('PRODUCT_SEARCH_CONFIG', default='english')
+
+# Price facet buckets (products/facets.py): lower edges, the last bucket is open-ended.
+PRODUCT_PRICE_BUCKETS = [0, 25, 50, 100, 250, 500, 1000]
+
+# Inventory (inventory/services.py): how many rows each product's stock is
+# split over (more shards = less lock contention on popular products), and
+# how long a cart holds stock before it goes back on sale.
+INVENTORY_SHARDS = config('INVENTORY_SHARDS', default=8, cast=int)
+CART_RESERVATION_MINUTES = config('CART_RESERVATION_MINUTES', default=15, cast=int)
+# Rows fetched per round trip by the streaming exports (core/streaming.py).
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Threads per worker process that generate product image variants
+# (products/images.py). 0 generates them inline after the upload commits.
+PRODUCT_IMAGE_WORKERS = config('PRODUCT_IMAGE_WORKERS', default=2, cast=int)
+
+# Upper bound on the number of lines one bulk cart request may change.
+CART_BULK_MAX_ITEMS = config('CART_BULK_MAX_ITEMS', default=100, cast=int)
+
+# Anonymous (session) carts, see cart/session.py: where they are kept, how
+# long they live after their last change (seconds), and how many products
+# one may hold. The default store uses the Django cache below; set
+# SESSION_CART_STORE=cart.session.RedisCartStore and SESSION_CART_REDIS_URL
+# to keep them as Redis hashes instead.
+SESSION_CART_STORE = config('SESSION_CART_STORE', default='cart.session.CacheCartStore')
+SESSION_CART_CACHE_ALIAS = config('SESSION_CART_CACHE_ALIAS', default='default')
+SESSION_CART_REDIS_URL = config('SESSION_CART_REDIS_URL', default='redis://localhost:6379/2')
+SESSION_CART_TTL = config('SESSION_CART_TTL', default=7 * 24 * 3600, cast=int)
+SESSION_CART_MAX_LINES = config('SESSION_CART_MAX_LINES', default=100, cast=int)
+
+# Sales rollups (analytics/services.py): order events are folded into the
+# rollups once they are this many seconds old, so transactions still in
+# flight when the batch runs are not skipped.
+ANALYTICS_SETTLE_SECONDS = config('ANALYTICS_SETTLE_SECONDS', default=10, cast=int)
+
+# Idempotency-Key support (core/idempotency.py): how long a key and its
+# stored response are kept (seconds), and how long a request may hold a key
+# before a retry is allowed to take over.
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 3600, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+# Seconds a client is told to wait (Retry-After) when its key is in use.
+IDEMPOTENCY_RETRY_AFTER = config('IDEMPOTENCY_RETRY_AFTER', default=1, cast=int)
+
+# Request metrics (core/middleware.py, core/metrics.py). Requests slower than
+# SLOW_REQUEST_MS are logged with their slowest queries. /internal/metrics/
+# answers scrapers from METRICS_ALLOWED_IPS, or anyone sending
+# `Authorization: Bearer <METRICS_TOKEN>` when a token is set.
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=500, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+
+# Logging: the app's loggers write to the console (gunicorn/docker collect
+# it) at LOG_LEVEL; Django's own loggers keep their defaults.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'standard': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'standard'},
+    },
+    'loggers': {
+        **{app: {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False}
+           for app in ('analytics', 'core', 'cart', 'inventory', 'orders', 'payments', 'products', 'users')},
+    },
+}
+
+# Load testing only (core/db.py): add this many milliseconds to every query,
+# to imitate a remote database. 0 disables it.
+DB_SIMULATED_LATENCY_MS = config('DB_SIMULATED_LATENCY_MS', default=0, cast=int)
+
+# Email outbox (payments/services.py): emails are retried with exponential
+# backoff starting at OUTBOX_RETRY_BASE_SECONDS, and marked as FAILED after
+# OUTBOX_MAX_ATTEMPTS attempts.
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+OUTBOX_RETRY_BASE_SECONDS = config('OUTBOX_RETRY_BASE_SECONDS', default=30, cast=int)
+# A worker's claim on a batch; emails it hasn't finished by then (it
+# crashed) are picked up again. Keep it well above a batch's sending time.
+OUTBOX_LEASE_SECONDS = config('OUTBOX_LEASE_SECONDS', default=600, cast=int)
+
@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -25,5 +27,12 @@ urlpatterns = [
     path('api/cart/', include('cart.urls')), # <-- ADD THIS LINE
     path('api/orders/', include('orders.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/inventory/', include('inventory.urls')),
+    path('api/analytics/', include('analytics.urls')),
+    # Async (ASGI-native) versions of the busiest endpoints, see core/async_views.py.
+    path('api/async/products/', include('products.async_urls')),
+    path('api/async/cart/', include('cart.async_urls')),
 ]
 
+# Uploaded media in development (static() does nothing unless DEBUG is on).
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
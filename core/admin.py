@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import IdempotencyKey
 
-# Register your models here.
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'scope', 'key', 'status', 'response_status', 'created_at', 'expires_at']
+    list_filter = ['status', 'scope']
+    search_fields = ['key']
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .db import install_simulated_latency
+        from .metrics import install_query_recorder, instrument_drf_serializers
+        connection_created.connect(install_simulated_latency, dispatch_uid='core.simulated_latency')
+        # Per-request query and serializer timings (core/metrics.py).
+        connection_created.connect(install_query_recorder, dispatch_uid='core.query_recorder')
+        instrument_drf_serializers()
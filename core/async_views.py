@@ -0,0 +1,97 @@
+# In core/async_views.py
+"""
+A small async counterpart of DRF's APIView, for the async endpoints under
+/api/async/ (served best by an ASGI server, see config/asgi.py).
+
+DRF views are synchronous: under ASGI every request to them is handed to a
+worker thread and holds it for the whole request, including all the time
+spent waiting on the database. The views built on AsyncAPIView instead
+await the database through Django's async ORM, so a single process can
+keep many slow requests in flight.
+
+What it keeps from DRF, so clients can't tell the difference:
+
+- `request` is a DRF Request (`query_params`, `data`, `user`),
+- the same parsers, authentication and permission classes,
+- errors (APIException, Http404) turned into the same JSON bodies by DRF's
+  exception handler,
+- bodies rendered by the same JSONRenderer,
+- CSRF exemption outside of SessionAuthentication.
+
+Authentication classes are synchronous (the stateless JWT one may check the
+account state in the database), so they run through `sync_to_async`.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+
+class AsyncAPIView(View):
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    renderer = JSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like APIView.as_view: token clients send no CSRF cookie, so the
+        # middleware must not check them. SessionAuthentication (if
+        # configured) enforces CSRF itself for cookie-authenticated requests.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def get_authenticators(self):
+        return [auth() for auth in self.authentication_classes]
+
+    def get_parsers(self):
+        return [parser() for parser in self.parser_classes]
+
+    def get_permissions(self):
+        return [permission() for permission in self.permission_classes]
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=self.get_parsers(), authenticators=self.get_authenticators())
+        self.request, self.args, self.kwargs = request, args, kwargs
+        try:
+            await sync_to_async(self.check_permissions)(request)
+            handler = getattr(self, request.method.lower(), None)
+            if request.method.lower() not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            return await handler(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    def check_permissions(self, request):
+        # Touching `request.user` runs the authenticators, like in APIView.
+        for permission in self.get_permissions():
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        response = HttpResponse(self.renderer.render(data), status=status_code,
+                                content_type=self.renderer.media_type)
+        for name, value in (headers or {}).items():
+            response[name] = value
+        return response
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            authenticators = self.request.authenticators
+            header = authenticators[0].authenticate_header(self.request) if authenticators else None
+            if header:
+                exc.auth_header = header
+            else:
+                exc.status_code = status.HTTP_403_FORBIDDEN
+
+        response = exception_handler(exc, {'view': self, 'request': self.request})
+        if response is None:
+            raise exc
+        headers = {name: response[name] for name in ('WWW-Authenticate', 'Retry-After') if name in response}
+        return self.render(response.data, response.status_code, headers)
@@ -0,0 +1,27 @@
+# In core/db.py
+"""
+Simulated database latency, for load tests only.
+
+With DB_SIMULATED_LATENCY_MS > 0 every query sleeps that long before it is
+sent, as if the database were on the other side of a slow network. This is
+how benchmarks/asgi_vs_wsgi.py shows what a deployment does while its
+requests are waiting on the database: a sync worker is blocked for the whole
+wait, an async view awaiting the async ORM is not (the sleep happens in the
+thread the ORM call runs in).
+
+Never enable it in production.
+"""
+import time
+
+from django.conf import settings
+
+
+def simulated_latency(execute, sql, params, many, context):
+    time.sleep(settings.DB_SIMULATED_LATENCY_MS / 1000)
+    return execute(sql, params, many, context)
+
+
+def install_simulated_latency(sender, connection, **kwargs):
+    """`connection_created` receiver: wrap every query of the new connection."""
+    if settings.DB_SIMULATED_LATENCY_MS > 0 and simulated_latency not in connection.execute_wrappers:
+        connection.execute_wrappers.append(simulated_latency)
@@ -0,0 +1,205 @@
+# In core/fastserializers.py
+"""
+Fast, read-only serializers built from `.values()` rows.
+
+A DRF ModelSerializer walks its fields for every object: field lookups,
+`to_representation` dispatch, nested serializer instances, Decimal context
+juggling. For hot read endpoints we can do the same work with a *plan*
+computed once per request: for every output key, which column to read and
+which (if any) conversion to apply. Building an object is then a short loop
+over the plan.
+
+A FastSerializer declares its output as a dict of `key -> column`, where
+the column is a `.values()` lookup (it may span relations, e.g.
+`category__name`) or a nested dict of the same, and it produces *exactly*
+the same data as the DRF serializer it mirrors. Conversions are chosen from
+the model field types, the same way DRF's ModelSerializer chooses fields:
+
+- DecimalField  -> fixed-point string (COERCE_DECIMAL_TO_STRING)
+- DateTimeField -> ISO 8601 in the current time zone, UTC as 'Z'
+- FileField     -> absolute URL (with a request in the context) or None
+
+Fast serializers are opt-in (settings.FAST_SERIALIZERS); every one has a
+parity test against its DRF counterpart, so changing one without the other
+fails the suite.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .metrics import timed_serialization
+
+
+def fast_serializers_enabled():
+    return settings.FAST_SERIALIZERS
+
+
+# --- Conversions (mirror rest_framework.fields) --------------------------
+
+def decimal_converter(model_field):
+    # DecimalField.to_representation: quantize to the field's places, then '{:f}'.
+    exponent = Decimal(1).scaleb(-model_field.decimal_places)
+
+    if not api_settings.COERCE_DECIMAL_TO_STRING:
+        return lambda value: value.quantize(exponent)
+    return lambda value: '{:f}'.format(value.quantize(exponent))
+
+
+def datetime_converter(model_field):
+    # DateTimeField.to_representation: enforce the current time zone, then
+    # isoformat() with '+00:00' written as 'Z'.
+    def convert(value):
+        if settings.USE_TZ and timezone.is_aware(value):
+            value = value.astimezone(timezone.get_current_timezone())
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def file_converter(model_field, request):
+    # FileField.to_representation with use_url: the storage URL, made
+    # absolute when there is a request.
+    storage = model_field.storage
+
+    def convert(value):
+        if not value:
+            return None
+        url = storage.url(value)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def converter_for(model_field, context):
+    if isinstance(model_field, models.DecimalField):
+        return decimal_converter(model_field)
+    if isinstance(model_field, models.DateTimeField):
+        return datetime_converter(model_field)
+    if isinstance(model_field, models.FileField):
+        return file_converter(model_field, context.get('request'))
+    return None
+
+
+def resolve_field(model, lookup):
+    """The model field a `.values()` lookup such as 'category__name' ends on."""
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+# --- Serializers ---------------------------------------------------------
+
+class FastSerializer:
+    """
+    Subclasses set `model` and `fields` (see the module docstring), and may
+    list `extra_columns` they need in `.values()` without outputting them.
+    """
+    model = None
+    fields = {}
+    extra_columns = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Overrides are timed too, for the request metrics (core/metrics.py).
+        for name in ('to_representation', 'serialize_many'):
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, 'timed_serialization', False):
+                setattr(cls, name, timed_serialization(method))
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.plan = self._compile(self.fields)
+
+    @classmethod
+    def columns(cls, fields=None):
+        columns = []
+        for source in (cls.fields if fields is None else fields).values():
+            columns += cls.columns(source) if isinstance(source, dict) else [source]
+        if fields is None:
+            columns += [column for column in cls.extra_columns if column not in columns]
+        return columns
+
+    def _compile(self, fields):
+        # (key, column, converter, nested plan) - computed once per serializer.
+        plan = []
+        for key, source in fields.items():
+            if isinstance(source, dict):
+                plan.append((key, None, None, self._compile(source)))
+            else:
+                convert = converter_for(resolve_field(self.model, source), self.context)
+                plan.append((key, source, convert, None))
+        return plan
+
+    def values(self, queryset):
+        """`queryset` as the `.values()` rows this serializer reads."""
+        # The rows carry everything we need; prefetches meant for model
+        # instances would be wasted (and don't apply to dicts).
+        return queryset.prefetch_related(None).values(*self.columns())
+
+    def _build(self, plan, row):
+        data = {}
+        for key, column, convert, nested in plan:
+            if nested is not None:
+                data[key] = self._build(nested, row)
+                continue
+            value = row[column]
+            data[key] = value if value is None or convert is None else convert(value)
+        return data
+
+    @timed_serialization
+    def to_representation(self, row):
+        return self._build(self.plan, row)
+
+    @timed_serialization
+    def serialize_many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+# --- View mixins ---------------------------------------------------------
+# For generic views without object-level permissions. When fast serializers
+# are enabled (and the view has one), `list`/`retrieve` read `.values()` rows
+# and build the response with the fast serializer; otherwise they fall back
+# to the regular DRF implementation.
+
+class FastSerializerViewMixin:
+    fast_serializer_class = None
+
+    def get_fast_serializer_class(self):
+        return self.fast_serializer_class
+
+    def use_fast_serializer(self):
+        return fast_serializers_enabled() and self.get_fast_serializer_class() is not None
+
+    def get_fast_serializer(self):
+        return self.get_fast_serializer_class()(context=self.get_serializer_context())
+
+
+class FastListModelMixin(FastSerializerViewMixin):
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_serializer():
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_fast_serializer()
+        rows = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize_many(page))
+        return Response(serializer.serialize_many(rows))
+
+
+class FastRetrieveModelMixin(FastSerializerViewMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_serializer():
+            return super().retrieve(request, *args, **kwargs)
+        serializer = self.get_fast_serializer()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            serializer.values(self.filter_queryset(self.get_queryset())),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        return Response(serializer.to_representation(row))
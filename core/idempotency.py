@@ -0,0 +1,184 @@
+# In core/idempotency.py
+"""
+`Idempotency-Key` support for endpoints that must not run twice, such as
+placing an order or paying for one.
+
+Clients that time out retry, and without protection every retry places
+another order (and under load, retries pile up into more load). With the
+header, the first request with a key runs normally and its response is
+stored; any retry with the same key gets that response back without
+running the view again.
+
+    POST /api/orders/
+    Idempotency-Key: 4f1c6a2e-...
+
+- Keys are scoped to the user and the endpoint, and expire after
+  IDEMPOTENCY_KEY_TTL seconds (`manage.py purge_idempotency_keys`).
+- A retry that arrives while the first request is still running gets
+  409 Conflict with `Retry-After`; the key is locked for at most
+  IDEMPOTENCY_LOCK_TIMEOUT seconds, so a crashed request can't hold it forever.
+- Reusing a key for a different request (another body) is a 422 error.
+- Responses are stored unless they are server errors: a 5xx releases the
+  key, so the client can retry for real. Replays carry `Idempotent-Replayed: true`.
+- Requests without the header are not affected.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Headers of the stored response that are replayed along with the body.
+REPLAYED_HEADERS = ('Location',)
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = 'idempotency_key_reused'
+
+
+class Replay(Exception):
+    # Raised from `initial` to answer with the stored response instead of running the handler.
+    def __init__(self, response):
+        self.response = response
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.body):
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def stored_response(record):
+    response = HttpResponse(bytes(record.response_body or b''), status=record.response_status,
+                            content_type=record.response_headers.get('Content-Type'))
+    for name in REPLAYED_HEADERS:
+        if name in record.response_headers:
+            response[name] = record.response_headers[name]
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def claim(user_id, scope, key, fingerprint):
+    """
+    Take `key` for a new request. Returns the claimed IdempotencyKey, or
+    raises Replay / IdempotencyConflict / IdempotencyKeyReused.
+    """
+    now = timezone.now()
+    lock = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    fresh = {
+        'fingerprint': fingerprint, 'status': IdempotencyKey.Status.IN_PROGRESS, 'locked_until': lock,
+        'response_status': None, 'response_body': None, 'response_headers': {},
+        'expires_at': now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    }
+    keys = IdempotencyKey.objects.filter(user_id=user_id, scope=scope, key=key)
+    # A retry is one lookup; only new keys are inserted.
+    record = keys.first()
+    if record is None:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user_id=user_id, scope=scope, key=key, **fresh)
+        except IntegrityError:
+            # A concurrent request with the same key inserted it first.
+            raise IdempotencyConflict()
+    if record.expires_at <= now:
+        # Expired but not purged yet: start over. Only one request wins the update.
+        if keys.filter(expires_at__lte=now).update(**fresh):
+            return keys.get()
+        raise IdempotencyConflict()
+    if record.fingerprint != fingerprint:
+        raise IdempotencyKeyReused()
+    if record.status == IdempotencyKey.Status.COMPLETED:
+        raise Replay(stored_response(record))
+    # In progress. If its lock ran out the request that held it died: take over.
+    if keys.filter(status=IdempotencyKey.Status.IN_PROGRESS, locked_until__lte=now).update(locked_until=lock):
+        return keys.get()
+    raise IdempotencyConflict()
+
+
+class IdempotentMixin:
+    """
+    For DRF views: honour `Idempotency-Key` on the methods in
+    `idempotent_methods`. Put it first in the bases, before APIView.
+    """
+    idempotent_methods = ('POST',)
+    idempotency_record = None
+
+    def get_idempotency_scope(self, request):
+        match = request.resolver_match
+        return match.view_name if match else request.path
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permissions first: keys belong to a user.
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(HEADER)
+        if key is None or request.method not in self.idempotent_methods:
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({HEADER: f"Must be 1 to {MAX_KEY_LENGTH} characters."})
+        self.idempotency_record = claim(request.user.id, self.get_idempotency_scope(request), key,
+                                        request_fingerprint(request))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Replay):
+            return exc.response
+        try:
+            response = super().handle_exception(exc)
+        except Exception:
+            self.release_idempotency_key()
+            raise
+        if isinstance(exc, IdempotencyConflict):
+            response['Retry-After'] = str(settings.IDEMPOTENCY_RETRY_AFTER)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        record, self.idempotency_record = self.idempotency_record, None
+        if record is None:
+            return response
+        if response.status_code >= 500 or response.streaming:
+            record.delete()
+            return response
+        # Render now so the exact bytes can be stored (Django won't render twice).
+        if hasattr(response, 'render'):
+            response.render()
+        record.status = IdempotencyKey.Status.COMPLETED
+        record.locked_until = None
+        record.response_status = response.status_code
+        record.response_body = response.content
+        record.response_headers = {name: response[name] for name in ('Content-Type', *REPLAYED_HEADERS)
+                                   if name in response}
+        record.save(update_fields=['status', 'locked_until', 'response_status', 'response_body',
+                                   'response_headers'])
+        return response
+
+    def release_idempotency_key(self):
+        record, self.idempotency_record = self.idempotency_record, None
+        if record is not None:
+            record.delete()
+
+
+def purge_expired_keys(batch_size=1000):
+    """Delete up to `batch_size` expired keys; returns how many were deleted."""
+    ids = list(IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+               .values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return 0
+    deleted, _ = IdempotencyKey.objects.filter(id__in=ids).delete()
+    return deleted
@@ -0,0 +1,31 @@
+# In core/management/commands/purge_idempotency_keys.py
+import time
+
+from django.core.management.base import BaseCommand
+from core.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key records (see core/idempotency.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, purging expired keys.")
+        parser.add_argument('--interval', type=float, default=300.0,
+                            help="Seconds between purges (with --loop).")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Keys deleted per statement.")
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                deleted = purge_expired_keys(options['batch_size'])
+                total += deleted
+                if not deleted:
+                    break
+            if total:
+                self.stdout.write(f"Purged {total} expired idempotency key(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
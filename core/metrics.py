@@ -0,0 +1,219 @@
+# In core/metrics.py
+"""
+Per-request performance numbers and the metrics they feed.
+
+While a request runs (see core.middleware.PerformanceMiddleware) a
+`RequestStats` sits in a context variable, and two hooks add to it:
+
+- every SQL query, through a wrapper installed on each database connection
+  (`connection.execute_wrappers`, added when the connection is created):
+  count, total time and the slowest statements;
+- every top-level serialization: DRF's `serializer.data` and the fast
+  serializers' `serialize_many` / `to_representation`. Queries a serializer
+  triggers (lazy querysets) count as database time, not serializer time.
+
+Context variables follow the request into `sync_to_async` threads, so the
+async views are measured the same way.
+
+At the end of the request the middleware folds the stats into the metrics
+below, which /internal/metrics/ serves in the Prometheus text format. They
+live in the memory of each worker process, like the catalog cache stats:
+scrape every worker (or run one per container) to see them all.
+"""
+import heapq
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+current_stats = ContextVar('current_request_stats', default=None)
+
+
+class RequestStats:
+    # How many statements to keep for the slow-request log.
+    keep_queries = 5
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+        self._slowest = []  # min-heap of (seconds, order, sql)
+
+    def add_query(self, sql, seconds):
+        self.query_count += 1
+        self.query_seconds += seconds
+        entry = (seconds, self.query_count, sql)
+        if len(self._slowest) < self.keep_queries:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def slowest_queries(self):
+        """[(seconds, sql)], slowest first."""
+        return [(seconds, sql) for seconds, _, sql in sorted(self._slowest, reverse=True)]
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+# --- Hooks ---------------------------------------------------------------
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """`connection_created` receiver."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_serialization(function):
+    """Count the time spent in `function` as serializer time (outermost call only)."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        stats = current_stats.get()
+        if stats is None or stats.serializer_depth:
+            return function(*args, **kwargs)
+        stats.serializer_depth += 1
+        started, query_seconds = time.perf_counter(), stats.query_seconds
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.serializer_seconds += elapsed - (stats.query_seconds - query_seconds)
+            stats.serializer_depth -= 1
+    wrapper.timed_serialization = True
+    return wrapper
+
+
+def instrument_drf_serializers():
+    """Time DRF's `serializer.data` (the fast serializers time themselves)."""
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.data.fget, 'timed_serialization', False):
+        return
+    # `data` is a property on every DRF serializer class; wrapping the base
+    # one covers Serializer.data and ListSerializer.data, which call it.
+    BaseSerializer.data = property(timed_serialization(BaseSerializer.data.fget))
+
+
+# --- Metrics -------------------------------------------------------------
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # labels -> [bucket counts..., count, sum]
+
+    def observe(self, labels, value):
+        entry = self.values.setdefault(labels, [0] * (len(self.buckets) + 2))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[index] += 1
+        entry[-2] += 1
+        entry[-1] += value
+
+    def samples(self):
+        for labels, entry in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, entry):
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, labels, [('le', bound)]), count
+            yield f'{self.name}_bucket', _format_labels(self.labelnames, labels, [('le', '+Inf')]), entry[-2]
+            yield f'{self.name}_count', _format_labels(self.labelnames, labels), entry[-2]
+            yield f'{self.name}_sum', _format_labels(self.labelnames, labels), entry[-1]
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines += [f'{name}{labels} {_format_number(value)}' for name, labels, value in metric.samples()]
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics:
+                metric.values.clear()
+
+
+registry = Registry()
+LABELS = ('view', 'method', 'status')
+
+request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent handling the request.', LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)))
+request_queries = registry.register(Histogram(
+    'http_request_db_queries', 'Database queries run by the request.', LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)))
+db_duration = registry.register(Counter(
+    'http_request_db_duration_seconds_total', 'Time spent in database queries.', LABELS))
+serializer_duration = registry.register(Counter(
+    'http_request_serializer_duration_seconds_total', 'Time spent in serializers.', LABELS))
+response_size = registry.register(Counter(
+    'http_response_size_bytes_total', 'Bytes of (non-streaming) response bodies.', LABELS))
+slow_requests = registry.register(Counter(
+    'http_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS.', LABELS))
+
+
+def observe_request(labels, stats, seconds, size, slow):
+    with registry.lock:
+        request_duration.observe(labels, seconds)
+        request_queries.observe(labels, stats.query_count)
+        db_duration.inc(labels, stats.query_seconds)
+        serializer_duration.inc(labels, stats.serializer_seconds)
+        if size is not None:
+            response_size.inc(labels, size)
+        if slow:
+            slow_requests.inc(labels)
@@ -0,0 +1,70 @@
+# In core/middleware.py
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .metrics import RequestStats, current_stats, observe_request
+
+logger = logging.getLogger('core.performance')
+
+
+class PerformanceMiddleware:
+    """
+    Measure every request: latency, number and time of database queries,
+    serializer time and response size, per view (see core/metrics.py).
+    Requests slower than settings.SLOW_REQUEST_MS are logged to the
+    `core.performance` logger together with their slowest queries.
+
+    Works for both sync and async views without switching modes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.record(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.record(request, response, stats)
+        return response
+
+    def record(self, request, response, stats):
+        seconds = stats.elapsed()
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        labels = (view, request.method, str(response.status_code))
+        # Streaming bodies are produced after we return; their size is unknown here.
+        size = None if response.streaming else len(response.content)
+        slow = seconds * 1000 >= settings.SLOW_REQUEST_MS
+        observe_request(labels, stats, seconds, size, slow)
+
+        if slow:
+            queries = ''.join(f'\n  {query_seconds * 1000:8.1f} ms  {sql}'
+                              for query_seconds, sql in stats.slowest_queries())
+            logger.warning(
+                "Slow request: %s %s -> %s (%s) took %.0f ms: %d queries in %.0f ms, "
+                "serializers %.0f ms, %s bytes.%s",
+                request.method, request.get_full_path(), response.status_code, view, seconds * 1000,
+                stats.query_count, stats.query_seconds * 1000, stats.serializer_seconds * 1000,
+                size if size is not None else 'streamed', queries,
+            )
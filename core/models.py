@@ -1,3 +1,41 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class IdempotencyKey(models.Model):
+    """
+    One `Idempotency-Key` a client sent to an idempotent endpoint (see
+    core/idempotency.py), and the response it got.
+
+    While the first request runs, the row is IN_PROGRESS and `locked_until`
+    says how long that request may hold it; once it is done the response is
+    stored and replayed to every retry until `expires_at`.
+    """
+    class Status(models.TextChoices):
+        IN_PROGRESS = 'IN_PROGRESS', 'In progress'
+        COMPLETED = 'COMPLETED', 'Completed'
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    # The endpoint the key was used on: the same key may be reused elsewhere.
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    # Hash of the method, path and body, to reject a key reused for another request.
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.IN_PROGRESS)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.BinaryField(null=True, blank=True)
+    response_headers = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Cleaned up by `manage.py purge_idempotency_keys`.
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status})"
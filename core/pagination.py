@@ -0,0 +1,210 @@
+# In core/pagination.py
+import base64
+import binascii
+import json
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a fixed, unique ordering.
+
+    Instead of `OFFSET n`, every page remembers the sort key of its last row
+    and the next page asks the database for rows *after* that key, e.g.:
+
+        WHERE (created_at, id) < (:created_at, :id)
+        ORDER BY created_at DESC, id DESC
+        LIMIT :page_size
+
+    With a matching composite index this costs the same for page 1 and
+    page 10,000, and rows inserted while a client is paging never shift the
+    window (no duplicated or skipped items).
+
+    The last ordering field MUST be unique (normally `id`) so that every row
+    has a distinct position.
+
+    Works on model instances and on `.values()` dicts (as long as the dicts
+    contain the ordering columns).
+    """
+    # Subclasses usually only need to change `ordering`.
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        # Page sizes come from settings so they can be tuned per deployment.
+        page_size = settings.API_PAGE_SIZE
+        max_page_size = settings.API_MAX_PAGE_SIZE
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested:
+            try:
+                page_size = int(requested)
+            except ValueError:
+                pass
+        # Clamp to the configured cap; a client can never ask for the whole table.
+        return max(1, min(page_size, max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        return list(self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._finish_page(list(self._page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """The same, for async views: the page is read with the async ORM."""
+        return self._finish_page([row async for row in self._page_queryset(queryset, request, view)])
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+        self._position_given, self._reverse = position is not None, reverse
+
+        # When walking backwards we flip the ordering, read one page and flip
+        # the results back so the client always sees the same sort order.
+        ordering = self._reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        # Fetch one extra row to know if there is another page after this one.
+        return queryset[:self.page_size + 1]
+
+    def _finish_page(self, rows):
+        has_more = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        if self._reverse:
+            page.reverse()
+
+        self.page = page
+        if self._reverse:
+            self.has_next = self._position_given
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self._position_given
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    # --- Cursor encoding -------------------------------------------------
+
+    def encode_cursor(self, position, reverse):
+        # The cursor is opaque to clients: base64 of a tiny JSON document.
+        # It records the ordering it was made for, so it can't be replayed
+        # against a different sort.
+        payload = {'p': position, 'o': ','.join(self.ordering)}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode()
+        ).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            raw_position = payload['p']
+            if payload['o'] != ','.join(self.ordering) or len(raw_position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.ordering, raw_position)
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # --- Helpers ---------------------------------------------------------
+
+    def _field(self, ordering_term):
+        return self.model._meta.get_field(ordering_term.lstrip('-'))
+
+    def _position(self, instance):
+        # Store every sort key as a JSON-friendly string/number.
+        if isinstance(instance, dict):
+            instance = SimpleNamespace(**instance)
+        values = []
+        for term in self.ordering:
+            field = self._field(term)
+            value = getattr(instance, field.attname)
+            values.append(value if isinstance(value, int) else field.value_to_string(instance))
+        return values
+
+    @staticmethod
+    def _reverse_ordering(ordering):
+        return [term[1:] if term.startswith('-') else '-' + term for term in ordering]
+
+    @staticmethod
+    def _after(ordering, position):
+        """
+        Build the lexicographic "comes after" filter for a multi-column key:
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for term, value in zip(ordering, position):
+            name = term.lstrip('-')
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+            equal_so_far &= Q(**{name: value})
+        return condition
+
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    """
+    Classic `?page=N` pagination, for lists that can't be keyset-paginated
+    (e.g. search results ordered by relevance). Uses the same page size
+    settings as KeysetPagination.
+    """
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
+        return super().get_page_size(request)
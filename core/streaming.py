@@ -0,0 +1,91 @@
+# In core/streaming.py
+"""
+Streaming JSON responses for full data dumps.
+
+A normal DRF list builds every object, then a list of dicts, then one big
+JSON string: the whole payload sits in memory several times. The helpers
+here instead take an *iterator* of plain dicts (typically built from
+`QuerySet.values().iterator(chunk_size=...)`, which reads the rows through a
+server-side cursor) and encode and send them a piece at a time, so memory
+stays flat whatever the number of rows.
+
+Two formats are offered:
+
+- `ndjson`: one JSON document per line (application/x-ndjson); the easiest
+  to consume incrementally.
+- `json`: a single JSON array, written element by element.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+# Rows are encoded one by one but sent in pieces of about this many bytes,
+# so the server doesn't write (and the client doesn't read) tiny chunks.
+CHUNK_BYTES = 64 * 1024
+
+# DRF's encoder, so dates, decimals and UUIDs look like in the rest of the API.
+_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _buffered(pieces):
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def ndjson_pieces(rows):
+    for row in rows:
+        yield _encoder.encode(row) + '\n'
+
+
+def json_array_pieces(rows):
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + _encoder.encode(row)
+        separator = ','
+    yield ']'
+
+
+def streaming_json_response(rows, stream_format, filename=None):
+    """
+    A StreamingHttpResponse that encodes `rows` lazily, as `stream_format`
+    ('ndjson' or 'json'). Nothing is read from `rows` until the client reads.
+    """
+    pieces = ndjson_pieces(rows) if stream_format == 'ndjson' else json_array_pieces(rows)
+    response = StreamingHttpResponse(_buffered(pieces), content_type=STREAM_FORMATS[stream_format])
+    if filename:
+        extension = 'ndjson' if stream_format == 'ndjson' else 'json'
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+class StreamingExportMixin:
+    """
+    For APIViews that dump a whole collection: `?stream=ndjson` (default)
+    or `?stream=json`. Subclasses implement `get_export_rows(request)`,
+    returning an iterator of dicts, and set `export_filename`.
+    """
+    stream_query_param = 'stream'
+    export_filename = 'export'
+
+    def get_export_rows(self, request):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        stream_format = request.query_params.get(self.stream_query_param, 'ndjson')
+        if stream_format not in STREAM_FORMATS:
+            return Response({"error": f"stream must be one of {', '.join(STREAM_FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return streaming_json_response(self.get_export_rows(request), stream_format, self.export_filename)
@@ -0,0 +1,155 @@
+# In core/testing.py
+"""
+Performance assertions for the test suite: query-count and wall-time
+budgets, and a check that an endpoint's query count doesn't grow with the
+amount of data it serves.
+
+Context managers (also usable as decorators):
+
+    with max_queries(3):
+        client.get('/api/cart/')
+
+    @time_budget(200)
+    def test_something(self): ...
+
+`measure(function)` runs something and returns (result, queries, ms), and
+`assert_constant_queries(build, call)` runs `call` against data made by
+`build(size)` for every size (1, 10, 100 by default) and fails when the
+counts differ. The per-endpoint budgets of config/performance_budgets.json
+are enforced with these in core/tests.py (EndpointBudgetTests).
+
+Wall times are multiplied by PERF_BUDGET_TIME_FACTOR (environment
+variable, default 1) so a slow CI machine can loosen them without
+touching the budgets.
+"""
+import json
+import os
+import re
+import time
+from contextlib import ContextDecorator
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+
+SIZES = (1, 10, 100)
+BUDGETS_FILE = Path(settings.BASE_DIR) / 'config' / 'performance_budgets.json'
+
+
+def time_factor():
+    return float(os.environ.get('PERF_BUDGET_TIME_FACTOR', '1'))
+
+
+def format_queries(captured):
+    return '\n'.join(f"{number}. {query['sql']}" for number, query in enumerate(captured, start=1))
+
+
+class max_queries(ContextDecorator):
+    """Fail if the block runs more than `limit` queries (the queries are listed)."""
+
+    def __init__(self, limit, using=DEFAULT_DB_ALIAS):
+        self.limit = limit
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and len(self.context) > self.limit:
+            raise AssertionError(
+                f"{len(self.context)} queries executed, at most {self.limit} allowed:\n"
+                f"{format_queries(self.context.captured_queries)}")
+        return False
+
+
+class time_budget(ContextDecorator):
+    """Fail if the block takes longer than `ms` milliseconds (times PERF_BUDGET_TIME_FACTOR)."""
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.elapsed = (time.perf_counter() - self.started) * 1000
+        limit = self.ms * time_factor()
+        if exc_type is None and self.elapsed > limit:
+            raise AssertionError(f"Took {self.elapsed:.1f}ms, the budget is {limit:.0f}ms.")
+        return False
+
+
+def measure(function, using=DEFAULT_DB_ALIAS):
+    """Run `function()`; returns (its result, the captured queries, milliseconds)."""
+    with CaptureQueriesContext(connections[using]) as context:
+        started = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - started) * 1000
+    return result, context.captured_queries, elapsed
+
+
+def assert_constant_queries(build, call, sizes=SIZES):
+    """
+    `build(size)` creates the data, `call(data)` exercises the code under
+    test. Fails unless `call` runs the same number of queries at every size.
+    Returns {size: queries}.
+    """
+    counts, captured = {}, {}
+    for size in sizes:
+        data = build(size)
+        _, captured[size], _ = measure(lambda: call(data))
+        counts[size] = len(captured[size])
+    if len(set(counts.values())) > 1:
+        largest = max(sizes)
+        raise AssertionError(f"The query count grows with the data: {counts}. At size {largest}:\n"
+                             f"{format_queries(captured[largest])}")
+    return counts
+
+
+# --- Endpoint budgets ------------------------------------------------------
+
+def named_url_patterns(patterns=None, prefix='', namespace=None):
+    """(url name, route) of every named URL, Django's admin excluded."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace == 'admin':
+                continue
+            yield from named_url_patterns(pattern.url_patterns, prefix + str(pattern.pattern),
+                                          pattern.namespace or namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            yield name, prefix + str(pattern.pattern)
+
+
+def load_budgets(path=BUDGETS_FILE):
+    with open(path, encoding='utf-8') as budgets:
+        return json.load(budgets)
+
+
+PLACEHOLDER = re.compile(r'^\{(\w+)\}$')
+
+
+def fill(value, variables):
+    """
+    Replace the `{name}` placeholders of a budget's path/data with fixture
+    values. A string that is exactly one placeholder becomes the value
+    itself (so numbers and lists keep their type).
+    """
+    if isinstance(value, str):
+        match = PLACEHOLDER.match(value)
+        if match:
+            return variables[match.group(1)]
+        return value.format_map(variables)
+    if isinstance(value, list):
+        return [fill(item, variables) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, variables) for key, item in value.items()}
+    return value
@@ -1,3 +1,353 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from functools import lru_cache
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from analytics.models import DailyProductSales, DailySales, OrderStatusEvent
+from cart.models import Cart, CartItem
+from cart.services import recalculate_totals
+from cart.session import get_cart_store, new_token
+from inventory.models import StockShard
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from users.tokens import ClaimsTokenObtainPairSerializer
+from .idempotency import request_fingerprint
+from .metrics import registry
+from .models import IdempotencyKey
+from .testing import (
+    SIZES, assert_constant_queries, fill, format_queries, load_budgets, max_queries, measure, named_url_patterns,
+    time_budget, time_factor,
+)
+
+
+class PerformanceMiddlewareTests(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        category = Category.objects.create(name='Metrics')
+        for i in range(3):
+            Product.objects.create(name=f'Product {i}', description='...', price=i + 1, category=category)
+
+    def metrics_text(self, **extra):
+        response = self.client.get('/internal/metrics/', **extra)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_measured_per_view(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        text = self.metrics_text()
+        labels = 'view="product-list",method="GET",status="200"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', text)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f'http_request_db_queries_sum{{{labels}}} ', text)
+        self.assertIn(f'http_request_serializer_duration_seconds_total{{{labels}}} ', text)
+        self.assertIn(f'http_response_size_bytes_total{{{labels}}} ', text)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+
+    def test_query_count_matches_the_view(self):
+        # The first list request runs two queries (validators + page); see products/tests.py.
+        self.client.get('/api/products/')
+        text = self.metrics_text()
+        self.assertIn('http_request_db_queries_sum{view="product-list",method="GET",status="200"} 2\n', text)
+        self.assertIn('http_request_db_queries_bucket{view="product-list",method="GET",status="200",le="1"} 0\n',
+                      text)
+
+    def test_async_views_are_measured(self):
+        self.client.get('/api/async/products/')
+        self.assertIn('http_request_db_queries_sum{view="async-product-list",method="GET",status="200"} 2\n',
+                      self.metrics_text())
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_their_queries(self):
+        with self.assertLogs('core.performance', level='WARNING') as logs:
+            self.client.get('/api/products/')
+        message = logs.output[0]
+        self.assertIn('Slow request: GET /api/products/ -> 200 (product-list)', message)
+        self.assertIn('2 queries', message)
+        self.assertIn('FROM "products_product"', message)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='scrape-me')
+    def test_metrics_endpoint_is_internal(self):
+        self.assertEqual(self.client.get('/internal/metrics/').status_code, 404)
+        self.assertEqual(self.client.get('/internal/metrics/', HTTP_AUTHORIZATION='Bearer nope').status_code, 404)
+        self.metrics_text(HTTP_AUTHORIZATION='Bearer scrape-me')
+
+    def test_serializer_time_excludes_queries(self):
+        user = User.objects.create_user('metrics-user', password='pass12345')
+        self.client.force_authenticate(user)
+        self.client.get('/api/cart/')
+        labels = '{view="cart-detail",method="GET",status="200"}'
+        values = {name: float(value) for name, value in
+                  (line.rsplit(' ', 1) for line in self.metrics_text().splitlines() if labels in line)}
+        serializer = values[f'http_request_serializer_duration_seconds_total{labels}']
+        self.assertGreater(serializer, 0)
+        self.assertLess(serializer, values[f'http_request_duration_seconds_sum{labels}']
+                        - values[f'http_request_db_duration_seconds_total{labels}'])
+
+
+class IdempotencyKeyTests(TestCase):
+    url = '/api/payments/mock-pay/'
+
+    def setUp(self):
+        self.user = User.objects.create(username='idempotent', email='idempotent@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.order = Order.objects.create(user=self.user, total_price=15)
+        self.body = {'order_id': self.order.id}
+
+    def pay(self, key='key-1', body=None):
+        return self.client.post(self.url, body or self.body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def claim_in_progress(self, locked_for):
+        fingerprint = request_fingerprint(APIRequestFactory().post(self.url, self.body, format='json'))
+        return IdempotencyKey.objects.create(
+            user=self.user, scope='mock-payment', key='key-1', fingerprint=fingerprint,
+            locked_until=timezone.now() + timedelta(seconds=locked_for),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def test_duplicate_while_in_flight_is_409(self):
+        self.claim_in_progress(locked_for=30)
+        response = self.pay()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('Retry-After', response)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.PENDING)
+
+    def test_stale_lock_is_taken_over(self):
+        self.claim_in_progress(locked_for=-1)
+        self.assertEqual(self.pay().status_code, status.HTTP_200_OK)
+        self.assertEqual(IdempotencyKey.objects.get().status, IdempotencyKey.Status.COMPLETED)
+
+    def test_key_reused_for_another_request_is_422(self):
+        self.pay()
+        other = Order.objects.create(user=self.user, total_price=5)
+        response = self.pay(body={'order_id': other.id})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_keys_are_per_user(self):
+        self.pay()
+        someone_else = User.objects.create(username='someone-else')
+        self.client.force_authenticate(user=someone_else)
+        response = self.pay()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)  # Not their order.
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_client_errors_are_stored_but_server_errors_release_the_key(self):
+        with mock.patch('payments.services.queue_order_confirmation_email', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.pay()
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.pay().status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.pay(key='missing', body={'order_id': 999999}).status_code, 404)
+        replay = self.pay(key='missing', body={'order_id': 999999})
+        self.assertEqual(replay.status_code, 404)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+
+    def test_invalid_key_is_400(self):
+        self.assertEqual(self.pay(key='x' * 256).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self.pay()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertNotIn('Idempotent-Replayed', self.pay())
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+BUDGET_PASSWORD = 'Budget-pass-4417'
+
+
+@lru_cache(maxsize=None)
+def budget_password_hash():
+    # Hashing is slow on purpose; every fixture user shares one hash.
+    return make_password(BUDGET_PASSWORD)
+
+
+def build_shop(size):
+    """
+    The data every endpoint budget runs against, `size` of everything: a
+    shopper with `size` cart lines, `size` orders and a session cart of
+    `size` lines, `size` stock-tracked products, `size` days of sales
+    rollups. Returns the placeholders of config/performance_budgets.json.
+    """
+    admin = User.objects.create(username='budget-admin', is_staff=True, is_superuser=True,
+                                password=budget_password_hash())
+    shopper = User.objects.create(username='budget-shopper', email='shopper@example.com',
+                                  password=budget_password_hash())
+    category = Category.objects.create(name='Budget')
+    products = Product.objects.bulk_create([
+        Product(category=category, sku=f'BUDGET-{i}', name=f'Product {i}', description='A product',
+                price=i + 1)
+        for i in range(size)
+    ])
+    spare = Product.objects.create(category=category, name='Spare', description='Never ordered', price=3)
+    StockShard.objects.bulk_create([StockShard(product=product, shard=0, quantity=1000) for product in products])
+
+    cart = Cart.objects.create(user=shopper)
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in products])
+    recalculate_totals(Cart.objects.filter(pk=cart.pk))
+    orders = Order.objects.bulk_create([Order(user=shopper, total_price=10) for _ in range(size)])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=products[(i + k) % size], quantity=1, price_at_purchase=5)
+        for i, order in enumerate(orders) for k in range(2)
+    ])
+    OrderStatusEvent.objects.bulk_create([OrderStatusEvent(order=order, new_status=order.status) for order in orders])
+    today = timezone.localdate()
+    DailySales.objects.bulk_create([
+        DailySales(day=today - timedelta(days=i), status=Order.OrderStatus.PAID, orders=1, units=1, revenue=5)
+        for i in range(size)
+    ])
+    DailyProductSales.objects.bulk_create([
+        DailyProductSales(day=today, product=product, status=Order.OrderStatus.PAID, orders=1, units=1, revenue=5)
+        for product in products
+    ])
+
+    cart_token = new_token()
+    for product in products:
+        get_cart_store().set(cart_token, product.id, 1)
+
+    shopper_refresh = ClaimsTokenObtainPairSerializer.get_token(shopper)
+    return {
+        'users': {
+            'admin': str(ClaimsTokenObtainPairSerializer.get_token(admin).access_token),
+            'shopper': str(shopper_refresh.access_token),
+        },
+        'product': products[0].id,
+        'spare': spare.id,
+        'category': category.id,
+        'order': orders[0].id,
+        'cart_token': cart_token,
+        'refresh': str(shopper_refresh),
+        'password': BUDGET_PASSWORD,
+        'items': [{'product_id': product.id, 'quantity': 2} for product in products],
+        'today': today.isoformat(),
+    }
+
+
+# Requests over SLOW_REQUEST_MS are logged; the budgets below decide what is too slow here.
+@override_settings(SLOW_REQUEST_MS=60_000)
+class EndpointBudgetTests(TestCase):
+    """
+    Every URL of config/urls.py has query-count and wall-time budgets in
+    config/performance_budgets.json, checked at every data size in SIZES:
+    a request may not run more queries than its budget, nor more queries
+    with more data (an N+1), nor take longer than its time budget.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.budgets = load_budgets()
+
+    def request(self, spec, shop):
+        client = APIClient()
+        user = spec.get('user', 'anonymous')
+        if user != 'anonymous':
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {shop['users'][user]}")
+        headers = {f"HTTP_{name.upper().replace('-', '_')}": fill(value, shop)
+                   for name, value in spec.get('headers', {}).items()}
+        data = fill(spec.get('data'), shop)
+        request_format = spec.get('format', 'json')
+        if request_format == 'multipart':
+            data = {key: SimpleUploadedFile(value['name'], value['content'].encode())
+                    if isinstance(value, dict) else value for key, value in data.items()}
+        method = getattr(client, spec['method'].lower())
+        response = method(fill(spec['path'], shop), data, format=request_format, **headers)
+        if response.streaming:
+            # Streaming responses query while they are consumed.
+            b''.join(response.streaming_content)
+        return response
+
+    def run_budget(self, name, spec, size):
+        """Queries and milliseconds of one request against a shop of `size`; the data is rolled back."""
+        for cache in caches.all():
+            cache.clear()  # Cold caches: no pages or auth state from earlier runs.
+        with transaction.atomic():
+            shop = build_shop(size)
+            response, queries, elapsed = measure(lambda: self.request(spec, shop))
+            transaction.set_rollback(True)
+        expected = spec.get('status', 200)
+        self.assertEqual(response.status_code, expected,
+                         f"{name} {spec['method']} at size {size}: {getattr(response, 'data', response)}")
+        return queries, elapsed
+
+    def test_every_url_has_a_budget(self):
+        budgeted = set(self.budgets['endpoints']) | set(self.budgets.get('skip', {}))
+        missing = [f'{name} ({route})' for name, route in named_url_patterns() if name not in budgeted]
+        self.assertEqual(missing, [], "Add these URLs to config/performance_budgets.json")
+
+    def test_endpoints_stay_within_budget(self):
+        default_ms = self.budgets['default_max_ms']
+        for name, specs in self.budgets['endpoints'].items():
+            for spec in specs:
+                with self.subTest(endpoint=name, method=spec['method']):
+                    counts = {}
+                    per_item = spec.get('per_item_queries', 0)
+                    for size in SIZES:
+                        queries, elapsed = self.run_budget(name, spec, size)
+                        counts[size] = len(queries)
+                        budget = spec['max_queries'] + per_item * (size - 1)
+                        self.assertLessEqual(
+                            len(queries), budget,
+                            f"{name} {spec['method']} ran {len(queries)} queries at size {size}, "
+                            f"the budget is {budget}:\n{format_queries(queries)}")
+                        limit = spec.get('max_ms', default_ms) * time_factor()
+                        self.assertLessEqual(elapsed, limit, f"{name} {spec['method']} took {elapsed:.0f}ms "
+                                                             f"at size {size}, the budget is {limit:.0f}ms")
+                    if not per_item:
+                        self.assertEqual(len(set(counts.values())), 1,
+                                         f"{name} {spec['method']}: the query count grows with the data {counts}")
+
+
+class BudgetHelperTests(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Helpers')
+
+    def test_max_queries(self):
+        with max_queries(1):
+            Product.objects.count()
+        with self.assertRaisesMessage(AssertionError, '2 queries executed, at most 1 allowed'):
+            with max_queries(1):
+                Product.objects.count()
+                Category.objects.count()
+
+    def test_time_budget_as_decorator(self):
+        @time_budget(0)
+        def slow():
+            sum(range(10_000))
+
+        with self.assertRaisesMessage(AssertionError, 'the budget is 0ms'):
+            slow()
+
+    def test_assert_constant_queries_catches_n_plus_one(self):
+        def build(size):
+            Product.objects.all().delete()
+            Product.objects.bulk_create([Product(category=self.category, name=f'P{i}', description='', price=1)
+                                         for i in range(size)])
+
+        def joined(_):
+            return [product.category.name for product in Product.objects.select_related('category')]
+
+        def lazy(_):
+            return [product.category.name for product in Product.objects.all()]
+
+        self.assertEqual(assert_constant_queries(build, joined), {1: 1, 10: 1, 100: 1})
+        with self.assertRaisesMessage(AssertionError, 'The query count grows with the data'):
+            assert_constant_queries(build, lazy)
@@ -1,7 +1,8 @@
+
 from django.urls import path
-from .views import home
+from .views import home, metrics
 
 urlpatterns = [
     path('', home, name='home'),
+    path('internal/metrics/', metrics, name='metrics'),
 ]
-
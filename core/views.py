@@ -1,7 +1,26 @@
-from django.http import HttpResponse
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from .metrics import registry
 
 def home(request):
     return HttpResponse("Hello, Django!")
 
-# Create your views here.
 
+def metrics_allowed(request):
+    # Internal only: a scraper either sends the METRICS_TOKEN as a bearer
+    # token, or connects from one of METRICS_ALLOWED_IPS.
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+# Request metrics of this worker process, in the Prometheus text format
+# (see core/metrics.py). Anyone else gets a plain 404.
+def metrics(request):
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,5 @@
+from django.contrib import admin
+from .models import StockShard, StockReservation
+
+admin.site.register(StockShard)
+admin.site.register(StockReservation)
@@ -0,0 +1,29 @@
+# In inventory/management/commands/release_expired_reservations.py
+import time
+
+from django.core.management.base import BaseCommand
+from inventory.services import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Return the stock held by expired cart reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, checking for expired reservations.")
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help="Seconds between checks (with --loop).")
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                released = release_expired_reservations()
+                total += released
+                if not released:
+                    break
+            if total:
+                self.stdout.write(f"Released {total} expired reservation(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,82 @@
+# In inventory/management/commands/stock_load_test.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from cart.models import Cart
+from cart.services import apply_cart_changes
+from inventory.models import StockReservation
+from inventory.services import OutOfStockError, available_quantity, set_stock
+from orders.models import Order
+from orders.services import checkout
+from products.models import Category, Product
+
+USERNAME_PREFIX = 'stock-load-test-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test: many concurrent shoppers buy ONE product through the real checkout "
+        "(add to cart, which reserves stock, then orders.services.checkout, which consumes it). "
+        "Prints throughput and checks that nothing was oversold. "
+        "Run it against PostgreSQL; SQLite serializes all writers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=500, help="Number of checkouts to attempt.")
+        parser.add_argument('--threads', type=int, default=50, help="Concurrent database connections.")
+        parser.add_argument('--stock', type=int, default=400, help="Units on sale (fewer than buyers = sell-out).")
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 8],
+                            help="Shard counts to compare, e.g. --shards 1 4 16.")
+
+    def handle(self, *args, **options):
+        category = Category.objects.create(name='Load test')
+        product = Product.objects.create(name='Flash sale item', description='Load test',
+                                         price=1, category=category)
+        buyers = User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{i}', password='!') for i in range(options['buyers'])
+        ])
+        try:
+            for shards in options['shards']:
+                self._run(product, buyers, shards, options)
+        finally:
+            # Cascades to the carts, reservations and orders, then to the
+            # product and its stock shards.
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            category.delete()
+
+    def _run(self, product, buyers, shards, options):
+        # Every round starts from empty carts and no orders.
+        Order.objects.filter(user__in=buyers).delete()
+        Cart.objects.filter(user__in=buyers).delete()
+        set_stock(product.id, options['stock'], shards=shards)
+
+        def buy(user):
+            try:
+                # The same two steps as the API: each is its own transaction.
+                cart, _ = Cart.objects.get_or_create(user_id=user.id)
+                apply_cart_changes(cart, {product.id: 1})
+                checkout(user)
+                return True
+            except OutOfStockError:
+                return False
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(buy, buyers))
+        elapsed = time.perf_counter() - started
+
+        sold = sum(results)
+        left = available_quantity(product.id)
+        ordered = Order.objects.filter(user__in=buyers).count()
+        held = StockReservation.objects.filter(product=product).count()
+        self.stdout.write(
+            f"shards={shards:<3} checkouts={len(buyers)} sold={sold} left={left} "
+            f"time={elapsed:.2f}s throughput={len(buyers) / elapsed:.0f} checkouts/s"
+        )
+        if sold + left != options['stock'] or sold > options['stock'] or ordered != sold or held:
+            self.stderr.write(self.style.ERROR("Stock mismatch: oversold, lost units or leftover reservations!"))
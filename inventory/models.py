@@ -0,0 +1,51 @@
+from django.db import models
+from cart.models import Cart
+from products.models import Product
+
+
+class StockShard(models.Model):
+    """
+    One slice of a product's stock.
+
+    A product's stock is split over several rows ("shards") instead of one
+    counter. Every sale decrements ONE shard with a conditional UPDATE, so
+    hundreds of concurrent checkouts of the same product wait on different
+    row locks instead of queueing behind a single hot row.
+
+    The available quantity is the sum of all shards. Products without any
+    shard are not stock-tracked (unlimited), which is how the catalog
+    behaved before this app existed.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards')
+    shard = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='unique_stock_shard'),
+            # Belt and braces: the database itself refuses to oversell.
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='stock_shard_non_negative'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} shard {self.shard}: {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a cart. The quantity has already been taken out of the
+    shards; if the cart isn't checked out before `expires_at`, the
+    `release_expired_reservations` command puts it back.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_reservation'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} reserved until {self.expires_at}"
@@ -0,0 +1,225 @@
+# In inventory/services.py
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import StockReservation, StockShard
+
+
+class OutOfStockError(Exception):
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f"Not enough stock for product {product_id} (requested {requested}).")
+
+
+class StockBelowReservedError(Exception):
+    def __init__(self, product_id, quantity, reserved):
+        self.product_id = product_id
+        self.quantity = quantity
+        self.reserved = reserved
+        super().__init__(f"Product {product_id}: {reserved} units are held in carts, more than {quantity}.")
+
+
+# --- Stock levels --------------------------------------------------------
+
+def set_stock(product_id, quantity, shards=None):
+    """
+    Set a product's stock to `quantity` units on hand, spread evenly over
+    `shards` rows. Used by admins when receiving goods or correcting counts.
+
+    Units held by cart reservations were already taken from the shards and
+    go back to them when released, so the shards get `quantity` minus those
+    units. Returns the available quantity; raises StockBelowReservedError
+    if the carts hold more than `quantity`.
+    """
+    shards = shards or settings.INVENTORY_SHARDS
+    with transaction.atomic():
+        # Lock the product's shards first. Every reservation that takes or
+        # gives back units updates a shard, so it either committed before
+        # this lock (and is counted below) or waits until the new shards are
+        # in place. The reservations are read without locking them:
+        # `reserve_many` and checkout lock reservations before shards, so
+        # waiting on them here could deadlock.
+        list(StockShard.objects.select_for_update().filter(product_id=product_id).order_by('shard').values_list('pk'))
+        reserved = StockReservation.objects.filter(product_id=product_id).aggregate(
+            total=Sum('quantity'))['total'] or 0
+        if reserved > quantity:
+            raise StockBelowReservedError(product_id, quantity, reserved)
+
+        available = quantity - reserved
+        base, extra = divmod(available, shards)
+        StockShard.objects.filter(product_id=product_id).delete()
+        StockShard.objects.bulk_create([
+            StockShard(product_id=product_id, shard=index, quantity=base + (1 if index < extra else 0))
+            for index in range(shards)
+        ])
+    return available
+
+
+def available_quantity(product_id):
+    """Units that can still be sold, or None if the product isn't tracked."""
+    total = StockShard.objects.filter(product_id=product_id).aggregate(total=Sum('quantity'))['total']
+    return total
+
+
+def tracked_shards(product_ids):
+    """
+    Map each stock-tracked product id to its list of shard numbers, in one
+    query. Products missing from the result are not tracked.
+    """
+    shards = {}
+    for product_id, shard in StockShard.objects.filter(product_id__in=product_ids).values_list('product_id', 'shard'):
+        shards.setdefault(product_id, []).append(shard)
+    return shards
+
+
+def take(product_id, quantity, shards):
+    """
+    Atomically remove `quantity` units from a product's stock.
+
+    Fast path: starting at a random shard, try a conditional decrement
+        UPDATE ... SET quantity = quantity - n WHERE shard = k AND quantity >= n
+    on each shard until one succeeds. Concurrent buyers start on different
+    shards, so they rarely wait on the same row lock.
+
+    Slow path: no single shard holds enough (e.g. the last units are spread
+    around), so lock all of the product's shards and drain them in order.
+    """
+    start = random.randrange(len(shards))
+    for shard in shards[start:] + shards[:start]:
+        updated = (
+            StockShard.objects
+            .filter(product_id=product_id, shard=shard, quantity__gte=quantity)
+            .update(quantity=F('quantity') - quantity)
+        )
+        if updated:
+            return
+
+    with transaction.atomic():
+        rows = list(StockShard.objects.select_for_update().filter(product_id=product_id).order_by('shard'))
+        if sum(row.quantity for row in rows) < quantity:
+            raise OutOfStockError(product_id, quantity)
+        remaining = quantity
+        for row in rows:
+            taken = min(row.quantity, remaining)
+            row.quantity -= taken
+            remaining -= taken
+        StockShard.objects.bulk_update(rows, ['quantity'])
+
+
+def give_back(product_id, quantity, shards):
+    """Return units to stock (spread onto a random shard, no locking needed)."""
+    (StockShard.objects
+        .filter(product_id=product_id, shard=random.choice(shards))
+        .update(quantity=F('quantity') + quantity))
+
+
+def move_stock(product_id, held, quantity, shards):
+    """Go from holding `held` units to `quantity`: take or give back the difference."""
+    if quantity > held:
+        take(product_id, quantity - held, shards)
+    elif quantity < held:
+        give_back(product_id, held - quantity, shards)
+
+
+# --- Cart reservations ---------------------------------------------------
+
+def reservation_expiry():
+    return timezone.now() + timedelta(minutes=settings.CART_RESERVATION_MINUTES)
+
+
+def reserve_many(cart_id, quantities, shards):
+    """
+    Make the cart hold exactly `quantities[product_id]` units of each product
+    (0 releases the reservation). Only the difference with what is already
+    held is taken from or given back to the stock. Raises OutOfStockError.
+
+    `shards` is the `tracked_shards` map the caller already loaded; products
+    missing from it aren't stock-tracked and are skipped. The reservations
+    are locked and written with one query each, whatever the number of
+    products; only the stock moves are per product.
+    """
+    product_ids = sorted(product_id for product_id in quantities if product_id in shards)
+    if not product_ids:
+        return
+
+    with transaction.atomic():
+        reservations = {
+            reservation.product_id: reservation
+            for reservation in StockReservation.objects.select_for_update()
+            .filter(cart_id=cart_id, product_id__in=product_ids).order_by('product_id')
+        }
+        expires_at = reservation_expiry()
+        to_create, to_update, to_delete = [], [], []
+        # Sorted, so concurrent carts take stock row locks in the same order.
+        for product_id in product_ids:
+            quantity = quantities[product_id]
+            reservation = reservations.get(product_id)
+            move_stock(product_id, reservation.quantity if reservation else 0, quantity, shards[product_id])
+
+            if quantity == 0:
+                if reservation:
+                    to_delete.append(reservation.pk)
+            elif reservation:
+                reservation.quantity = quantity
+                reservation.expires_at = expires_at
+                to_update.append(reservation)
+            else:
+                to_create.append(StockReservation(
+                    cart_id=cart_id, product_id=product_id, quantity=quantity, expires_at=expires_at))
+
+        if to_create:
+            StockReservation.objects.bulk_create(to_create)
+        if to_update:
+            StockReservation.objects.bulk_update(to_update, ['quantity', 'expires_at'])
+        if to_delete:
+            StockReservation.objects.filter(pk__in=to_delete).delete()
+
+
+def consume_for_checkout(cart_id, cart_items):
+    """
+    Called inside the checkout transaction: turn the cart's reservations
+    into sales, taking any missing units from stock. Raises OutOfStockError,
+    which rolls the whole checkout back.
+    """
+    shards = tracked_shards([item.product_id for item in cart_items])
+    if not shards:
+        return
+
+    held = dict(
+        StockReservation.objects.select_for_update()
+        .filter(cart_id=cart_id, product_id__in=shards)
+        .values_list('product_id', 'quantity')
+    )
+    # Stable order so concurrent checkouts take shard locks in the same order.
+    for item in sorted(cart_items, key=lambda item: item.product_id):
+        if item.product_id not in shards:
+            continue
+        move_stock(item.product_id, held.get(item.product_id, 0), item.quantity, shards[item.product_id])
+
+    StockReservation.objects.filter(cart_id=cart_id).delete()
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Put the stock of expired reservations back. Returns how many were released.
+    SKIP LOCKED lets this run while carts are being checked out.
+    """
+    with transaction.atomic():
+        expired = list(
+            StockReservation.objects.select_for_update(skip_locked=True)
+            .filter(expires_at__lte=timezone.now())
+            .order_by('expires_at')[:batch_size]
+        )
+        if not expired:
+            return 0
+        shards = tracked_shards({reservation.product_id for reservation in expired})
+        for reservation in expired:
+            if reservation.product_id in shards:
+                give_back(reservation.product_id, reservation.quantity, shards[reservation.product_id])
+        StockReservation.objects.filter(pk__in=[reservation.pk for reservation in expired]).delete()
+    return len(expired)
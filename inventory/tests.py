@@ -0,0 +1,152 @@
+# In inventory/tests.py
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from cart.models import Cart
+from products.models import Category, Product
+from .models import StockReservation, StockShard
+from .services import OutOfStockError, available_quantity, set_stock, take, tracked_shards
+
+
+class StockServiceTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Stock')
+        self.product = Product.objects.create(name='Lamp', description='...', price=20, category=category)
+
+    def test_set_stock_spreads_over_shards(self):
+        set_stock(self.product.id, 10, shards=4)
+        quantities = list(StockShard.objects.filter(product=self.product).values_list('quantity', flat=True))
+        self.assertEqual(sorted(quantities), [2, 2, 3, 3])
+        self.assertEqual(available_quantity(self.product.id), 10)
+
+    def test_untracked_product_has_no_quantity(self):
+        self.assertIsNone(available_quantity(self.product.id))
+
+    def test_take_drains_several_shards_when_needed(self):
+        set_stock(self.product.id, 4, shards=4)  # one unit per shard
+        take(self.product.id, 3, tracked_shards([self.product.id])[self.product.id])
+        self.assertEqual(available_quantity(self.product.id), 1)
+
+    def test_take_never_oversells(self):
+        set_stock(self.product.id, 2, shards=2)
+        with self.assertRaises(OutOfStockError):
+            take(self.product.id, 3, [0, 1])
+        self.assertEqual(available_quantity(self.product.id), 2)
+
+
+class CartReservationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='reserver')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Stock')
+        self.product = Product.objects.create(name='Lamp', description='...', price=20, category=category)
+        set_stock(self.product.id, 5, shards=2)
+
+    def _set(self, quantity):
+        return self.client.post('/api/cart/', {'product_id': self.product.id, 'quantity': quantity}, format='json')
+
+    def test_adding_to_cart_reserves_stock(self):
+        self.assertEqual(self._set(3).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(available_quantity(self.product.id), 2)
+
+        # Lowering the quantity gives the difference back.
+        self._set(1)
+        self.assertEqual(available_quantity(self.product.id), 4)
+        self.assertEqual(StockReservation.objects.get().quantity, 1)
+
+    def test_cannot_reserve_more_than_available(self):
+        response = self._set(6)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(available_quantity(self.product.id), 5)
+        self.assertFalse(Cart.objects.get(user=self.user).items.exists())
+
+    def test_removing_from_cart_releases_stock(self):
+        self._set(2)
+        self.client.delete('/api/cart/', {'product_id': self.product.id}, format='json')
+        self.assertEqual(available_quantity(self.product.id), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_consumes_reservation(self):
+        self._set(2)
+        response = self.client.post('/api/orders/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The reserved units are now sold; nothing goes back to stock.
+        self.assertEqual(available_quantity(self.product.id), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_recount_keeps_reserved_units_apart(self):
+        self._set(2)
+        # The admin counts 8 units on the shelf, 2 of them in this cart.
+        self.assertEqual(set_stock(self.product.id, 8, shards=2), 6)
+        self.assertEqual(available_quantity(self.product.id), 6)
+        # Releasing the reservation brings the stock back to the count.
+        self.client.delete('/api/cart/', {'product_id': self.product.id}, format='json')
+        self.assertEqual(available_quantity(self.product.id), 8)
+
+    def test_recount_below_reserved_units_is_rejected(self):
+        self._set(3)
+        admin = User.objects.create(username='stock-admin', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.put(f'/api/inventory/{self.product.id}/', {'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()['reserved'], 3)
+        self.assertEqual(available_quantity(self.product.id), 2)
+
+        response = self.client.put(f'/api/inventory/{self.product.id}/', {'quantity': 10}, format='json')
+        self.assertEqual(response.json()['available'], 7)
+
+    def test_checkout_fails_when_expired_stock_was_sold(self):
+        self._set(2)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        call_command('release_expired_reservations', stdout=mock.MagicMock())
+        self.assertEqual(available_quantity(self.product.id), 5)
+
+        # Someone else buys everything in the meantime.
+        take(self.product.id, 5, [0, 1])
+
+        response = self.client.post('/api/orders/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        # The checkout rolled back: the cart is intact.
+        self.assertEqual(Cart.objects.get(user=self.user).items.count(), 1)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql',
+                     "Needs a database that handles concurrent writers (PostgreSQL).")
+class ConcurrentStockTests(TransactionTestCase):
+
+    def test_concurrent_buyers_never_oversell(self):
+        category = Category.objects.create(name='Flash')
+        product = Product.objects.create(name='Hot item', description='...', price=1, category=category)
+        set_stock(product.id, 50, shards=8)
+        shards = tracked_shards([product.id])[product.id]
+        sold = []
+
+        def buy():
+            try:
+                with transaction.atomic():
+                    take(product.id, 1, shards)
+                sold.append(1)
+            except OutOfStockError:
+                pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(120)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(sold), 50)
+        self.assertEqual(available_quantity(product.id), 0)
@@ -0,0 +1,7 @@
+# In inventory/urls.py
+from django.urls import path
+from .views import StockView
+
+urlpatterns = [
+    path('<int:product_id>/', StockView.as_view(), name='product-stock'),
+]
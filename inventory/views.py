@@ -0,0 +1,38 @@
+# In inventory/views.py
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from products.models import Product
+from .services import StockBelowReservedError, available_quantity, set_stock
+
+
+class StockView(APIView):
+    """
+    Admin endpoint to read or set a product's stock level.
+    GET returns the available quantity (null = not stock-tracked).
+    PUT expects {"quantity": <int>}, the units on hand (including those held
+    in carts), and replaces the stock level. 409 if carts hold more.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, product_id, *args, **kwargs):
+        get_object_or_404(Product, pk=product_id)
+        return Response({"product_id": product_id, "available": available_quantity(product_id)})
+
+    def put(self, request, product_id, *args, **kwargs):
+        get_object_or_404(Product, pk=product_id)
+        try:
+            quantity = int(request.data.get('quantity'))
+            if quantity < 0:
+                raise ValueError
+        except (ValueError, TypeError):
+            return Response({"error": "Quantity must be a non-negative integer."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            available = set_stock(product_id, quantity)
+        except StockBelowReservedError as exc:
+            return Response({"error": f"{exc.reserved} units are held in carts.", "reserved": exc.reserved},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({"product_id": product_id, "available": available})
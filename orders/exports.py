@@ -0,0 +1,44 @@
+# In orders/exports.py
+# Rows for the streaming order dump (see core/streaming.py), with the same
+# shape as OrderSerializer.
+#
+# Orders and their items come from ONE query, a LEFT JOIN ordered by order,
+# read through a server-side cursor; consecutive rows of the same order are
+# grouped back together. Memory stays flat and there is no N+1.
+from itertools import groupby
+
+from django.conf import settings
+from .models import Order
+
+DUMP_COLUMNS = (
+    'id', 'user__username', 'created_at', 'status', 'total_price',
+    'items__id', 'items__product_id', 'items__product__name', 'items__product__price',
+    'items__quantity', 'items__price_at_purchase',
+)
+
+
+def order_dump_rows(queryset=None):
+    queryset = Order.objects.all() if queryset is None else queryset
+    rows = queryset.order_by('id', 'items__id').values_list(*DUMP_COLUMNS).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE)
+    for order_id, order_rows in groupby(rows, key=lambda row: row[0]):
+        first = next(order_rows)
+        items = []
+        for row in (first, *order_rows):
+            item_id, product_id, product_name, product_price, quantity, price_at_purchase = row[5:]
+            if item_id is None:  # An order without items (LEFT JOIN).
+                continue
+            items.append({
+                'id': item_id,
+                'product': {'id': product_id, 'name': product_name, 'price': f'{product_price:.2f}'},
+                'quantity': quantity,
+                'price_at_purchase': f'{price_at_purchase:.2f}',
+            })
+        yield {
+            'id': order_id,
+            'user': first[1],
+            'created_at': first[2],
+            'status': first[3],
+            'total_price': f'{first[4]:.2f}',
+            'items': items,
+        }
@@ -0,0 +1,8 @@
+# In orders/pagination.py
+from core.pagination import KeysetPagination
+
+
+class OrderCursorPagination(KeysetPagination):
+    # Most recent orders first; `id` breaks ties between orders placed in
+    # the same instant. Backed by the (user, -created_at, -id) index.
+    ordering = ('-created_at', '-id')
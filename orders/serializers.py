@@ -1,5 +1,6 @@
 # In orders/serializers.py
 from rest_framework import serializers
+from core.fastserializers import FastSerializer
 from .models import Order, OrderItem
 from cart.serializers import SimpleProductSerializer
 
@@ -12,6 +13,14 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'quantity', 'price_at_purchase']
 
 
+# Order "headers" only, for `?view=summary` on the order history.
+# It never touches the order items.
+class OrderSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = ['id', 'created_at', 'status', 'total_price']
+
+
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user = serializers.StringRelatedField()  # Display username
@@ -21,3 +30,42 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'created_at', 'status', 'total_price',
                   'items']
 
+
+# Fast equivalents of the serializers above, built from `.values()` rows
+# (see core/fastserializers.py). Keep them in sync.
+class OrderItemFastSerializer(FastSerializer):
+    model = OrderItem
+    fields = {
+        'id': 'id',
+        'product': {'id': 'product_id', 'name': 'product__name', 'price': 'product__price'},
+        'quantity': 'quantity',
+        'price_at_purchase': 'price_at_purchase',
+    }
+    extra_columns = ('order_id',)
+
+
+class OrderSummaryFastSerializer(FastSerializer):
+    model = Order
+    fields = {'id': 'id', 'created_at': 'created_at', 'status': 'status', 'total_price': 'total_price'}
+
+
+class OrderFastSerializer(FastSerializer):
+    model = Order
+    fields = {
+        'id': 'id',
+        'user': 'user__username',  # StringRelatedField: str(user) is the username.
+        'created_at': 'created_at',
+        'status': 'status',
+        'total_price': 'total_price',
+    }
+
+    def serialize_many(self, rows):
+        # The items of every order in `rows` come from ONE extra query.
+        rows = list(rows)
+        item_serializer = OrderItemFastSerializer(self.context)
+        items = {row['id']: [] for row in rows}
+        item_rows = item_serializer.values(
+            OrderItem.objects.filter(order_id__in=items).order_by('id'))
+        for item_row in item_rows:
+            items[item_row['order_id']].append(item_serializer.to_representation(item_row))
+        return [{**self.to_representation(row), 'items': items[row['id']]} for row in rows]
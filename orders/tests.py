@@ -1,10 +1,18 @@
-from django.test import TestCase
+import json
+import threading
+import unittest
+
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from products.models import Product, Category
 from cart.models import Cart
 from .models import Order, OrderItem
+from .serializers import OrderSerializer
+from .services import EmptyCartError, checkout, order_with_items_queryset
 
 
 class OrderCreationTestCase(APITestCase):
@@ -79,3 +87,262 @@ class OrderCreationTestCase(APITestCase):
         cart.refresh_from_db() # Refresh the cart object from the database
         self.assertEqual(cart.items.count(), 0)
 
+
+    def test_empty_cart_is_rejected(self):
+        Cart.objects.create(user=self.user)
+        response = self.client.post('/api/orders/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Your cart is empty.')
+
+    def test_missing_cart_is_rejected(self):
+        response = self.client.post('/api/orders/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'You do not have a cart.')
+
+
+class CheckoutQueryCountTests(APITestCase):
+    """
+    Benchmark-style check: checkout must cost the same number of queries
+    whatever the size of the cart.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='bulkbuyer')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Bulk')
+        Product.objects.bulk_create([
+            Product(name=f'Part {i}', description='...', price=1, category=category)
+            for i in range(200)
+        ])
+        self.products = list(Product.objects.all())
+        self.cart = Cart.objects.create(user=self.user)
+
+    def _checkout_queries(self, item_count):
+        self.cart.items.bulk_create([
+            self.cart.items.model(cart=self.cart, product=product, quantity=2)
+            for product in self.products[:item_count]
+        ])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/orders/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['items']), item_count)
+        self.assertEqual(float(response.data['total_price']), 2 * item_count)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant_for_1_and_200_items(self):
+        small = self._checkout_queries(1)
+        large = self._checkout_queries(200)
+        self.assertEqual(small, large)
+        self.assertEqual(self.cart.items.count(), 0)
+
+
+class OrderHistoryTests(APITestCase):
+    """
+    Order history is cursor-paginated and costs a fixed number of queries
+    per page, whatever the number of orders and items.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='regular')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='History')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Item {i}', description='...', price=3, category=category)
+            for i in range(5)
+        ])
+        other = User.objects.create(username='someone-else')
+        Order.objects.create(user=other, total_price=1)
+
+    def _create_orders(self, count):
+        orders = Order.objects.bulk_create([
+            Order(user=self.user, total_price=15) for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price_at_purchase=3)
+            for order in orders for product in self.products
+        ])
+
+    def _history_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(ctx.captured_queries)
+
+    def test_pages_cover_every_order_once(self):
+        self._create_orders(7)
+        seen = []
+        url = '/api/orders/history/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [order['id'] for order in response.data['results']]
+            url = response.data['next']
+        expected = list(Order.objects.filter(user=self.user)
+                        .order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._create_orders(20)
+        small, small_queries = self._history_queries('/api/orders/history/?page_size=2')
+        large, large_queries = self._history_queries('/api/orders/history/?page_size=20')
+        self.assertEqual(len(small.data['results']), 2)
+        self.assertEqual(len(large.data['results']), 20)
+        self.assertEqual(len(large.data['results'][0]['items']), 5)
+        self.assertEqual(small_queries, large_queries)
+
+    def test_summary_view_skips_items(self):
+        self._create_orders(3)
+        response, queries = self._history_queries('/api/orders/history/?view=summary')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(set(response.data['results'][0]),
+                         {'id', 'created_at', 'status', 'total_price'})
+        # A single query for the orders; no order items, no users.
+        self.assertEqual(queries, 1)
+
+    def test_unknown_view_is_rejected(self):
+        response = self.client.get('/api/orders/history/?view=everything')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderStreamTests(APITestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(
+            user=User.objects.create_superuser('partner-admin', 'admin@example.com', 'pass12345'))
+        category = Category.objects.create(name='Stream')
+        products = Product.objects.bulk_create([
+            Product(name=f'Item {i}', description='...', price=4, category=category) for i in range(3)
+        ])
+        buyer = User.objects.create(username='buyer')
+        for item_count in (2, 0, 3):
+            order = Order.objects.create(user=buyer, total_price=4 * item_count)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price_at_purchase=4)
+                for product in products[:item_count]
+            ])
+
+    def test_rows_match_the_order_serializer(self):
+        orders = order_with_items_queryset().order_by('id')
+        expected = json.loads(json.dumps(OrderSerializer(orders, many=True).data))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/orders/stream/?stream=json')
+            body = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(body), expected)
+        self.assertEqual([len(order['items']) for order in expected], [2, 0, 3])
+        # One query for every order and item (the user lookup is the auth).
+        self.assertEqual(len([q for q in ctx.captured_queries if 'orders_order' in q['sql']]), 1)
+
+        response = self.client.get('/api/orders/stream/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=User.objects.get(username='buyer'))
+        response = self.client.get('/api/orders/stream/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OrderFastSerializerParityTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='fast-buyer')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Parity')
+        products = [
+            Product.objects.create(name=f'Item {i}', description='...', price=price, category=category)
+            for i, price in enumerate(['1', '2.5', '19.99'])
+        ]
+        for item_count in (3, 0, 1, 2):
+            order = Order.objects.create(user=self.user, total_price='12.5', status='Paid')
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=2, price_at_purchase=product.price)
+                for product in products[:item_count]
+            ])
+
+    def assertSameBytes(self, url):
+        with override_settings(FAST_SERIALIZERS=False):
+            drf = self.client.get(url)
+        with override_settings(FAST_SERIALIZERS=True):
+            fast = self.client.get(url)
+        self.assertEqual(drf.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, drf.content)
+
+    def test_history_pages(self):
+        self.assertSameBytes('/api/orders/history/')
+        next_url = self.client.get('/api/orders/history/?page_size=2').data['next']
+        self.assertSameBytes(next_url)
+
+    def test_summary(self):
+        self.assertSameBytes('/api/orders/history/?view=summary')
+
+    def test_fast_history_query_count(self):
+        with override_settings(FAST_SERIALIZERS=True), CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/orders/history/')
+        # The page of orders (user joined), then all of their items.
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+
+@unittest.skipUnless(connection.features.has_select_for_update,
+                     "Row locking needs a database with SELECT ... FOR UPDATE (PostgreSQL).")
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """
+    Two checkouts of the same cart racing each other must produce exactly one order.
+    """
+
+    def test_no_double_checkout(self):
+        user = User.objects.create(username='racer')
+        category = Category.objects.create(name='Race')
+        product = Product.objects.create(name='Widget', description='...', price=5, category=category)
+        cart = Cart.objects.create(user=user)
+        cart.items.create(product=product, quantity=1)
+
+        barrier = threading.Barrier(2)
+        outcomes = []
+
+        def attempt():
+            try:
+                barrier.wait()
+                checkout(user)
+                outcomes.append('order')
+            except EmptyCartError:
+                outcomes.append('empty')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['empty', 'order'])
+        self.assertEqual(Order.objects.filter(user=user).count(), 1)
+
+
+class OrderIdempotencyTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='retrying-shopper')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Retries')
+        product = Product.objects.create(name='Lamp', category=category, price=20)
+        Cart.objects.create(user=self.user).items.create(product=product, quantity=1)
+
+    def test_retry_replays_the_first_order(self):
+        first = self.client.post('/api/orders/', {}, format='json', HTTP_IDEMPOTENCY_KEY='order-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            retry = self.client.post('/api/orders/', {}, format='json', HTTP_IDEMPOTENCY_KEY='order-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_without_a_key_a_retry_runs_again(self):
+        self.client.post('/api/orders/', {}, format='json')
+        response = self.client.post('/api/orders/', {}, format='json')
+        # The cart is empty by then, so no second order either way.
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('Idempotent-Replayed', response)
@@ -1,8 +1,9 @@
 # In orders/urls.py
 from django.urls import path
-from .views import OrderCreateView, OrderHistoryView
+from .views import OrderCreateView, OrderHistoryView, OrderStreamView
 
 urlpatterns = [
     path('', OrderCreateView.as_view(), name='order-create'),
     path('history/', OrderHistoryView.as_view(), name='order-history'),
+    path('stream/', OrderStreamView.as_view(), name='order-stream'),
 ]
@@ -2,65 +2,95 @@ from django.shortcuts import render
 # In orders/views.py
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from django.db import transaction
-from .models import Order, OrderItem
-from cart.models import Cart
-from .serializers import OrderSerializer
+from rest_framework.views import APIView
+from cart.services import merge_session_cart
+from cart.session import token_from_request
+from core.fastserializers import FastListModelMixin
+from core.idempotency import IdempotentMixin
+from core.streaming import StreamingExportMixin
+from .exports import order_dump_rows
+from .models import Order
+from .pagination import OrderCursorPagination
+from .serializers import (
+    OrderFastSerializer, OrderSerializer, OrderSummaryFastSerializer, OrderSummarySerializer,
+)
+from inventory.services import OutOfStockError
+from .services import CheckoutError, checkout, order_with_items_queryset
 
 
-class OrderCreateView(generics.CreateAPIView):
+class OrderCreateView(IdempotentMixin, generics.CreateAPIView):
     """
     Create a new order from the user's current cart.
+    Retries with the same `Idempotency-Key` header get the first response
+    back instead of placing another order (see core/idempotency.py).
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def create(self, request, *args, **kwargs):
+        # All the work (locking, totals, order items, clearing the cart)
+        # happens in one transaction inside `checkout`. A shopper who filled
+        # an anonymous cart (`X-Cart-Token`, see cart/session.py) and logged
+        # in without it gets it merged first.
         try:
-            cart = Cart.objects.get(user=request.user)
-            cart_items = cart.items.all()
-            if not cart_items.exists():
-                return Response({"error": "Your cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
+            cart_token = token_from_request(request)
+            if cart_token:
+                merge_session_cart(request.user, cart_token)
+            order = checkout(request.user)
+        except CheckoutError as exc:
+            return Response({"error": exc.message}, status=status.HTTP_400_BAD_REQUEST)
+        except OutOfStockError as exc:
+            # 409 Conflict: the request is fine, but the stock isn't there.
+            return Response({"error": "Not enough stock.", "product_id": exc.product_id},
+                            status=status.HTTP_409_CONFLICT)
 
-            # Use a database transaction to ensure all or nothing
-            with transaction.atomic():
-                # 1. Create the Order
-                order = Order.objects.create(
-                    user=request.user,
-                    total_price=sum(item.product.price * item.quantity for item in cart_items)
-                )
+        serializer = self.get_serializer(order)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-                # 2. Create OrderItems from CartItems
-                order_items_to_create = []
-                for item in cart_items:
-                    order_items_to_create.append(
-                        OrderItem(
-                            order=order,
-                            product=item.product,
-                            quantity=item.quantity,
-                            price_at_purchase=item.product.price # Take a snapshot of the price
-                        )
-                    )
-                OrderItem.objects.bulk_create(order_items_to_create)
 
-                # 3. Clear the cart
-                cart.items.all().delete()
+class OrderHistoryView(FastListModelMixin, generics.ListAPIView):
+    """
+    List the orders of the current authenticated user, newest first, one
+    page at a time. `?view=summary` returns just the order headers.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderCursorPagination
 
-            serializer = self.get_serializer(order)
-            headers = self.get_success_headers(serializer.data)
-            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    def is_summary(self):
+        return self.request.query_params.get('view') == 'summary'
 
-        except Cart.DoesNotExist:
-            return Response({"error": "You do not have a cart."}, status=status.HTTP_400_BAD_REQUEST)
+    def get_serializer_class(self):
+        return OrderSummarySerializer if self.is_summary() else OrderSerializer
+
+    def get_fast_serializer_class(self):
+        # Used instead when settings.FAST_SERIALIZERS is on.
+        return OrderSummaryFastSerializer if self.is_summary() else OrderFastSerializer
+
+    def get_queryset(self):
+        if self.is_summary():
+            # Headers only: one query per page, the items are never read.
+            queryset = Order.objects.only('id', 'created_at', 'status', 'total_price')
+        else:
+            # Full view: one query for the page of orders (user joined) and
+            # one for all of their items and products, whatever the page size.
+            queryset = order_with_items_queryset()
+        return queryset.filter(user_id=self.request.user.id)
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('view') not in (None, 'full', 'summary'):
+            return Response({"error": "view must be 'full' or 'summary'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
 
-class OrderHistoryView(generics.ListAPIView):
+
+class OrderStreamView(StreamingExportMixin, APIView):
     """
-    List all orders for the current authenticated user.
+    Every order with its items, for partner integrations (admins only),
+    streamed row by row: GET /api/orders/stream/?stream=ndjson|json
     """
-    serializer_class = OrderSerializer
-    permission_classes = [permissions.IsAuthenticated]
-
-    def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+    permission_classes = [permissions.IsAdminUser]
+    export_filename = 'orders'
 
+    def get_export_rows(self, request):
+        return order_dump_rows()
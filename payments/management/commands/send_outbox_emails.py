@@ -0,0 +1,34 @@
+# In payments/management/commands/send_outbox_emails.py
+import time
+
+from django.core.management.base import BaseCommand
+from payments.services import deliver_pending_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox (run it as a separate worker process)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help="How many emails to send per SMTP connection.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, polling the outbox for new emails.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when the outbox is empty (with --loop).")
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain everything that is due, batch after batch.
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = deliver_pending_emails(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent + failed < options['batch_size']:
+                    break
+            if total_sent or total_failed:
+                self.stdout.write(f"Sent {total_sent} email(s), {total_failed} failed attempt(s).")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_user_created_idx'),
+        ('payments', '0002_outboundemail_sending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='kind',
+            field=models.CharField(blank=True, choices=[('ORDER_PAID', 'Order paid')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='emails', to='orders.order'),
+        ),
+        migrations.AddConstraint(
+            model_name='outboundemail',
+            constraint=models.UniqueConstraint(fields=('order', 'kind'), name='outbox_once_per_order_kind'),
+        ),
+    ]
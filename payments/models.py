@@ -1,3 +1,53 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class OutboundEmail(models.Model):
+    """
+    A "transactional outbox" row: an email we have promised to send.
+
+    The row is written in the same database transaction as the change that
+    triggers it (e.g. an order being paid), so the email is queued if and
+    only if that change is committed. A separate worker
+    (`python manage.py send_outbox_emails`) delivers the rows, so slow or
+    broken SMTP servers never hold up an API request.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENDING = 'SENDING', 'Sending'  # Claimed by a worker until next_attempt_at
+        SENT = 'SENT', 'Sent'
+        FAILED = 'FAILED', 'Failed'  # Gave up after too many attempts
+
+    class Kind(models.TextChoices):
+        ORDER_PAID = 'ORDER_PAID', 'Order paid'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipient = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=Status.choices,
+                              default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # The worker only picks up rows whose time has come (used for backoff,
+    # and as the end of a worker's lease on SENDING rows).
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Emails about an order say which one they are: an order gets each kind
+    # of email at most once, however many times its change is retried.
+    order = models.ForeignKey('orders.Order', null=True, blank=True, on_delete=models.SET_NULL,
+                              related_name='emails')
+    kind = models.CharField(max_length=20, choices=Kind.choices, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's query: WHERE status IN ('PENDING', 'SENDING') AND next_attempt_at <= now
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'kind'], name='outbox_once_per_order_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
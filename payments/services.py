@@ -0,0 +1,157 @@
+# In payments/services.py
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from orders.models import Order
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_order_confirmation_email(order):
+    """
+    Queue the "order paid" email. Call this inside the same transaction that
+    marks the order as paid; nothing is sent from the request itself.
+
+    An order gets one confirmation: if one is already queued (or sent),
+    the unique (order, kind) constraint drops this one.
+    """
+    email = OutboundEmail(
+        subject=f"Your Order Confirmation #{order.id}",
+        body=(
+            f"Hello {order.user.username},\n\n"
+            f"Thank you for your purchase! Your order #{order.id} has been paid and is being processed."
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient=order.user.email,
+        order=order,
+        kind=OutboundEmail.Kind.ORDER_PAID,
+    )
+    OutboundEmail.objects.bulk_create([email], ignore_conflicts=True)
+    return email
+
+
+def mark_order_paid(order):
+    """
+    Mark `order` as PAID and queue its confirmation email, in one
+    transaction. Returns the paid order, or None if it was already paid.
+
+    The order row is locked and its status read again first: concurrent
+    payments of the same order each hold their own (possibly stale) copy,
+    and only the first one through the lock pays it. So the PENDING -> PAID
+    transition is logged once (analytics/signals.py) and one email is queued.
+    """
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().get(pk=order.pk)
+        if locked.status == Order.OrderStatus.PAID:
+            return None
+        locked.status = Order.OrderStatus.PAID
+        locked.save()
+        # `order` already has its user loaded, for the email.
+        locked.user = order.user
+        queue_order_confirmation_email(locked)
+    return locked
+
+
+def retry_delay(attempts):
+    # Exponential backoff: 30s, 1m, 2m, 4m ... capped at one hour.
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 3600))
+
+
+def claim_due_emails(batch_size):
+    """
+    Claim up to `batch_size` due emails for this worker, in a short
+    transaction of its own: SELECT ... FOR UPDATE SKIP LOCKED, then mark
+    them SENDING with a lease (`next_attempt_at` = the lease's end) and
+    count the attempt. Once committed, no other worker picks them up until
+    the lease runs out, and no row lock is held while talking to SMTP.
+
+    Emails still SENDING when their lease ends belong to a worker that died
+    mid-batch; they are claimed again (so at most that one email may go out
+    twice) and give up after OUTBOX_MAX_ATTEMPTS like any other.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status__in=[OutboundEmail.Status.PENDING, OutboundEmail.Status.SENDING],
+                    next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        lease_end = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        for email in emails:
+            email.status = OutboundEmail.Status.SENDING
+            email.attempts += 1
+            email.next_attempt_at = lease_end
+        OutboundEmail.objects.bulk_update(emails, ['status', 'attempts', 'next_attempt_at'])
+    return emails
+
+
+def deliver_pending_emails(batch_size=50):
+    """
+    Send one batch of due outbox emails over a single SMTP connection.
+    Returns a (sent, failed) tuple for this batch.
+
+    The batch is claimed first (`claim_due_emails`, committed), then every
+    email's result is saved on its own right after it was sent, so a crash
+    or timeout midway never re-sends the emails already delivered.
+    """
+    emails = claim_due_emails(batch_size)
+    if not emails:
+        return 0, 0
+
+    # One connection for the whole batch instead of one per email.
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # The server is unreachable: every email in the batch waits.
+        logger.warning("Could not connect to the mail server: %s", exc)
+        for email in emails:
+            _record_failed_attempt(email, exc)
+        return 0, len(emails)
+
+    sent = failed = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.recipient],
+                connection=connection,
+            )
+            try:
+                message.send(fail_silently=False)
+            except Exception as exc:
+                logger.warning("Error sending outbox email %s: %s", email.id, exc)
+                _record_failed_attempt(email, exc)
+                failed += 1
+            else:
+                _record(email, status=OutboundEmail.Status.SENT, sent_at=timezone.now(), last_error='')
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _record(email, **fields):
+    # Autocommitted right away. Only while our claim stands: if the lease
+    # ran out and another worker claimed the email, its result wins.
+    OutboundEmail.objects.filter(
+        pk=email.pk, status=OutboundEmail.Status.SENDING, attempts=email.attempts,
+    ).update(**fields)
+
+
+def _record_failed_attempt(email, exc):
+    # The attempt was already counted when the email was claimed.
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        _record(email, status=OutboundEmail.Status.FAILED, last_error=str(exc))
+    else:
+        _record(email, status=OutboundEmail.Status.PENDING, last_error=str(exc),
+                next_attempt_at=timezone.now() + retry_delay(email.attempts))
@@ -1,3 +1,135 @@
-from django.test import TestCase
+# In payments/tests.py
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from orders.models import Order
+from .models import OutboundEmail
+from .services import deliver_pending_emails, mark_order_paid, queue_order_confirmation_email
+
+
+class MockPaymentOutboxTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='payer', email='payer@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.order = Order.objects.create(user=self.user, total_price=15)
+
+    def pay(self, key='pay-1'):
+        return self.client.post('/api/payments/mock-pay/', {'order_id': self.order.id},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_payment_queues_email_without_sending_it(self):
+        response = self.client.post('/api/payments/mock-pay/', {'order_id': self.order.id}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.PAID)
+
+        # Nothing went out during the request; one row waits in the outbox.
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.recipient, 'payer@example.com')
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+
+    def test_worker_sends_queued_emails(self):
+        self.client.post('/api/payments/mock-pay/', {'order_id': self.order.id}, format='json')
+
+        call_command('send_outbox_emails', stdout=mock.MagicMock())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(f'#{self.order.id}', mail.outbox[0].subject)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.Status.SENT)
+        self.assertIsNotNone(email.sent_at)
+
+    def test_paying_twice_queues_a_single_email(self):
+        self.client.post('/api/payments/mock-pay/', {'order_id': self.order.id}, format='json')
+        self.client.post('/api/payments/mock-pay/', {'order_id': self.order.id}, format='json')
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_concurrent_payments_queue_a_single_email(self):
+        # Both requests got past the view's unlocked "already paid?" check.
+        first, second = (Order.objects.select_related('user').get(pk=self.order.pk) for _ in range(2))
+        mark_order_paid(first)
+        mark_order_paid(second)
+        self.assertEqual(OutboundEmail.objects.get().order_id, self.order.id)
+
+    def test_an_order_is_confirmed_once_even_without_the_lock(self):
+        order = Order.objects.select_related('user').get(pk=self.order.pk)
+        queue_order_confirmation_email(order)
+        queue_order_confirmation_email(order)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_retried_payment_replays_the_first_response(self):
+        first = self.pay()
+        with self.assertNumQueries(1):
+            retry = self.pay()
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry.json()['message'], "Payment successful. Order is now marked as PAID.")
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE_SECONDS=30)
+class OutboxRetryTests(APITestCase):
+
+    def setUp(self):
+        self.email = OutboundEmail.objects.create(
+            subject='Hi', body='...', from_email='noreply@ecommerce.com', recipient='a@example.com')
+
+    @mock.patch('payments.services.EmailMessage.send', side_effect=OSError('SMTP down'))
+    def test_failed_send_is_retried_later_then_given_up(self, _send):
+        call_command('send_outbox_emails', stdout=mock.MagicMock())
+
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(self.email.attempts, 1)
+        self.assertEqual(self.email.last_error, 'SMTP down')
+        self.assertGreater(self.email.next_attempt_at, timezone.now())
+
+        # Not due yet: a second run leaves it alone.
+        call_command('send_outbox_emails', stdout=mock.MagicMock())
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.attempts, 1)
+
+        # Once due again, the final attempt marks it as failed.
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_outbox_emails', stdout=mock.MagicMock())
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(self.email.attempts, 2)
+
+    def test_batch_reuses_one_connection(self):
+        OutboundEmail.objects.create(subject='Hi', body='...', from_email='noreply@ecommerce.com',
+                                     recipient='b@example.com')
+        with mock.patch('payments.services.get_connection', wraps=mail.get_connection) as get_connection:
+            call_command('send_outbox_emails', stdout=mock.MagicMock())
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_crash_mid_batch_keeps_the_emails_already_sent(self):
+        second = OutboundEmail.objects.create(subject='Hi', body='...', from_email='noreply@ecommerce.com',
+                                              recipient='b@example.com')
+        # The worker dies (not an SMTP error) while sending the second email.
+        with mock.patch('payments.services.EmailMessage.send', side_effect=[1, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                deliver_pending_emails()
+
+        self.email.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.Status.SENT)
+        self.assertEqual(second.status, OutboundEmail.Status.SENDING)
+
+        # Leased: other workers leave it alone until the lease runs out...
+        self.assertEqual(deliver_pending_emails(), (0, 0))
+        OutboundEmail.objects.filter(pk=second.pk).update(next_attempt_at=timezone.now())
+        # ...then only the unfinished email is sent again.
+        self.assertEqual(deliver_pending_emails(), (1, 0))
+        self.assertEqual([message.to for message in mail.outbox], [['b@example.com']])
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.attempts), (OutboundEmail.Status.SENT, 2))
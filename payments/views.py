@@ -1,11 +1,17 @@
 # In payments/views.py
+import logging
+
 from rest_framework import views, response, status, permissions
-from django.core.mail import send_mail  # <-- REMOVE 'outbox' from this import
-from django.conf import settings
+from core.idempotency import IdempotentMixin
 from orders.models import Order
+from .services import mark_order_paid
+
+logger = logging.getLogger(__name__)
 
 
-class MockPaymentView(views.APIView):
+# Retries with the same `Idempotency-Key` header get the first response back
+# without charging again (see core/idempotency.py).
+class MockPaymentView(IdempotentMixin, views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -15,43 +21,25 @@ class MockPaymentView(views.APIView):
             return response.Response({"error": "Order ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            order = Order.objects.get(id=order_id, user=request.user)
+            # The user is needed for the confirmation email; join it in now.
+            order = Order.objects.select_related('user').get(id=order_id, user_id=request.user.id)
         except Order.DoesNotExist:
             return response.Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
         if order.status == Order.OrderStatus.PAID:
             return response.Response({"message": "This order has already been paid."}, status=status.HTTP_200_OK)
-        
-        print(f"Simulating successful payment for Order ID: {order.id}...")
-        
-        order.status = Order.OrderStatus.PAID
-        order.save()
-
-        # --- Send Notification Email ---
-        self.send_order_confirmation_email(order)
-        
+
+        logger.info("Simulating successful payment for order %s.", order.id)
+
+        # The status change and the queued email are committed together,
+        # under a lock on the order: a concurrent payment that got past the
+        # check above finds it paid (see `mark_order_paid`).
+        order = mark_order_paid(order)
+        if order is None:
+            return response.Response({"message": "This order has already been paid."}, status=status.HTTP_200_OK)
+
         return response.Response({
             "message": "Payment successful. Order is now marked as PAID.",
             "order_id": order.id,
             "status": order.status
         }, status=status.HTTP_200_OK)
-
-    def send_order_confirmation_email(self, order):
-        subject = f"Your Order Confirmation #{order.id}"
-        message = (
-            f"Hello {order.user.username},\n\n"
-            f"Thank you for your purchase! Your order #{order.id} has been paid and is being processed."
-        )
-        
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[order.user.email],
-                fail_silently=False,
-            )
-            print(f"Confirmation email for Order ID: {order.id} was generated for the console.")
-        except Exception as e:
-            # Add error logging for any unexpected email issues
-            print(f"Error sending email for Order ID {order.id}: {e}")
@@ -0,0 +1,8 @@
+# In products/async_urls.py
+from django.urls import path
+from .async_views import AsyncProductDetailView, AsyncProductListView
+
+urlpatterns = [
+    path('', AsyncProductListView.as_view(), name='async-product-list'),
+    path('<int:pk>/', AsyncProductDetailView.as_view(), name='async-product-detail'),
+]
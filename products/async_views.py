@@ -0,0 +1,61 @@
+# In products/async_views.py
+# Async versions of ProductListView and ProductDetailView (see
+# core/async_views.py), served under /api/async/products/. Same JSON, same
+# filters, ordering, cursors and ETag/Last-Modified handling; rows are read
+# with the async ORM and built by ProductFastSerializer.
+#
+# They skip the catalog cache: they exist for deployments where the time is
+# spent waiting on the database, and the sync endpoints stay the default.
+from django.http import Http404
+from core.async_views import AsyncAPIView
+from .conditional import (
+    acollection_validators, add_validator_headers, aproduct_validators, not_modified_response,
+)
+from .filters import ProductFilterBackend
+from .models import Product
+from .pagination import ProductCursorPagination
+from .serializers import ProductFastSerializer
+
+
+class AsyncProductViewMixin:
+
+    def get_variant(self, request):
+        # Same role as CatalogCacheMixin.get_cache_variant: whatever changes the bytes.
+        return f'{request.get_host()}|{self.renderer.media_type}|{request.get_full_path()}'
+
+    def get_fast_serializer(self, request):
+        return ProductFastSerializer(context={'request': request})
+
+
+class AsyncProductListView(AsyncProductViewMixin, AsyncAPIView):
+
+    async def get(self, request, *args, **kwargs):
+        validators = await acollection_validators(self.get_variant(request))
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return add_validator_headers(not_modified, validators)
+
+        serializer = self.get_fast_serializer(request)
+        queryset = ProductFilterBackend().filter_queryset(request, Product.objects.all(), self)
+        paginator = ProductCursorPagination()
+        page = await paginator.apaginate_queryset(serializer.values(queryset), request, self)
+        data = paginator.get_paginated_response(serializer.serialize_many(page)).data
+        return add_validator_headers(self.render(data), validators)
+
+
+class AsyncProductDetailView(AsyncProductViewMixin, AsyncAPIView):
+    not_found_message = "No Product matches the given query."
+
+    async def get(self, request, pk, *args, **kwargs):
+        validators = await aproduct_validators(pk, self.get_variant(request))
+        if validators is None:
+            raise Http404(self.not_found_message)
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return add_validator_headers(not_modified, validators)
+
+        serializer = self.get_fast_serializer(request)
+        row = await serializer.values(Product.objects.filter(pk=pk)).afirst()
+        if row is None:  # Deleted since the validators were read.
+            raise Http404(self.not_found_message)
+        return add_validator_headers(self.render(serializer.to_representation(row)), validators)
@@ -0,0 +1,295 @@
+# In products/bulk.py
+"""
+Bulk catalog import and export (supplier feeds).
+
+Rows are identified by their `sku`. An import reads the file row by row and
+writes it in chunks; each chunk costs a fixed handful of queries, whatever
+its size:
+
+- categories are resolved from a map loaded once, up front (by name,
+  case-insensitive, or by id),
+- one query finds which SKUs of the chunk already exist (created/updated
+  counts and cache invalidation),
+- one `INSERT ... ON CONFLICT (sku) DO UPDATE` writes the whole chunk,
+- one `UPDATE` refreshes the search vectors of the chunk.
+
+Invalid rows are reported (line number, SKU and the problems) and skipped;
+they never abort the import. A file that isn't valid UTF-8 is refused
+before anything is written (`check_encoding`).
+
+Supported formats: CSV with a header row, and JSON Lines (one object per
+line). Both use the columns in `FIELDS`.
+"""
+import codecs
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from . import cache as catalog_cache
+from .conditional import bump_collection
+from .models import Category, Product
+from .search import update_search_vectors
+from .signals import products_bulk_updated
+
+FIELDS = ['sku', 'name', 'description', 'price', 'category', 'in_stock']
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 2000
+# An import reports at most this many row errors in detail (all are counted).
+MAX_REPORTED_ERRORS = 1000
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+
+def format_from_name(name, default='csv'):
+    """Guess the file format from a file name (`.jsonl`/`.ndjson` or CSV)."""
+    lowered = (name or '').lower()
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if lowered.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+# --- Reading -------------------------------------------------------------
+
+def check_encoding(chunks, encoding='utf-8'):
+    """
+    Decode a whole file, given as byte chunks, without keeping it. Raises
+    UnicodeDecodeError. An import commits chunk by chunk, so an upload is
+    checked first: a bad byte found halfway would leave a partial import.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        decoder.decode(chunk)
+    decoder.decode(b'', final=True)
+
+
+def read_rows(stream, file_format):
+    """
+    Yield `(line_number, row_dict)` from a text stream, one row at a time,
+    so files of any size are never loaded into memory at once. Lines that
+    can't be parsed at all are yielded as `(line_number, None)`.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Unknown format {file_format!r}; expected one of {FORMATS}.")
+
+
+# --- Importing -----------------------------------------------------------
+
+class ImportReport:
+    """What an import did: counts plus the first MAX_REPORTED_ERRORS row errors."""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, sku, problems):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'sku': sku, 'errors': problems})
+
+    @property
+    def processed(self):
+        return self.created + self.updated + self.failed
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def category_map():
+    """Every category, keyed by lower-cased name and by id (as a string)."""
+    categories = {}
+    for category_id, name in Category.objects.values_list('id', 'name'):
+        categories.setdefault(name.strip().lower(), category_id)
+        categories[str(category_id)] = category_id
+    return categories
+
+
+def _text(row, field):
+    value = row.get(field)
+    return '' if value is None else str(value).strip()
+
+
+def _parse_required_text(row, field):
+    value = _text(row, field)
+    if not value:
+        return value, 'This field is required.'
+    if len(value) > Product._meta.get_field(field).max_length:
+        return value, 'Too long.'
+    return value, None
+
+
+def _parse_price(row):
+    try:
+        price = Decimal(_text(row, 'price'))
+        if not price.is_finite() or price < 0 or price != price.quantize(Decimal('0.01')):
+            raise InvalidOperation
+        if price >= Decimal('1e8'):  # max_digits=10, decimal_places=2
+            raise InvalidOperation
+    except InvalidOperation:
+        return None, 'A non-negative amount with at most 2 decimals is required.'
+    return price, None
+
+
+def _parse_category(row, categories):
+    category_id = categories.get(_text(row, 'category').lower())
+    return category_id, None if category_id is not None else 'Unknown category.'
+
+
+def _parse_in_stock(row):
+    # JSON gives real booleans, CSV gives text; a missing or empty value
+    # keeps the model default (in stock).
+    in_stock = row.get('in_stock')
+    if isinstance(in_stock, bool):
+        return in_stock, None
+    text = _text(row, 'in_stock').lower()
+    if text in TRUE_VALUES or not text:
+        return True, None
+    if text in FALSE_VALUES:
+        return False, None
+    return None, 'Must be true or false.'
+
+
+def parse_row(row, categories):
+    """
+    Turn one raw row into a (not yet saved) Product, or return a dict of
+    problems keyed by field.
+    """
+    parsed = {
+        'sku': _parse_required_text(row, 'sku'),
+        'name': _parse_required_text(row, 'name'),
+        'price': _parse_price(row),
+        'category': _parse_category(row, categories),
+        'in_stock': _parse_in_stock(row),
+    }
+    problems = {field: problem for field, (_, problem) in parsed.items() if problem}
+    if problems:
+        return None, problems
+    values = {field: value for field, (value, _) in parsed.items()}
+    return Product(
+        sku=values['sku'], name=values['name'], description=_text(row, 'description'), price=values['price'],
+        category_id=values['category'], in_stock=values['in_stock'],
+    ), None
+
+
+def _write_chunk(products, report):
+    """Upsert one chunk of parsed products (at most one per SKU)."""
+    skus = [product.sku for product in products]
+    with transaction.atomic():
+        existing = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'id'))
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=['name', 'description', 'price', 'category', 'in_stock', 'updated_at'],
+        )
+        # Bulk writes bypass the post_save signals, so do their work here,
+        # once per chunk: new search vectors, and drop the cached pages of
+        # updated products (new products can't have any cached pages yet).
+        update_search_vectors(Product.objects.filter(sku__in=skus))
+        bump_collection()
+        if existing:
+            products_bulk_updated.send(sender=Product, product_ids=list(existing.values()))
+    catalog_cache.invalidate_products(existing.values())
+
+    report.updated += len(existing)
+    report.created += len(products) - len(existing)
+
+
+def import_products(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Create or update products from `(line_number, row)` pairs (see
+    `read_rows`). Returns an ImportReport.
+
+    Chunks are committed one at a time, so a crash halfway keeps the chunks
+    already written; re-running the same file is safe (it's an upsert).
+    """
+    report = ImportReport()
+    categories = category_map()
+    # SKU -> product; when a SKU repeats within a chunk the last row wins,
+    # exactly as if the rows had been imported one after the other.
+    chunk = {}
+    for line_number, row in rows:
+        if row is None:
+            report.add_error(line_number, None, {'row': 'Could not be parsed.'})
+            continue
+        product, problems = parse_row(row, categories)
+        if problems:
+            report.add_error(line_number, _text(row, 'sku') or None, problems)
+            continue
+        if product.sku in chunk:
+            report.updated += 1  # The earlier row is overwritten.
+        chunk[product.sku] = product
+        if len(chunk) >= chunk_size:
+            _write_chunk(list(chunk.values()), report)
+            chunk = {}
+    if chunk:
+        _write_chunk(list(chunk.values()), report)
+    return report
+
+
+# --- Exporting -----------------------------------------------------------
+
+def export_rows(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield every product as a dict of FIELDS (category by name), streaming
+    from the database with a server-side cursor where available.
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    values = (
+        queryset.order_by('id')
+        .values_list('sku', 'name', 'description', 'price', 'category__name', 'in_stock')
+        .iterator(chunk_size=chunk_size)
+    )
+    for sku, name, description, price, category, in_stock in values:
+        yield {
+            'sku': sku or '',
+            'name': name,
+            'description': description,
+            'price': str(price),
+            'category': category,
+            'in_stock': in_stock,
+        }
+
+
+def serialize_rows(rows, file_format):
+    """Yield the export file piece by piece (header first for CSV)."""
+    if file_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+    elif file_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, 'in_stock': 'true' if row['in_stock'] else 'false'})
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown format {file_format!r}; expected one of {FORMATS}.")
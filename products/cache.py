@@ -0,0 +1,162 @@
+# In products/cache.py
+"""
+Read-through cache for the public catalog endpoints.
+
+The catalog is read thousands of times for every write, so we keep the
+*rendered JSON bytes* of product pages in the cache and serve them without
+touching the database or the serializers.
+
+Keys
+----
+Every entry lives under a *versioned* key:
+
+- `catalog:product:<id>:v<n>`       -> {variant: entry} for the detail view
+- `catalog:list:v<n>:<hash>`        -> entry for one list page
+
+An entry is `(bytes, validators)`: the rendered body and its ETag and
+Last-Modified (see products/conditional.py).
+
+A "variant" is everything besides the product that changes the bytes
+(the host used to build absolute image URLs, the media type, the query
+string for list pages).
+
+Invalidation
+------------
+We never delete entries; we bump the version counter they hang off, which
+makes the old entries unreachable (they expire from the cache later):
+
+- A product changes  -> bump that product's version and the list version.
+- A category changes -> bump the versions of its products (they embed the
+  category) and the list version.
+
+Readers capture the version *before* querying the database and store the
+result under that version, so a write that lands in between can never
+leave stale bytes under the current key. See `products/signals.py`.
+
+The backend is whatever `settings.CATALOG_CACHE_ALIAS` points to in
+`CACHES`: local memory by default, Redis/Memcached when configured.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+LIST_VERSION_KEY = 'catalog:list:version'
+HITS_KEY = 'catalog:stats:hits'
+MISSES_KEY = 'catalog:stats:misses'
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _cache_kwargs():
+    # `version` is Django's built-in key versioning; bumping
+    # CATALOG_CACHE_VERSION on deploy drops entries rendered by old code.
+    return {'version': settings.CATALOG_CACHE_VERSION}
+
+
+def _product_version_key(product_id):
+    return f'catalog:product:{product_id}:version'
+
+
+def _product_key(product_id, version):
+    return f'catalog:product:{product_id}:v{version}'
+
+
+def _get_version(key):
+    cache = get_cache()
+    version = cache.get(key, **_cache_kwargs())
+    if version is None:
+        # Start from the clock rather than 1: if the counter was evicted,
+        # we must never reuse a version that older entries were stored under.
+        cache.add(key, time.time_ns() // 1000, timeout=None, **_cache_kwargs())
+        version = cache.get(key, **_cache_kwargs())
+    return version
+
+
+def _bump_version(key):
+    try:
+        get_cache().incr(key, **_cache_kwargs())
+    except ValueError:
+        # The counter was evicted; recreate it from the clock.
+        _get_version(key)
+
+
+def list_version():
+    return _get_version(LIST_VERSION_KEY)
+
+
+def product_version(product_id):
+    return _get_version(_product_version_key(product_id))
+
+
+# --- Reads and writes ----------------------------------------------------
+
+def get_product(product_id, version, variant):
+    variants = get_cache().get(_product_key(product_id, version), **_cache_kwargs())
+    entry = variants.get(variant) if variants else None
+    _record(entry is not None)
+    return entry
+
+
+def set_product(product_id, version, variant, entry):
+    cache = get_cache()
+    key = _product_key(product_id, version)
+    variants = cache.get(key, **_cache_kwargs()) or {}
+    variants[variant] = entry
+    cache.set(key, variants, settings.CATALOG_CACHE_TIMEOUT, **_cache_kwargs())
+
+
+def _list_key(version, variant):
+    digest = hashlib.sha1(variant.encode()).hexdigest()
+    return f'catalog:list:v{version}:{digest}'
+
+
+def get_list(version, variant):
+    entry = get_cache().get(_list_key(version, variant), **_cache_kwargs())
+    _record(entry is not None)
+    return entry
+
+
+def set_list(version, variant, entry):
+    get_cache().set(_list_key(version, variant), entry,
+                    settings.CATALOG_CACHE_TIMEOUT, **_cache_kwargs())
+
+
+# --- Invalidation --------------------------------------------------------
+
+def invalidate_products(product_ids):
+    for product_id in product_ids:
+        _bump_version(_product_version_key(product_id))
+    _bump_version(LIST_VERSION_KEY)
+
+
+# --- Hit/miss counters ---------------------------------------------------
+
+def _record(hit):
+    key = HITS_KEY if hit else MISSES_KEY
+    cache = get_cache()
+    # `add` is a no-op if the key exists, so this is safe across workers.
+    cache.add(key, 0, timeout=None, **_cache_kwargs())
+    try:
+        cache.incr(key, **_cache_kwargs())
+    except ValueError:
+        pass
+
+
+def get_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY, 0, **_cache_kwargs())
+    misses = cache.get(MISSES_KEY, 0, **_cache_kwargs())
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY], **_cache_kwargs())
@@ -0,0 +1,110 @@
+# In products/conditional.py
+"""
+HTTP conditional requests for the catalog (ETag / Last-Modified).
+
+Clients (the mobile app, our CDN) revalidate what they already have with
+`If-None-Match` / `If-Modified-Since`. We answer those from a single
+primary-key lookup, before any list query, serializer or renderer runs:
+
+- a product page is validated by the product's `updated_at`,
+- a collection page (list, facets) by the `CollectionVersion` row of the
+  collection, bumped on every product/category change (products/signals.py,
+  products/bulk.py).
+
+ETags also hash the response "variant" (host, media type, query string)
+and CATALOG_CACHE_VERSION, so two different representations never share a
+tag. They are strong: equal tags mean byte-identical bodies.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from .models import CollectionVersion, Product
+
+PRODUCTS_COLLECTION = 'products'
+
+
+def bump_collection(name=PRODUCTS_COLLECTION):
+    """Record a change to a collection (creating its counter if needed)."""
+    now = timezone.now()
+    updated = CollectionVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+    if not updated:
+        try:
+            with transaction.atomic():
+                CollectionVersion.objects.create(name=name, version=1, updated_at=now)
+        except IntegrityError:
+            # Another request created it first; count our change on top.
+            CollectionVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+
+
+def make_etag(variant, *parts):
+    digest = hashlib.sha1(
+        '|'.join(map(str, (settings.CATALOG_CACHE_VERSION, variant, *parts))).encode()
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _collection_state(name):
+    return CollectionVersion.objects.filter(name=name).values_list('version', 'updated_at')
+
+
+def _collection_validators(variant, name, state):
+    # A collection that was never changed through the app has no row yet;
+    # it then validates as version 0 with no Last-Modified.
+    version, updated_at = state or (0, None)
+    last_modified = int(updated_at.timestamp()) if updated_at else None
+    return make_etag(variant, name, version), last_modified
+
+
+def collection_validators(variant, name=PRODUCTS_COLLECTION):
+    """(etag, last_modified timestamp) for a page of the collection."""
+    return _collection_validators(variant, name, _collection_state(name).first())
+
+
+async def acollection_validators(variant, name=PRODUCTS_COLLECTION):
+    return _collection_validators(variant, name, await _collection_state(name).afirst())
+
+
+def _product_updated_at(product_id):
+    return Product.objects.filter(pk=product_id).values_list('updated_at', flat=True)
+
+
+def _product_validators(product_id, variant, updated_at):
+    if updated_at is None:
+        return None
+    return make_etag(variant, 'product', product_id, updated_at.isoformat()), int(updated_at.timestamp())
+
+
+def product_validators(product_id, variant):
+    """(etag, last_modified timestamp) for a product page, or None if it doesn't exist."""
+    return _product_validators(product_id, variant, _product_updated_at(product_id).first())
+
+
+async def aproduct_validators(product_id, variant):
+    return _product_validators(product_id, variant, await _product_updated_at(product_id).afirst())
+
+
+def not_modified_response(request, validators):
+    """A 304 response if the client's copy is current, else None."""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def add_validator_headers(response, validators):
+    """ETag, Last-Modified and the caching headers that go with them."""
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Shared caches may keep the page, but must revalidate it.
+    patch_cache_control(response, public=True, max_age=settings.CATALOG_HTTP_MAX_AGE)
+    patch_vary_headers(response, ['Accept'])
+    return response
@@ -0,0 +1,14 @@
+# In products/exports.py
+# Rows for the streaming catalog dump (see core/streaming.py). They are
+# built by ProductFastSerializer straight from `.values()` rows read through
+# a server-side cursor, so no model instances or DRF serializers are created.
+from django.conf import settings
+from .models import Product
+from .serializers import ProductFastSerializer
+
+
+def product_dump_rows(request, queryset=None):
+    queryset = Product.objects.all() if queryset is None else queryset
+    serializer = ProductFastSerializer(context={'request': request})
+    rows = serializer.values(queryset.order_by('id')).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    return map(serializer.to_representation, rows)
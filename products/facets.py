@@ -0,0 +1,53 @@
+# In products/facets.py
+from django.conf import settings
+from django.db.models import Count, Q
+
+
+def price_buckets():
+    """[(0, 25), (25, 50), ..., (1000, None)] from settings.PRODUCT_PRICE_BUCKETS."""
+    edges = settings.PRODUCT_PRICE_BUCKETS
+    return list(zip(edges, edges[1:] + [None]))
+
+
+def compute_facets(queryset):
+    """
+    Count products per category and per price bucket for an (already
+    filtered) product queryset, in ONE aggregated query:
+
+        SELECT category_id, category.name, COUNT(*),
+               COUNT(*) FILTER (WHERE price >= 0 AND price < 25), ...
+        FROM product JOIN category ... GROUP BY category_id, category.name
+
+    The per-bucket totals are the sums of the per-category rows.
+    """
+    buckets = price_buckets()
+    aggregates = {'count': Count('id')}
+    for index, (low, high) in enumerate(buckets):
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        aggregates[f'bucket_{index}'] = Count('id', filter=condition)
+
+    rows = list(
+        queryset
+        .order_by()  # Drop any ordering; it would be added to the GROUP BY.
+        .values('category_id', 'category__name')
+        .annotate(**aggregates)
+        .order_by('category__name', 'category_id')
+    )
+
+    return {
+        'total': sum(row['count'] for row in rows),
+        'categories': [
+            {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+            for row in rows
+        ],
+        'price_buckets': [
+            {
+                'min': low,
+                'max': high,
+                'count': sum(row[f'bucket_{index}'] for row in rows),
+            }
+            for index, (low, high) in enumerate(buckets)
+        ],
+    }
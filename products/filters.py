@@ -0,0 +1,63 @@
+# In products/filters.py
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+TRUE_VALUES = {'true', '1', 'yes'}
+FALSE_VALUES = {'false', '0', 'no'}
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Query-parameter filters for the product list (and facets):
+
+        ?category=3          products in category 3 (or several: ?category=3,7)
+        ?min_price=10        price >= 10
+        ?max_price=99.99     price <= 99.99
+        ?in_stock=true       only products in stock
+
+    The filters map onto the (category_id, price) and the partial
+    "in stock" price indexes declared on Product.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        category = params.get('category')
+        if category:
+            try:
+                ids = [int(value) for value in category.split(',')]
+            except ValueError:
+                raise ValidationError({'category': 'Must be an integer ID or a comma-separated list of IDs.'})
+            queryset = queryset.filter(category_id__in=ids) if len(ids) > 1 else queryset.filter(category_id=ids[0])
+
+        min_price = self._decimal(params, 'min_price')
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        max_price = self._decimal(params, 'max_price')
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        in_stock = params.get('in_stock')
+        if in_stock:
+            value = in_stock.lower()
+            if value not in TRUE_VALUES | FALSE_VALUES:
+                raise ValidationError({'in_stock': 'Must be true or false.'})
+            queryset = queryset.filter(in_stock=value in TRUE_VALUES)
+
+        return queryset
+
+    @staticmethod
+    def _decimal(params, name):
+        value = params.get(name)
+        if not value:
+            return None
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            raise ValidationError({name: 'Must be a number.'})
+        # 'NaN', 'Infinity' and 'sNaN' parse, but the ORM rejects them (500).
+        if not number.is_finite():
+            raise ValidationError({name: 'Must be a number.'})
+        return number
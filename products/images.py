@@ -0,0 +1,189 @@
+# In products/images.py
+"""
+Resized variants of product images.
+
+Catalog pages used to send every client the full-size upload. When a
+product's image changes, we now generate a fixed set of smaller variants
+(VARIANTS below): a square thumbnail in JPEG and in WebP, and WebP copies
+that fit 480, 960 and 1600 pixel boxes. The serializers expose them as
+`image_variants` ({name: url}), so clients can pick the size they need
+(e.g. for `srcset`).
+
+Generation never runs on the request thread:
+
+- `products.signals` schedules `generate_variants(product_id)` once the
+  transaction that saved a new image commits;
+- `schedule_variants` hands the job to a small thread pool in the worker
+  process (PRODUCT_IMAGE_WORKERS threads; Pillow releases the GIL while it
+  decodes, resizes and encodes). With 0 workers the job runs inline, which
+  the tests use;
+- jobs lost with a restarting process, and images that never went through
+  the signal (bulk imports), are caught up by
+  `manage.py generate_image_variants`.
+
+Variant file names carry a hash of the source bytes and of the variant's
+settings, e.g. `product_images/variants/emma-w480-3f2a9c1b7d4e.webp`. A
+name therefore always refers to the same bytes, and the variants directory
+can be served with `Cache-Control: public, max-age=31536000, immutable`.
+Regenerating an unchanged image reuses the existing files.
+
+`Product.image_variants_source` records which image the variants were made
+from; until it matches the current image (a job is pending), the variants
+are not shown and clients fall back to `image`.
+"""
+import hashlib
+import io
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from PIL import Image, ImageOps
+from . import cache as catalog_cache
+from .conditional import bump_collection
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'product_images/variants'
+
+# `crop`: cut the image to exactly `size`; otherwise fit it inside `size`
+# keeping its proportions. Images are never enlarged.
+Variant = namedtuple('Variant', 'name size crop format quality')
+VARIANTS = [
+    Variant('thumbnail', (200, 200), True, 'JPEG', 80),
+    Variant('thumbnail_webp', (200, 200), True, 'WEBP', 80),
+    Variant('w480', (480, 480), False, 'WEBP', 80),
+    Variant('w960', (960, 960), False, 'WEBP', 80),
+    Variant('w1600', (1600, 1600), False, 'WEBP', 82),
+]
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def variant_name(source_name, digest, variant):
+    """Storage name of one variant of the image `source_name` whose bytes hash to `digest`."""
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    settings_digest = hashlib.sha256(f'{digest}:{variant}'.encode()).hexdigest()[:12]
+    return f'{VARIANTS_DIR}/{stem}-{variant.name}-{settings_digest}.{EXTENSIONS[variant.format]}'
+
+
+def render_variant(image, variant):
+    """The encoded bytes of `variant` of the (already opened and oriented) `image`."""
+    if variant.crop:
+        resized = ImageOps.fit(image, variant.size, Image.Resampling.LANCZOS)
+    else:
+        resized = image.copy()
+        resized.thumbnail(variant.size, Image.Resampling.LANCZOS)
+    if variant.format == 'JPEG' and resized.mode != 'RGB':
+        resized = resized.convert('RGB')  # No alpha channel in JPEG.
+    output = io.BytesIO()
+    resized.save(output, variant.format, quality=variant.quality, optimize=variant.format == 'JPEG')
+    return output.getvalue()
+
+
+def open_image(data):
+    image = Image.open(io.BytesIO(data))
+    # Phone photos are often stored sideways with an EXIF rotation flag.
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    return image
+
+
+def build_variants(storage, source_name):
+    """Write the variants of the stored image `source_name`; returns {variant name: storage name}."""
+    with storage.open(source_name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+    image = None
+    names = {}
+    for variant in VARIANTS:
+        name = variant_name(source_name, digest, variant)
+        if not storage.exists(name):
+            if image is None:
+                image = open_image(data)
+            storage.save(name, ContentFile(render_variant(image, variant)))
+        names[variant.name] = name
+    return names
+
+
+def generate_variants(product_id):
+    """
+    Bring the variants of one product up to date with its current image.
+    Returns True if the product was updated.
+    """
+    row = Product.objects.filter(pk=product_id).values('image', 'image_variants_source').first()
+    if row is None:
+        return False
+    source_name = row['image'] or ''
+    if source_name == row['image_variants_source']:
+        return False  # Already done (e.g. scheduled twice).
+
+    variants = {}
+    if source_name:
+        variants = build_variants(Product._meta.get_field('image').storage, source_name)
+
+    # Only if the image is still the one we just processed: a newer upload
+    # has its own job on the way.
+    updated = Product.objects.filter(pk=product_id, image=row['image']).update(
+        image_variants=variants, image_variants_source=source_name, updated_at=timezone.now())
+    if updated:
+        # .update() sends no signals: invalidate like products/signals.py does.
+        catalog_cache.invalidate_products([product_id])
+        bump_collection()
+    return bool(updated)
+
+
+def stale_products():
+    """Products whose variants don't match their current image."""
+    return (Product.objects.annotate(current_image=Coalesce('image', Value('')))
+            .exclude(image_variants_source=F('current_image')))
+
+
+# --- Background pool -------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def _executor(workers):
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='product-images')
+
+
+def _run(product_id):
+    try:
+        generate_variants(product_id)
+    except Exception:
+        logger.exception("Could not generate the image variants of product %s", product_id)
+    finally:
+        # Pool threads hold their own database connections.
+        close_old_connections()
+
+
+def schedule_variants(product_id):
+    """Generate the variants of a product once the current transaction commits."""
+    def submit():
+        workers = settings.PRODUCT_IMAGE_WORKERS
+        if workers:
+            _executor(workers).submit(_run, product_id)
+        else:
+            generate_variants(product_id)
+    transaction.on_commit(submit)
+
+
+def variant_urls(variants, source_name, image_name, request=None):
+    """{variant name: URL} for a product, or {} while its variants are pending."""
+    if not variants or source_name != (image_name or ''):
+        return {}
+    storage = Product._meta.get_field('image').storage
+    urls = {}
+    for variant in VARIANTS:  # A stable order (jsonb doesn't keep the stored one).
+        stored = variants.get(variant.name)
+        if stored:
+            url = storage.url(stored)
+            urls[variant.name] = request.build_absolute_uri(url) if request is not None else url
+    return urls
@@ -0,0 +1,28 @@
+# In products/management/commands/export_products.py
+import contextlib
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from products.bulk import FORMATS, export_rows, format_from_name, serialize_rows
+
+
+class Command(BaseCommand):
+    help = "Write every product to a CSV or JSON Lines file (the import format)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or '-' for standard output.")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="File format (default: from the file extension, else csv).")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or format_from_name(path)
+        try:
+            stream = (contextlib.nullcontext(sys.stdout) if path == '-'
+                      else open(path, 'w', newline='', encoding='utf-8'))
+        except OSError as exc:
+            raise CommandError(f"Cannot open {path}: {exc}")
+        # Rows are streamed from the database and written as they arrive.
+        with stream as output:
+            for piece in serialize_rows(export_rows(), file_format):
+                output.write(piece)
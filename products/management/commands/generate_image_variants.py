@@ -0,0 +1,57 @@
+# In products/management/commands/generate_image_variants.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from products.images import generate_variants, stale_products
+
+
+def _generate(product_id):
+    try:
+        return generate_variants(product_id), None
+    except Exception as exc:
+        return False, exc
+
+
+def _generate_in_thread(product_id):
+    try:
+        return _generate(product_id)
+    finally:
+        # Pool threads hold their own database connections.
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = ("Generate the missing or outdated image variants of products (see products/images.py): "
+            "images from bulk imports, and jobs lost when a worker restarted.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Images processed in parallel.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, checking for outdated variants.")
+        parser.add_argument('--interval', type=float, default=300.0,
+                            help="Seconds between checks (with --loop).")
+
+    def generate(self, product_ids, workers):
+        if workers <= 1:
+            yield from map(_generate, product_ids)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_generate_in_thread, product_ids)
+
+    def handle(self, *args, **options):
+        while True:
+            product_ids = list(stale_products().order_by('id').values_list('id', flat=True))
+            if product_ids:
+                updated = failed = 0
+                for product_id, (done, error) in zip(product_ids, self.generate(product_ids, options['workers'])):
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f"Product {product_id}: {error}")
+                    updated += done
+                self.stdout.write(f"Updated the image variants of {updated} product(s), {failed} failed.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
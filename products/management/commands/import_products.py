@@ -0,0 +1,40 @@
+# In products/management/commands/import_products.py
+import contextlib
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from products.bulk import DEFAULT_CHUNK_SIZE, FORMATS, format_from_name, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = "Create or update products (matched by SKU) from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for standard input.")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="File format (default: from the file extension, else csv).")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="How many rows to write per INSERT ... ON CONFLICT statement.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or format_from_name(path)
+        started = time.perf_counter()
+        try:
+            stream = (contextlib.nullcontext(sys.stdin) if path == '-'
+                      else open(path, newline='', encoding='utf-8'))
+        except OSError as exc:
+            raise CommandError(f"Cannot open {path}: {exc}")
+        with stream as rows:
+            report = import_products(read_rows(rows, file_format), chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']} (sku {error['sku']}): {error['errors']}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f"... and {report.failed - len(report.errors)} more invalid row(s).")
+        self.stdout.write(
+            f"Created {report.created}, updated {report.updated}, failed {report.failed} "
+            f"in {elapsed:.1f}s ({report.processed / elapsed if elapsed else 0:.0f} rows/s)."
+        )
@@ -1,4 +1,7 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -12,13 +15,57 @@ class Category(models.Model):
 
 class Product(models.Model):
     category = models.ForeignKey(Category, related_name='products', on_delete=models.CASCADE)
+    # Stock keeping unit: the supplier's identifier, used to match rows of
+    # bulk imports (products/bulk.py). Optional for hand-made products.
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='product_images/', blank=True, null=True)
+    # Resized copies of `image` ({variant: storage name}) and the image they
+    # were made from, filled in the background by products/images.py.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_variants_source = models.CharField(max_length=100, blank=True, default='', editable=False)
     in_stock = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Last change to anything the product's JSON shows (its category
+    # included); drives the ETag/Last-Modified of the detail endpoint.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Full-text search document (name + description), maintained by
+    # products/signals.py. Only used on PostgreSQL; see products/search.py.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination of the catalog list:
+            # ORDER BY created_at DESC, id DESC with a (created_at, id) seek.
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+            # Category pages filtered and/or sorted by price:
+            # WHERE category_id = ? [AND price BETWEEN ? AND ?] ORDER BY price, id
+            models.Index(fields=['category', 'price', 'id'], name='product_category_price_idx'),
+            # Storefront default "in stock only" listings sorted by price; a
+            # partial index, so out-of-stock rows don't take any space in it.
+            models.Index(fields=['price', 'id'], condition=models.Q(in_stock=True),
+                         name='product_in_stock_price_idx'),
+            # Makes `search_vector @@ query` an index lookup (PostgreSQL only,
+            # the migration skips it on other databases).
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+
+class CollectionVersion(models.Model):
+    """
+    A counter bumped on every change to a collection of objects (e.g. all
+    products), and the time of that change. One row per collection, read
+    by primary key: it validates the ETag/Last-Modified headers of the list
+    endpoints without touching the collection itself (products/conditional.py).
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
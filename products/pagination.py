@@ -0,0 +1,33 @@
+# In products/pagination.py
+from rest_framework.exceptions import ValidationError
+from core.pagination import KeysetPagination, PageNumberPagination
+
+
+class ProductCursorPagination(KeysetPagination):
+    # Newest products first by default; `id` breaks ties between rows with
+    # the same sort value so every product has a unique position.
+    ordering = ('-created_at', '-id')
+
+    # The sort keys clients may pick with `?ordering=`.
+    orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'name': ('name', 'id'),
+        '-name': ('-name', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        key = request.query_params.get('ordering')
+        if not key:
+            return list(self.ordering)
+        if key not in self.orderings:
+            raise ValidationError({'ordering': f"Must be one of: {', '.join(self.orderings)}."})
+        return list(self.orderings[key])
+
+
+class ProductSearchPagination(PageNumberPagination):
+    # Search results are ordered by relevance, which has no stable key to
+    # seek on, so they are paginated by page number instead.
+    pass
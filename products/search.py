@@ -0,0 +1,80 @@
+# In products/search.py
+"""
+Product search.
+
+On PostgreSQL we use real full-text search: every product stores a
+`search_vector` (a tsvector over its name and description, name weighted
+higher), backed by a GIN index, and queries are ranked with ts_rank.
+The vector is refreshed by `products/signals.py` whenever a product is saved.
+
+Other databases (SQLite in local development and tests) get a simple
+LIKE-based fallback with the same interface, so the endpoint and the test
+suite work everywhere.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+
+def is_full_text_available():
+    return connection.vendor == 'postgresql'
+
+
+def product_search_vector():
+    # 'A' and 'B' are tsvector weights: a match in the name ranks higher.
+    config = settings.PRODUCT_SEARCH_CONFIG
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector('description', weight='B', config=config)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored search vector for every product in `queryset`."""
+    if is_full_text_available():
+        queryset.update(search_vector=product_search_vector())
+
+
+def search_terms(text):
+    # Keep only word characters, so user input can never break the tsquery syntax.
+    return re.findall(r'\w+', text)
+
+
+def search_products(queryset, text):
+    """
+    Filter `queryset` to products matching every word of `text` (the last
+    word of a query may be a prefix: "lapt" finds "laptop") and annotate a
+    `rank`. Results are ordered best match first.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    if is_full_text_available():
+        # "lap:* & bag:*" - every term must match, each as a prefix.
+        query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            search_type='raw',
+            config=settings.PRODUCT_SEARCH_CONFIG,
+        )
+        return (
+            queryset
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-id')
+        )
+
+    # Fallback: every term must appear in the name or the description;
+    # name matches count more than description matches.
+    condition = Q()
+    rank = Value(0.0, output_field=FloatField())
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+        rank = rank + Case(When(name__icontains=term, then=Value(1.0)), default=Value(0.0),
+                           output_field=FloatField())
+        rank = rank + Case(When(description__icontains=term, then=Value(0.4)), default=Value(0.0),
+                           output_field=FloatField())
+    return queryset.filter(condition).annotate(rank=rank).order_by('-rank', '-id')
@@ -1,5 +1,7 @@
 # In products/serializers.py
 from rest_framework import serializers
+from core.fastserializers import FastSerializer
+from .images import variant_urls
 from .models import Product, Category
 
 
@@ -13,7 +15,12 @@ class ProductWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         # We only need the fields that a user provides when creating/updating.
-        fields = ['name', 'description', 'price', 'category', 'image', 'in_stock']
+        fields = ['sku', 'name', 'description', 'price', 'category', 'image', 'in_stock']
+
+    def validate_sku(self, value):
+        # Store "no SKU" as NULL: unlike empty strings, NULLs never collide
+        # in the unique index.
+        return value or None
 
 
 # This is your existing serializer, now used only for reading data.
@@ -27,9 +34,41 @@ class CategorySerializer(serializers.ModelSerializer):
 # It displays the full nested category object.
 class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)  # `read_only=True` is a good practice here
+    # Smaller copies of `image` ({variant: url}, see products/images.py);
+    # empty while they are being generated.
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'image',
-                  'in_stock', 'created_at']
+        fields = ['id', 'sku', 'name', 'description', 'price', 'category', 'image',
+                  'image_variants', 'in_stock', 'created_at']
+
+    def get_image_variants(self, product):
+        return variant_urls(product.image_variants, product.image_variants_source, product.image.name,
+                            self.context.get('request'))
+
+
+# Same output as ProductSerializer, built from `.values()` rows
+# (see core/fastserializers.py). Keep the two in sync.
+class ProductFastSerializer(FastSerializer):
+    model = Product
+    fields = {
+        'id': 'id',
+        'sku': 'sku',
+        'name': 'name',
+        'description': 'description',
+        'price': 'price',
+        'category': {'id': 'category_id', 'name': 'category__name'},
+        'image': 'image',
+        'image_variants': 'image_variants',
+        'in_stock': 'in_stock',
+        'created_at': 'created_at',
+    }
+    extra_columns = ('image_variants_source',)
 
+    def to_representation(self, row):
+        data = super().to_representation(row)
+        # `image` is already a URL here; the variants need the raw name.
+        data['image_variants'] = variant_urls(row['image_variants'], row['image_variants_source'],
+                                              row['image'], self.context.get('request'))
+        return data
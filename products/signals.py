@@ -0,0 +1,53 @@
+# In products/signals.py
+# Keep the catalog cache (products/cache.py), the HTTP validators
+# (products/conditional.py), the search vectors (products/search.py) and the
+# image variants (products/images.py) in sync with the database.
+# These receivers are connected in ProductsConfig.ready().
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from . import cache as catalog_cache
+from .conditional import bump_collection
+from .images import schedule_variants
+from .models import Category, Product
+from .search import update_search_vectors
+
+# Sent by writes that bypass post_save (the bulk import, products/bulk.py)
+# with `product_ids`: the existing products they changed, in the same
+# transaction. The cart app listens to re-price the carts holding them.
+products_bulk_updated = Signal()
+
+
+@receiver(post_save, sender=Product)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    # Saves that don't touch the searchable text don't need a new vector.
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return
+    update_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Product)
+def refresh_image_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    # Also when the image was removed: the job clears the variants.
+    if (instance.image.name or '') != instance.image_variants_source:
+        schedule_variants(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    catalog_cache.invalidate_products([instance.pk])
+    bump_collection()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    # Every product embeds its category, so all of them must be re-rendered
+    # and count as changed (new ETag / Last-Modified).
+    products = Product.objects.filter(category_id=instance.pk)
+    product_ids = list(products.values_list('id', flat=True))
+    if product_ids:
+        products.update(updated_at=timezone.now())
+    catalog_cache.invalidate_products(product_ids)
+    bump_collection()
@@ -1,14 +1,22 @@
 from django.urls import path
 from .views import (
     ProductListView, ProductDetailView,
-    ProductCreateView, ProductUpdateView, ProductDeleteView
+    ProductCreateView, ProductUpdateView, ProductDeleteView,
+    CatalogCacheStatsView, ProductSearchView, ProductFacetsView,
+    ProductImportView, ProductExportView, ProductStreamView,
 )
 
 urlpatterns = [
     path('', ProductListView.as_view(), name='product-list'),
+    path('search/', ProductSearchView.as_view(), name='product-search'),
+    path('facets/', ProductFacetsView.as_view(), name='product-facets'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
     path('create/', ProductCreateView.as_view(), name='product-create'),
     path('<int:pk>/update', ProductUpdateView.as_view(), name='product-update'),
     path('<int:pk>/delete/', ProductDeleteView.as_view(), name='product-delete'),
+    path('cache-stats/', CatalogCacheStatsView.as_view(), name='product-cache-stats'),
+    path('import/', ProductImportView.as_view(), name='product-import'),
+    path('export/', ProductExportView.as_view(), name='product-export'),
+    path('stream/', ProductStreamView.as_view(), name='product-stream'),
 ]
 
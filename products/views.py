@@ -1,27 +1,195 @@
 # In products/views.py
 
-from rest_framework import permissions
+import io
+from functools import partial
+
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework import permissions, status
 from rest_framework.generics import (
+    GenericAPIView,
     ListAPIView,
     RetrieveAPIView,
     CreateAPIView,
     UpdateAPIView,
     DestroyAPIView,
 )
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.fastserializers import FastListModelMixin, FastRetrieveModelMixin
+from core.streaming import StreamingExportMixin
+from . import bulk
+from . import cache as catalog_cache
+from .conditional import (
+    add_validator_headers, collection_validators, not_modified_response, product_validators,
+)
+from .exports import product_dump_rows
+from .facets import compute_facets
+from .filters import ProductFilterBackend
 from .models import Product
+from .pagination import ProductCursorPagination, ProductSearchPagination
+from .search import search_products
 # Import both serializers
-from .serializers import ProductSerializer, ProductWriteSerializer
+from .serializers import ProductFastSerializer, ProductSerializer, ProductWriteSerializer
+
+
+class CatalogCacheMixin:
+    """
+    Serve GET responses from the catalog cache (see products/cache.py), and
+    answer conditional requests (see products/conditional.py).
+
+    On a miss the normal DRF response is built, rendered right away and its
+    bytes are stored together with its ETag/Last-Modified; on a hit those
+    bytes are returned as-is, skipping the database, the serializers and the
+    JSON renderer.
+
+    `If-None-Match` / `If-Modified-Since` are checked before anything else
+    is done: on a hit against the cached validators (no query at all), on a
+    miss against `get_validators` (one primary-key lookup). A match returns
+    304 Not Modified without building the body.
+    """
+
+    def get_cache_variant(self, request):
+        # Anything that changes the rendered bytes must be part of the key.
+        return f'{request.get_host()}|{request.accepted_media_type}|{request.get_full_path()}'
+
+    def get_validators(self, request, variant):
+        """(etag, last_modified timestamp) of the current data, or None."""
+        return collection_validators(variant)
+
+    def is_cacheable(self, request):
+        # Only JSON is cached; the browsable API keeps rendering normally.
+        return isinstance(request.accepted_renderer, JSONRenderer)
+
+    def cached_response(self, body):
+        response = HttpResponse(body, content_type=self.request.accepted_media_type)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def render_for_cache(self, response):
+        # Render now (instead of in `finalize_response`) so we can keep the bytes.
+        # Django won't render the response a second time.
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        response['X-Cache'] = 'MISS'
+        return response.content
+
+    def conditional_response(self, request, validators, build_response):
+        """304 if the client's copy matches `validators`, else `build_response()`."""
+        response = not_modified_response(request, validators) or build_response()
+        return add_validator_headers(response, validators)
+
+    def cached_list_response(self, request, build_response):
+        """Serve a collection-level response (list page, facets) through the cache."""
+        variant = self.get_cache_variant(request)
+        if not self.is_cacheable(request):
+            return self.conditional_response(request, self.get_validators(request, variant), build_response)
+
+        # Read the version BEFORE the database, see products/cache.py.
+        version = catalog_cache.list_version()
+        entry = catalog_cache.get_list(version, variant)
+        if entry is not None:
+            body, validators = entry
+            return self.conditional_response(request, validators, partial(self.cached_response, body))
+
+        # Validators before data, too: a write in between can only make the
+        # stored ETag older than the body, never newer.
+        validators = self.get_validators(request, variant)
+
+        def build_and_store():
+            response = build_response()
+            if response.status_code == 200:
+                catalog_cache.set_list(version, variant, (self.render_for_cache(response), validators))
+            return response
+
+        return self.conditional_response(request, validators, build_and_store)
 
 
 # Anyone can GET. This uses the READ serializer.
-class ProductListView(ListAPIView):
-    queryset = Product.objects.all()
+class ProductListView(CatalogCacheMixin, FastListModelMixin, ListAPIView):
+    # `select_related` pulls the category in the same query, so the nested
+    # CategorySerializer doesn't fire one extra query per product.
+    queryset = Product.objects.select_related('category')
     serializer_class = ProductSerializer # For displaying products
+    # Used instead when settings.FAST_SERIALIZERS is on.
+    fast_serializer_class = ProductFastSerializer
+    # Keyset pagination: the catalog is served page by page, newest first.
+    pagination_class = ProductCursorPagination
 
+    filter_backends = [ProductFilterBackend]
 
-class ProductDetailView(RetrieveAPIView):
-    queryset = Product.objects.all()
+    def list(self, request, *args, **kwargs):
+        return self.cached_list_response(request, partial(super().list, request, *args, **kwargs))
+
+
+class ProductDetailView(CatalogCacheMixin, FastRetrieveModelMixin, RetrieveAPIView):
+    queryset = Product.objects.select_related('category')
     serializer_class = ProductSerializer # For displaying a single product
+    fast_serializer_class = ProductFastSerializer
+
+    def get_validators(self, request, variant):
+        return product_validators(self.kwargs['pk'], variant)
+
+    def retrieve(self, request, *args, **kwargs):
+        build_response = partial(super().retrieve, request, *args, **kwargs)
+        variant = self.get_cache_variant(request)
+        if not self.is_cacheable(request):
+            return self.conditional_response(request, self.get_validators(request, variant), build_response)
+
+        product_id = self.kwargs['pk']
+        version = catalog_cache.product_version(product_id)
+        entry = catalog_cache.get_product(product_id, version, variant)
+        if entry is not None:
+            body, validators = entry
+            return self.conditional_response(request, validators, partial(self.cached_response, body))
+
+        # No validators means no such product: `retrieve` answers 404, and
+        # only real product pages ever reach the cache.
+        validators = self.get_validators(request, variant)
+        if validators is None:
+            return build_response()
+
+        def build_and_store():
+            response = build_response()
+            catalog_cache.set_product(product_id, version, variant, (self.render_for_cache(response), validators))
+            return response
+
+        return self.conditional_response(request, validators, build_and_store)
+
+# Facet counts for the storefront filters, e.g. /api/products/facets/?max_price=100
+# Takes the same filters as the list.
+class ProductFacetsView(CatalogCacheMixin, GenericAPIView):
+    queryset = Product.objects.all()
+    filter_backends = [ProductFilterBackend]
+
+    def get(self, request, *args, **kwargs):
+        return self.cached_list_response(request, self.build_facets_response)
+
+    def build_facets_response(self):
+        return Response(compute_facets(self.filter_queryset(self.get_queryset())))
+
+
+# Anyone can search: /api/products/search/?q=laptop&category=3
+# Takes the same filters as the list.
+class ProductSearchView(FastListModelMixin, ListAPIView):
+    serializer_class = ProductSerializer
+    fast_serializer_class = ProductFastSerializer
+    pagination_class = ProductSearchPagination
+    filter_backends = [ProductFilterBackend]
+
+    def get_queryset(self):
+        queryset = Product.objects.select_related('category')
+        return search_products(queryset, self.request.query_params.get('q', ''))
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('q', '').strip():
+            return Response({"error": "The 'q' query parameter is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
 
 # Only admins can POST. This uses the WRITE serializer.
 class ProductCreateView(CreateAPIView):
@@ -43,3 +211,72 @@ class ProductDeleteView(DestroyAPIView):
     serializer_class = ProductSerializer # Can be any of them, it just needs to identify the object.
     permission_classes = [permissions.IsAdminUser]
 
+
+
+# Admins can watch how well the catalog cache is doing.
+class CatalogCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(catalog_cache.get_stats())
+
+
+# Admins can load a supplier feed (CSV or JSON Lines, see products/bulk.py):
+# POST /api/products/import/ with a multipart `file` and an optional
+# `file_format` ('csv' or 'jsonl', default: from the file name).
+# For very large feeds prefer `manage.py import_products`, which doesn't
+# hold an HTTP request open.
+class ProductImportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "A 'file' upload is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or bulk.format_from_name(upload.name)
+        if file_format not in bulk.FORMATS:
+            return Response({"error": f"file_format must be one of {', '.join(bulk.FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Check the whole upload decodes before the first chunk is committed,
+        # then decode it again lazily, so rows are parsed as they are read.
+        try:
+            bulk.check_encoding(upload.chunks())
+        except UnicodeDecodeError:
+            return Response({"error": "The file must be UTF-8 encoded."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        upload.seek(0)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        report = bulk.import_products(bulk.read_rows(stream, file_format))
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+
+# The matching export, streamed row by row:
+# GET /api/products/export/?file_format=csv|jsonl
+class ProductExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    content_types = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in bulk.FORMATS:
+            return Response({"error": f"file_format must be one of {', '.join(bulk.FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            bulk.serialize_rows(bulk.export_rows(), file_format),
+            content_type=self.content_types[file_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+        return response
+
+
+# Full catalog dump for partner integrations, streamed row by row:
+# GET /api/products/stream/?stream=ndjson|json
+class ProductStreamView(StreamingExportMixin, APIView):
+    permission_classes = [permissions.IsAdminUser]
+    export_filename = 'products'
+
+    def get_export_rows(self, request):
+        return product_dump_rows(request, Product.objects.all())
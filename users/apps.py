@@ -7,3 +7,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # Connects the receiver that drops cached account state on user changes.
+        from . import authentication  # noqa: F401
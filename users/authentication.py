@@ -0,0 +1,123 @@
+# In users/authentication.py
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class StatelessUser(TokenUser):
+    """
+    A lightweight `request.user` built from the token claims (see
+    users/tokens.py): id and username. StatelessJWTAuthentication sets
+    is_staff and is_superuser from the cached account state. It is NOT a
+    `User` model instance, so code should use `request.user.id` for foreign
+    keys (`Cart.objects.filter(user_id=request.user.id)`).
+    """
+
+    @cached_property
+    def id(self):
+        # simplejwt stores the id as a string; our foreign keys are integers.
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @property
+    def pk(self):
+        return self.id
+
+
+class _UserStateCache:
+    """
+    A tiny per-process cache of "may this user still use their tokens?".
+
+    The token proves who the user is, but an account can be deactivated,
+    demoted or have its password changed after the token was issued. We check that against
+    the database at most once every `JWT_USER_STATE_TTL` seconds per user,
+    instead of on every request.
+    """
+
+    def __init__(self, max_entries=10000):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, user_id, state):
+        with self._lock:
+            if len(self._entries) >= self._max_entries:
+                # Simplest possible bound on memory: start over.
+                self._entries.clear()
+            self._entries[user_id] = (time.monotonic() + settings.JWT_USER_STATE_TTL, state)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_state_cache = _UserStateCache()
+
+
+def load_user_state(user_id):
+    """
+    (is_active, password hash fingerprint, is_staff, is_superuser) for a
+    user; a user who no longer exists is inactive. One small indexed query,
+    cached for a few seconds.
+    """
+    state = user_state_cache.get(user_id)
+    if state is None:
+        row = (User.objects.filter(pk=user_id)
+               .values_list('is_active', 'password', 'is_staff', 'is_superuser').first())
+        state = (row[0], get_md5_hash_password(row[1]), row[2], row[3]) if row else (False, None, False, False)
+        user_state_cache.set(user_id, state)
+    return state
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts the signed token claims instead of
+    loading the User row on every request. The only database access is the
+    short-lived, cached account state check above.
+    """
+
+    def get_user(self, validated_token):
+        user = StatelessUser(validated_token)
+        try:
+            user_id = user.id
+        except (KeyError, TypeError, ValueError):
+            raise AuthenticationFailed("Token contained no recognizable user identification", code='bad_token')
+
+        is_active, password_fingerprint, is_staff, is_superuser = load_user_state(user_id)
+        if not is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_fingerprint:
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        # Privileges come from the account state, not from the claims: a
+        # demoted user's tokens must lose them right away (well, within
+        # JWT_USER_STATE_TTL seconds), not when they expire.
+        user.is_staff = is_staff
+        user.is_superuser = is_superuser
+        return user
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_user_state(sender, instance, **kwargs):
+    # Changes made by this process are visible immediately; other worker
+    # processes pick them up within JWT_USER_STATE_TTL seconds.
+    user_state_cache.forget(instance.pk)
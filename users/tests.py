@@ -1,3 +1,95 @@
-from django.test import TestCase
+# In users/tests.py
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import user_state_cache
 
-# Create your tests here.
+
+class StatelessJWTAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        user_state_cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'wonderland-123')
+
+    def _login(self):
+        response = self.client.post('/api/token/', {'username': 'alice', 'password': 'wonderland-123'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data
+
+    def test_tokens_carry_user_claims(self):
+        access = AccessToken(self._login()['access'])
+        self.assertEqual(access['username'], 'alice')
+        self.assertFalse(access['is_staff'])
+
+    def test_refreshed_tokens_keep_the_claims(self):
+        refresh = self._login()['refresh']
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(AccessToken(response.data['access'])['username'], 'alice')
+
+    def test_cart_request_skips_the_user_query(self):
+        self._login()
+        self.client.get('/api/cart/')  # Creates the cart, caches the account state.
+
+        # Only the cart and its items; no `SELECT ... FROM auth_user`.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_rejected(self):
+        self._login()
+        self.assertEqual(self.client.get('/api/cart/').status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/api/cart/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self._login()
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/orders/history/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_staff_claim_grants_admin_endpoints(self):
+        self.user.is_staff = True
+        self.user.save()
+        self._login()
+        self.assertEqual(self.client.get('/api/products/cache-stats/').status_code, status.HTTP_200_OK)
+
+    def test_profile_still_returns_full_user(self):
+        self._login()
+        response = self.client.get('/api/profile/')
+        self.assertEqual(response.data, {'id': self.user.id, 'username': 'alice', 'email': 'alice@example.com'})
+
+    def test_demoted_user_loses_admin_endpoints(self):
+        self.user.is_staff = True
+        self.user.save()
+        refresh = self._login()['refresh']
+        self.assertEqual(self.client.get('/api/products/cache-stats/').status_code, status.HTTP_200_OK)
+
+        self.user.is_staff = False
+        self.user.save()
+        # The token still says is_staff; the account state wins.
+        self.assertEqual(self.client.get('/api/products/cache-stats/').status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        access = response.data['access']
+        self.assertFalse(AccessToken(access)['is_staff'])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(self.client.get('/api/orders/stream/').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get('/api/analytics/sales/daily/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_refresh_picks_up_a_promotion(self):
+        refresh = self._login()['refresh']
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertTrue(AccessToken(response.data['access'])['is_staff'])
+
+    def test_refresh_for_a_deleted_user_is_rejected(self):
+        refresh = self._login()['refresh']
+        self.user.delete()
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
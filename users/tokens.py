@@ -0,0 +1,58 @@
+# In users/tokens.py
+# The JWT "login desk" configuration. On top of the user id that simplejwt
+# always puts in a token, we add a few claims that let
+# `users.authentication.StatelessJWTAuthentication` build `request.user`
+# straight from the token, without loading the User row on every request.
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+
+def set_user_claims(token, username, is_staff, is_superuser):
+    token['username'] = username
+    # Informational only: the authentication reads the privileges from the
+    # account state, so a stale claim can't keep a demoted user in.
+    token['is_staff'] = is_staff
+    token['is_superuser'] = is_superuser
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # These end up in the refresh token AND in every access token
+        # created from it (refreshing rebuilds them, see below).
+        set_user_claims(token, user.username, user.is_staff, user.is_superuser)
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    /api/token/refresh/: the new tokens get the claims of the account as it
+    is now, not copies of the (possibly outdated) ones in the refresh token.
+    Same checks as simplejwt's serializer, with the user loaded only once.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        # The access token copies the refresh token's claims.
+        set_user_claims(refresh, user.username, user.is_staff, user.is_superuser)
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    pass  # The blacklist app isn't installed.
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
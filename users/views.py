@@ -5,7 +5,14 @@
 # and a set of rules about who can access it.
 
 from django.shortcuts import render
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
+from cart.services import merge_session_cart
+from cart.session import token_from_request
+from inventory.services import OutOfStockError
 from .serializers import RegisterSerializer, UserSerializer
 from django.contrib.auth.models import User
 
@@ -52,6 +59,11 @@ class ProfileView(generics.RetrieveAPIView):
     # If they are not, they will receive a "401 Unauthorized" error.
     permission_classes = [permissions.IsAuthenticated]
 
+    # The profile shows the user's email, which is not in the token, so this
+    # desk uses the classic JWT authentication that loads the full User row.
+    # (Every other endpoint builds a lightweight user from the token alone.)
+    authentication_classes = [JWTAuthentication]
+
     # This is a custom method we are overriding.
     # By default, a `RetrieveAPIView` expects to find a primary key (like 'pk' or 'id')
     # in the URL (e.g., /api/users/5/). It uses that key to fetch the object.
@@ -66,3 +78,27 @@ class ProfileView(generics.RetrieveAPIView):
         # currently logged-in user.
         return self.request.user
 
+
+
+# This is the "Login Desk": it hands out JWT tokens, exactly like simplejwt's
+# TokenObtainPairView. On top of that, a shopper who filled a cart before
+# logging in sends its `X-Cart-Token` along, and that anonymous cart is moved
+# into their account's cart (see cart/session.py).
+class LoginView(TokenObtainPairView):
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+
+        cart_token = token_from_request(request)
+        if cart_token:
+            try:
+                merge_session_cart(serializer.user, cart_token)
+            except OutOfStockError:
+                # Logging in must not fail over the cart. The session cart is
+                # kept as it was; checkout will report the missing stock.
+                pass
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)